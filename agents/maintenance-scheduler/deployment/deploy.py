@@ -22,12 +22,12 @@ from vertexai import agent_engines
 from vertexai.preview.reasoning_engines import AdkApp
 
 from maintenance_scheduler.agent import root_agent
-from maintenance_scheduler.config import Config
+from maintenance_scheduler.config import get_config
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-configs = Config()
+configs = get_config()
 
 STAGING_BUCKET = f"gs://{configs.CLOUD_PROJECT}-" \
                  f"maintenance-scheduler-agent-staging"
@@ -16,6 +16,7 @@
 
 import logging
 import os
+from functools import lru_cache
 
 from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -75,9 +76,66 @@ class Config(BaseSettings):
         description="Indicates if the MCP server should be used instead of the local tools"
     )
     mcp_toolbox_uri: str = Field(default="http://127.0.0.1:5000", description="URI of the MCP server" )
+    chart_render_workers: int = Field(
+        default=2,
+        description="Number of worker processes which render the charts")
+    chart_cache_max_entries: int = Field(
+        default=64,
+        description="Number of rendered charts which are cached. 0 disables the cache")
+    chart_preview_scale: float = Field(
+        default=0.5,
+        description="Scale of the downscaled chart previews")
+    lakehouse_answer_max_rows: int = Field(
+        default=50,
+        description="Number of rows of the data table returned by ask_lakehouse")
+    lakehouse_answer_max_bytes: int = Field(
+        default=32 * 1024,
+        description="Size of the answer returned by ask_lakehouse, its text, SQL and data table together")
+    answer_cache_max_entries: int = Field(
+        default=256,
+        description="Number of data agent answers and charts cached until the incidents data changes. 0 disables the cache")
+    answer_cache_version_check_secs: float = Field(
+        default=5.0,
+        description="How long a check of the incidents data version is shared by the questions asked after it")
+    http_pool_max_connections: int = Field(
+        default=16,
+        description="Size of the connection pools of the shared BigQuery and Cloud Storage clients")
+    grpc_keepalive_time_ms: int = Field(
+        default=30_000,
+        description="Interval of the keep-alive pings of the shared gRPC channels")
+    gcs_object_cache_max_bytes: int = Field(
+        default=64 * 1024 * 1024,
+        description="Total size of the Cloud Storage objects, e.g. bus stop images, cached by the process. 0 disables the cache")
+    gcs_object_cache_revalidate_secs: float = Field(
+        default=300,
+        description="How long a cached Cloud Storage object is used before checking that its generation is current")
+    gcs_max_concurrent_downloads: int = Field(
+        default=8,
+        description="Maximum number of Cloud Storage downloads at the same time")
+    image_preview_max_size: int = Field(
+        default=512,
+        description="Size in pixels of the longest side of the bus stop image previews")
+    image_preview_format: str = Field(
+        default="webp",
+        description="Format of the bus stop image previews, 'webp' or 'jpeg'")
+    image_preview_quality: int = Field(
+        default=80,
+        description="Encoding quality of the bus stop image previews, from 1 to 100")
+    image_preview_cache_max_bytes: int = Field(
+        default=16 * 1024 * 1024,
+        description="Total size of the image previews cached by the process. 0 disables the cache")
+    image_preview_max_workers: int = Field(
+        default=4,
+        description="Maximum number of image previews made at the same time")
 
     def get_bigquery_data_project(self) -> str:
         return self.CLOUD_BIGQUERY_DATA_PROJECT or self.CLOUD_PROJECT
 
     def get_bigquery_run_project(self) -> str:
         return self.CLOUD_BIGQUERY_RUN_PROJECT or self.CLOUD_PROJECT
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Returns the settings of the explorer, which are loaded once per process."""
+    return Config()
@@ -0,0 +1,165 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cache of the data agent answers, valid until the data changes.
+
+Answering a question takes the data agent several reasoning and query
+steps, while dashboard-style questions, e.g. the open incidents by city,
+are asked again and again. Answers and chart specs are cached by the
+normalized question and the data agent.
+
+The data only changes when the image processing pipeline updates the
+incidents and moves the report watermark, so every answer is stored with
+the last modification times of these tables, its data version. An answer
+is only served while the data version is the same, and a version check
+is two table metadata requests instead of a query. Concurrent questions
+share a check made within the last `version_check_secs`.
+
+The question which opens a conversation is answered the same way in every
+session, so its answer is shared by all sessions. Follow-up questions may
+rely on the previous answers of their conversation, e.g. "and in Boston?",
+so their answers are only reused within the same conversation. A cached
+answer is sent to the conversation with the next question which chats with
+the data agent, so that its follow-ups have their context.
+"""
+
+import asyncio
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Tables updated by every run of the image processing pipeline
+WATCHED_TABLES = ["report_watermark", "incidents"]
+
+
+def normalize_question(question: str) -> str:
+    """Normalizes the case, whitespace and final punctuation of a question."""
+    return " ".join(question.lower().split()).rstrip(" ?.!")
+
+
+def table_versions(client, dataset: str,
+                   tables=tuple(WATCHED_TABLES)) -> Tuple:
+    """Last modification times of the tables, from their metadata."""
+    return tuple(client.get_table(f"{dataset}.{table}").modified
+                 for table in tables)
+
+
+class AnswerCache:
+    """
+      Least recently used cache of answers, invalidated by the data version.
+
+      A `max_entries` of 0 disables the cache.
+
+      Args:
+          data_version: Blocking function returning the current data version
+          max_entries: Number of cached answers
+          version_check_secs: How long a data version is shared by the
+            questions asked after it was checked
+    """
+
+    def __init__(self, data_version: Callable[[], Hashable], max_entries: int,
+                 version_check_secs: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self._data_version = data_version
+        self.max_entries = max_entries
+        self.version_check_secs = version_check_secs
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._answers: OrderedDict[tuple, Tuple[Hashable, Any]] = \
+            OrderedDict()
+        self._version: Optional[Tuple[Hashable, float]] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.version_checks = 0
+
+    async def data_version(self) -> Optional[Hashable]:
+        """
+          The current data version, or None if it can't be checked, in which
+          case answers are neither served nor stored.
+        """
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            if self._version is not None:
+                version, checked = self._version
+                if self._clock() - checked < self.version_check_secs:
+                    return version
+        try:
+            version = await asyncio.to_thread(self._data_version)
+        except Exception as e:
+            logger.warning("Data version check failed: %s", e)
+            return None
+        with self._lock:
+            self.version_checks += 1
+            self._version = (version, self._clock())
+        return version
+
+    @staticmethod
+    def key(kind: str, agent_name: str, question: str,
+            conversation_name: str = "") -> tuple:
+        """
+          Cache key of a question.
+
+          Args:
+              conversation_name: Conversation of a follow-up question, empty
+                for the first question of a conversation
+        """
+        return kind, agent_name, conversation_name, \
+            normalize_question(question)
+
+    def get(self, key: tuple, version: Optional[Hashable]) -> Optional[Any]:
+        """Returns a copy of the answer cached for the data version."""
+        if version is None:
+            return None
+        with self._lock:
+            entry = self._answers.get(key)
+            if entry is not None and entry[0] != version:
+                # Answered before the data changed
+                del self._answers[key]
+                self.invalidations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._answers.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def put(self, key: tuple, version: Optional[Hashable],
+            answer: Any) -> None:
+        """Stores an answer for the data version it was asked at."""
+        if version is None or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._answers[key] = (version, copy.deepcopy(answer))
+            self._answers.move_to_end(key)
+            while len(self._answers) > self.max_entries:
+                self._answers.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "version_checks": self.version_checks,
+            "cached_answers": len(self._answers),
+        }
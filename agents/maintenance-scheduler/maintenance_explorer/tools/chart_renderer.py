@@ -0,0 +1,207 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Rendering of the Vega-Lite charts off the event loop.
+
+Rendering a chart runs the Vega JavaScript runtime of vl-convert, which is
+CPU bound and slow to start. Charts are rendered by a pool of worker
+processes, which warm the runtime up when they start, and the results are
+cached by a hash of the normalized chart spec.
+
+Workers are spawned rather than forked, as forking a process with live gRPC
+channels is unsafe, and only import vl-convert, which is what Altair saves
+charts with.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PNG = "png"
+SVG = "svg"
+PNG_PREVIEW = "png_preview"
+OUTPUT_FORMATS = [PNG, SVG, PNG_PREVIEW]
+
+MIME_TYPES = {
+    PNG: "image/png",
+    SVG: "image/svg+xml",
+    PNG_PREVIEW: "image/png",
+}
+
+FILE_EXTENSIONS = {
+    PNG: "png",
+    SVG: "svg",
+    PNG_PREVIEW: "png",
+}
+
+# Rendered by every worker when it starts
+_WARM_UP_SPEC = {
+    "data": {"values": [{"x": 1}]},
+    "mark": "point",
+    "encoding": {"x": {"field": "x", "type": "quantitative"}},
+}
+
+
+def spec_key(vega_config: Dict[str, Any]) -> str:
+    """Hash of a chart spec, independent of the order of its keys."""
+    return hashlib.sha256(json.dumps(
+        vega_config, sort_keys=True, separators=(",", ":")
+    ).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class RenderedChart:
+    """Image of a chart."""
+    data: bytes
+    mime_type: str
+    cached: bool = False
+
+
+class ChartRenderer:
+    """
+      Renders charts on a pool of warm worker processes.
+
+      The pool is created by `start` or on the first render, and replaced
+      when one of its workers dies. A `max_entries` of 0 disables the cache
+      of rendered charts.
+
+      Args:
+          max_workers: Number of worker processes
+          max_entries: Number of rendered charts which are cached
+          preview_scale: Scale of the `png_preview` images
+    """
+
+    def __init__(self, max_workers: int, max_entries: int,
+                 preview_scale: float = 0.5):
+        self.max_workers = max_workers
+        self.max_entries = max_entries
+        self.preview_scale = preview_scale
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._charts: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def start(self) -> None:
+        """Starts the workers in the background, if not started yet."""
+        self._get_executor()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                import vl_convert
+                logger.info("Starting %s chart rendering workers",
+                            self.max_workers)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=vl_convert.vegalite_to_svg,
+                    initargs=(_WARM_UP_SPEC,))
+                # Workers are spawned on demand, one per task without an idle
+                # worker, so a no-op task per worker spawns all of them
+                for _ in range(self.max_workers):
+                    self._executor.submit(int)
+            return self._executor
+
+    def _replace_executor(self, broken: ProcessPoolExecutor) -> None:
+        """Drops a pool whose worker died, the next render starts a new one."""
+        with self._lock:
+            if self._executor is broken:
+                logger.warning("A chart rendering worker died, restarting "
+                               "the workers")
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    async def _render(self, executor: ProcessPoolExecutor,
+                      vega_config: Dict[str, Any], output_format: str) -> bytes:
+        import vl_convert
+        loop = asyncio.get_running_loop()
+        if output_format == SVG:
+            svg = await loop.run_in_executor(
+                executor, vl_convert.vegalite_to_svg, vega_config)
+            return svg.encode("utf-8")
+        scale = self.preview_scale if output_format == PNG_PREVIEW else 1.0
+        return await loop.run_in_executor(
+            executor, partial(vl_convert.vegalite_to_png, scale=scale),
+            vega_config)
+
+    async def render(self, vega_config: Dict[str, Any],
+                     output_format: str = PNG) -> RenderedChart:
+        """
+          Renders a chart, or returns the cached image of the same spec.
+
+          Args:
+              vega_config: Vega-Lite spec of the chart
+              output_format: "png", "svg" or "png_preview", a PNG downscaled
+                by `preview_scale`
+
+          Returns:
+              The image of the chart.
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{output_format}'. "
+                             f"Use one of {OUTPUT_FORMATS}")
+        key = (spec_key(vega_config), output_format)
+        with self._lock:
+            data = self._charts.get(key)
+            if data is not None:
+                self._charts.move_to_end(key)
+                self.hits += 1
+                return RenderedChart(data, MIME_TYPES[output_format],
+                                     cached=True)
+            self.misses += 1
+
+        executor = self._get_executor()
+        try:
+            data = await self._render(executor, vega_config, output_format)
+        except BrokenProcessPool:
+            # A pool stays broken once one of its workers dies, so the chart
+            # is rendered once more by a new pool
+            self._replace_executor(executor)
+            data = await self._render(self._get_executor(), vega_config,
+                                      output_format)
+
+        if self.max_entries > 0:
+            with self._lock:
+                self._charts[key] = data
+                self._charts.move_to_end(key)
+                while len(self._charts) > self.max_entries:
+                    self._charts.popitem(last=False)
+        return RenderedChart(data, MIME_TYPES[output_format])
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "cached_charts": len(self._charts),
+        }
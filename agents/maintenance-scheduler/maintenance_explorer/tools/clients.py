@@ -0,0 +1,60 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Google API clients and Cloud Storage services of the explorer.
+
+They are created from the explorer settings on first use and shared by all
+sessions of the process.
+"""
+
+from functools import lru_cache
+
+from shared_services.clients import ClientRegistry
+from shared_services.gcs_objects import AsyncGcsObjectLoader, GcsObjectCache
+from shared_services.image_previews import ImagePreviewService, PreviewCache
+from ..config import get_config
+
+
+@lru_cache(maxsize=1)
+def get_client_registry() -> ClientRegistry:
+    """Returns the client registry of the process."""
+    config = get_config()
+    return ClientRegistry(
+        max_pool_connections=config.http_pool_max_connections,
+        keepalive_time_ms=config.grpc_keepalive_time_ms)
+
+
+@lru_cache(maxsize=1)
+def get_gcs_object_loader() -> AsyncGcsObjectLoader:
+    """Returns the object loader of the process, shared by all sessions."""
+    config = get_config()
+    return AsyncGcsObjectLoader(
+        lambda: get_client_registry().storage(),
+        cache=GcsObjectCache(max_bytes=config.gcs_object_cache_max_bytes),
+        revalidate_secs=config.gcs_object_cache_revalidate_secs,
+        max_concurrent_downloads=config.gcs_max_concurrent_downloads)
+
+
+@lru_cache(maxsize=1)
+def get_image_preview_service() -> ImagePreviewService:
+    """Returns the preview service of the process, shared by all sessions."""
+    config = get_config()
+    return ImagePreviewService(
+        get_gcs_object_loader(),
+        cache=PreviewCache(max_bytes=config.image_preview_cache_max_bytes),
+        max_size=config.image_preview_max_size,
+        image_format=config.image_preview_format,
+        quality=config.image_preview_quality,
+        max_workers=config.image_preview_max_workers)
@@ -0,0 +1,237 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Conversational Analytics data agent and conversations of the sessions.
+
+The data agent is shared by all sessions, so whether it exists is checked
+once per process, with a get of the agent by name, and it is only created if
+the get doesn't find it.
+
+A session only needs a conversation once it asks the data agent something,
+so the conversation is created by the first tool call which chats with the
+agent, on a worker thread, instead of when the session starts.
+
+Answers served from the answer cache never reach the conversation, so their
+questions and answers are kept in the session and sent with the next
+question which chats with the agent, as the context of that question.
+"""
+
+import asyncio
+import logging
+import threading
+
+from google.cloud import geminidataanalytics
+from .clients import get_client_registry
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAMES = ["bus_stops", "image_reports", "incidents", "report_watermark",
+               "bus_ridership"]
+
+SYSTEM_INSTRUCTION = "Table incidents and image_reports contains information about bus stop incidents. and field resolved indicate if there is an open incident that required mantainence. \
+                                                    Table bus_stops  contain information address, city ,etc for bus stops. \
+                                                    When refering to descriptions of the incidents this information should be in table image_reports"
+
+# Set once the conversation of a session exists
+CONVERSATION_CREATED = "conversation_created"
+# Number of questions which reached the conversation of a session
+CONVERSATION_QUESTIONS = "conversation_questions"
+# Cached answers of the session not yet sent to its conversation
+CONVERSATION_CONTEXT = "conversation_context"
+
+_lock = threading.Lock()
+_data_agents: set[str] = set()
+
+
+def add_tables(table_names: list, bq_dataset_id: str,
+               billing_project: str) -> list:
+    bigquery_table_references = []
+    for table_name in table_names:
+        bigquery_table_reference = geminidataanalytics.BigQueryTableReference()
+        bigquery_table_reference.project_id = billing_project
+        bigquery_table_reference.dataset_id = bq_dataset_id
+        bigquery_table_reference.table_id = table_name
+        bigquery_table_references.append(bigquery_table_reference)
+    return bigquery_table_references
+
+
+def _create_data_agent(parent_agent_name: str, agent_id: str, agent_name: str,
+                       billing_project: str, bq_dataset_id: str) -> None:
+    logger.info("Creating a new agent %s", agent_name)
+    datasource_references = geminidataanalytics.DatasourceReferences()
+    datasource_references.bq.table_references = add_tables(
+        TABLE_NAMES, bq_dataset_id, billing_project)
+
+    # Set up context for stateful chat
+    published_context = geminidataanalytics.Context()
+    published_context.system_instruction = SYSTEM_INSTRUCTION
+    published_context.datasource_references = datasource_references
+    # Optional: To enable advanced analysis with Python
+    published_context.options.analysis.python.enabled = True
+
+    data_agent = geminidataanalytics.DataAgent()
+    data_agent.data_analytics_agent.published_context = published_context
+    data_agent.name = agent_name
+
+    request = geminidataanalytics.CreateDataAgentRequest(
+        parent=parent_agent_name,
+        data_agent_id=agent_id,
+        data_agent=data_agent,
+    )
+    get_client_registry().data_agent().create_data_agent(request=request)
+    logger.info("Data Agent created: %s", agent_name)
+
+
+def data_agent_checked(agent_name: str) -> bool:
+    """Whether the data agent was found or created by this process."""
+    return agent_name in _data_agents
+
+
+def ensure_data_agent(parent_agent_name: str, agent_id: str, agent_name: str,
+                      billing_project: str, bq_dataset_id: str) -> bool:
+    """
+      Creates the data agent unless it exists, once per process.
+
+      Sessions starting while the agent is checked wait for the check
+      instead of repeating it. A failed check is retried by the next session.
+
+      Returns:
+          Whether the data agent exists.
+    """
+    from google.api_core.exceptions import NotFound
+
+    if agent_name in _data_agents:
+        return True
+    with _lock:
+        if agent_name in _data_agents:
+            return True
+        try:
+            try:
+                get_client_registry().data_agent().get_data_agent(
+                    name=agent_name)
+                logger.info("Data Agent %s already exists", agent_name)
+            except NotFound:
+                _create_data_agent(parent_agent_name, agent_id, agent_name,
+                                   billing_project, bq_dataset_id)
+        except Exception as e:
+            logger.error("Error creating Data Agent: %s", str(e))
+            return False
+        _data_agents.add(agent_name)
+        return True
+
+
+def create_ca_conversation(agent_name: str, parent_agent_name: str,
+                           conversation_name: str,
+                           conversation_id: str) -> bool:
+    """
+      Creates the conversation of a session.
+
+      Returns:
+          Whether the conversation exists.
+    """
+    from google.api_core.exceptions import AlreadyExists
+
+    conversation = geminidataanalytics.Conversation()
+    conversation.agents = [agent_name]
+    conversation.name = conversation_name
+    request = geminidataanalytics.CreateConversationRequest(
+        parent=parent_agent_name,
+        conversation_id=conversation_id,
+        conversation=conversation,
+    )
+    try:
+        response = get_client_registry().data_chat().create_conversation(
+            request=request)
+        logger.info("Conversation created: %s", str(response))
+    except AlreadyExists:
+        # Created by a concurrent tool call of the same session
+        logger.info("Conversation %s already exists", conversation_name)
+    except Exception as e:
+        logger.error("Error creating Conversation: %s", str(e))
+        return False
+    return True
+
+
+async def ensure_conversation(state) -> None:
+    """Creates the conversation of the session on its first chat."""
+    if state.get(CONVERSATION_CREATED):
+        return
+    created = await asyncio.to_thread(
+        create_ca_conversation, state["agent_name"], state["agent_parent"],
+        state["conversation_name"], state["conversation_id"])
+    if created:
+        state[CONVERSATION_CREATED] = True
+
+
+def is_follow_up(state) -> bool:
+    """Whether the session already asked a question."""
+    return bool(state.get(CONVERSATION_QUESTIONS)
+                or state.get(CONVERSATION_CONTEXT))
+
+
+def remember_cached_answer(state, question: str, answer: str | None = None,
+                           vega_config: dict | None = None) -> None:
+    """Keeps a cached answer to send it with the next chat of the session."""
+    state[CONVERSATION_CONTEXT] = [
+        *state.get(CONVERSATION_CONTEXT, []),
+        {"question": question, "answer": answer, "vega_config": vega_config}]
+
+
+def chat_messages(state, question: str) -> list:
+    """
+      Messages of a chat, the cached answers of the session and the question.
+
+      Args:
+          state: State of the session
+          question: Question asked by the chat
+
+      Returns:
+          The messages of the `ChatRequest`.
+    """
+    messages = []
+    for exchange in state.get(CONVERSATION_CONTEXT, []):
+        messages.append(geminidataanalytics.Message(
+            user_message=geminidataanalytics.UserMessage(
+                text=exchange["question"])))
+        if exchange["vega_config"] is not None:
+            reply = geminidataanalytics.SystemMessage(
+                chart=geminidataanalytics.ChartMessage(
+                    result=geminidataanalytics.ChartResult(
+                        vega_config=exchange["vega_config"])))
+        else:
+            reply = geminidataanalytics.SystemMessage(
+                text=geminidataanalytics.TextMessage(
+                    parts=[exchange["answer"]]))
+        messages.append(geminidataanalytics.Message(system_message=reply))
+    messages.append(geminidataanalytics.Message(
+        user_message=geminidataanalytics.UserMessage(text=question)))
+    return messages
+
+
+def record_chat(state, messages: list) -> None:
+    """
+      Counts the questions which reached the conversation with a chat.
+
+      Args:
+          state: State of the session
+          messages: Messages of the chat, made by `chat_messages`
+    """
+    replayed = (len(messages) - 1) // 2
+    context = state.get(CONVERSATION_CONTEXT, [])[replayed:]
+    if context:
+        state[CONVERSATION_CONTEXT] = context
+    else:
+        state.pop(CONVERSATION_CONTEXT, None)
+    state[CONVERSATION_QUESTIONS] = \
+        state.get(CONVERSATION_QUESTIONS, 0) + replayed + 1
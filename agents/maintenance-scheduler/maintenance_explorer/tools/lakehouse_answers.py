@@ -0,0 +1,191 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Bounded answers of the Conversational Analytics data agent.
+
+A chat with the data agent streams schema dumps, thoughts, progress
+messages, the generated SQL, data tables and, last, the final answer. Only
+the final answer, the SQL and the last data table are passed back to the
+model, the table with typed values and at most `max_rows` rows.
+
+What is kept is bounded by `max_bytes` while the stream is consumed, so the
+memory of a large answer doesn't grow with its size. When the final answer
+arrives, rows are dropped from the table to keep the answer within the
+budget, and the answer text itself is truncated as a last resort. Everything
+dropped is counted and reported with the answer.
+"""
+
+import json
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from google.cloud import geminidataanalytics
+
+_TEXT_TYPES = geminidataanalytics.TextMessage.TextType
+
+# Text kept as the answer, messages of other types are dropped
+_ANSWER_TEXT_TYPES = (_TEXT_TYPES.FINAL_RESPONSE,
+                      _TEXT_TYPES.TEXT_TYPE_UNSPECIFIED)
+
+_INTEGER_TYPES = {"INTEGER", "INT64"}
+_FLOAT_TYPES = {"FLOAT", "FLOAT64", "NUMERIC", "BIGNUMERIC", "DECIMAL"}
+_BOOLEAN_TYPES = {"BOOLEAN", "BOOL"}
+
+
+def _size(value: Any) -> int:
+    return len(json.dumps(value, default=str).encode("utf-8"))
+
+
+def typed_value(value: Any, field_type: str) -> Any:
+    """
+      Converts a table value to the type of its column.
+
+      Tables are streamed as protobuf structs, which only have float and
+      string values. Values which don't convert are returned unchanged.
+    """
+    if value is None:
+        return None
+    field_type = field_type.upper()
+    try:
+        if field_type in _INTEGER_TYPES:
+            return int(float(value)) if isinstance(value, float) \
+                else int(value)
+        if field_type in _FLOAT_TYPES:
+            return float(value)
+        if field_type in _BOOLEAN_TYPES and isinstance(value, str):
+            return value.lower() == "true"
+    except (TypeError, ValueError):
+        return value
+    return value
+
+
+class LakehouseAnswer:
+    """
+      Consumes the messages of a data agent chat, keeping a bounded answer.
+
+      Args:
+          max_rows: Number of rows kept of the data table
+          max_bytes: Size of the answer as JSON, text, SQL and rows together
+    """
+
+    def __init__(self, max_rows: int, max_bytes: int):
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.text_parts: List[str] = []
+        self.sql: Optional[str] = None
+        self.errors: List[str] = []
+        self.table_name: Optional[str] = None
+        self.columns: List[Dict[str, str]] = []
+        self.rows: List[Dict[str, Any]] = []
+        self.total_rows = 0
+        self.dropped: Counter = Counter()
+        self._text_bytes = 0
+        self._rows_bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._text_bytes + self._rows_bytes \
+            + _size(self.sql) + _size(self.errors)
+
+    def add(self, message: geminidataanalytics.Message) -> None:
+        """Keeps what the answer needs of a streamed message."""
+        system_message = message.system_message
+        kind = type(system_message).pb(system_message).WhichOneof("kind")
+        if kind == "text":
+            self._add_text(system_message.text)
+        elif kind == "data":
+            self._add_data(system_message.data)
+        elif kind == "error":
+            self.errors.append(system_message.error.text)
+        elif kind is not None:
+            # Schemas, analyses, charts and example queries
+            self.dropped[f"{kind}_messages"] += 1
+
+    def _add_text(self, text: geminidataanalytics.TextMessage) -> None:
+        if text.text_type not in _ANSWER_TEXT_TYPES:
+            self.dropped[f"{text.text_type.name.lower()}_messages"] += 1
+            return
+        for part in text.parts:
+            size = _size(part)
+            if self._text_bytes + size > self.max_bytes:
+                self.dropped["text_parts"] += 1
+                continue
+            self.text_parts.append(part)
+            self._text_bytes += size
+
+    def _add_data(self, data: geminidataanalytics.DataMessage) -> None:
+        kind = type(data).pb(data).WhichOneof("kind")
+        if kind == "generated_sql":
+            self.sql = data.generated_sql
+            return
+        if kind != "result":
+            # Data queries and BigQuery jobs
+            self.dropped["data_messages"] += 1
+            return
+        if self.columns or self.rows:
+            # Only the last table is kept, it answers the question
+            self.dropped["tables"] += 1
+        result = data.result
+        self.table_name = result.name or None
+        self.columns = [{"name": field.name, "type": field.type_}
+                        for field in result.schema.fields]
+        types = {column["name"]: column["type"] for column in self.columns}
+        self.rows = []
+        self._rows_bytes = 0
+        self.total_rows = len(result.data)
+        for row in result.data:
+            if len(self.rows) >= self.max_rows:
+                break
+            typed_row = {name: typed_value(value, types.get(name, ""))
+                         for name, value in row.items()}
+            size = _size(typed_row)
+            if self.size_bytes + size > self.max_bytes:
+                break
+            self.rows.append(typed_row)
+            self._rows_bytes += size
+
+    def _fit_budget(self) -> None:
+        """Drops rows, then text, until the answer fits the budget."""
+        while self.rows and self.size_bytes > self.max_bytes:
+            self._rows_bytes -= _size(self.rows.pop())
+        while self.text_parts and self.size_bytes > self.max_bytes:
+            self._text_bytes -= _size(self.text_parts.pop())
+            self.dropped["text_parts"] += 1
+
+    def to_response(self) -> Dict[str, Any]:
+        """The answer as returned to the model."""
+        self._fit_budget()
+        response: Dict[str, Any] = {
+            "status": "error" if self.errors and not self.text_parts
+            else "success",
+            "answer": "".join(self.text_parts),
+        }
+        if self.errors:
+            response["message"] = " ".join(self.errors)
+        if self.sql:
+            response["sql"] = self.sql
+        if self.columns:
+            response["table"] = {
+                "name": self.table_name,
+                "columns": self.columns,
+                "rows": self.rows,
+                "total_rows": self.total_rows,
+                "truncated": len(self.rows) < self.total_rows,
+            }
+        dropped = dict(self.dropped)
+        if self.total_rows > len(self.rows):
+            dropped["rows"] = self.total_rows - len(self.rows)
+        if dropped:
+            response["dropped"] = dropped
+        return response
@@ -2,117 +2,163 @@ import datetime
 import logging
 import os
 import re
-from ..config import Config
+from ..config import get_config
 from google.protobuf.json_format import MessageToDict
-import altair as alt
-import proto
+from proto.marshal.collections import MapComposite, RepeatedComposite
 from google.adk.tools import FunctionTool, ToolContext
 from google.genai import types
-from google.cloud import storage
 import io
 from google.adk.tools import FunctionTool, ToolContext
 from google.cloud import geminidataanalytics
 from google.genai.types import Part, Blob
-import altair as alt
 from io import BytesIO
 from typing import Dict, Any
 from google.cloud import geminidataanalytics
+from .clients import get_client_registry, get_image_preview_service
+from .chart_renderer import ChartRenderer, FILE_EXTENSIONS, OUTPUT_FORMATS, PNG
+from .answer_cache import AnswerCache, table_versions
+from .conversations import chat_messages, ensure_conversation, \
+    is_follow_up, record_chat, remember_cached_answer
+from .lakehouse_answers import LakehouseAnswer
 
 logger = logging.getLogger(__name__)
-data_chat_client = geminidataanalytics.DataChatServiceClient()
-configs = Config()
+configs = get_config()
+
+chart_renderer = ChartRenderer(
+    max_workers=configs.chart_render_workers,
+    max_entries=configs.chart_cache_max_entries,
+    preview_scale=configs.chart_preview_scale)
+
+answer_cache = AnswerCache(
+    lambda: table_versions(
+        get_client_registry().bigquery(
+            project=configs.get_bigquery_run_project()),
+        f"{configs.get_bigquery_data_project()}.{configs.BQ_DATASET}"),
+    max_entries=configs.answer_cache_max_entries,
+    version_check_secs=configs.answer_cache_version_check_secs)
+
+
+def _answer_cache_key(kind: str, question: str,
+                      state: Dict[str, Any]) -> tuple:
+    """
+      Cache key of a question asked in the conversation of the session.
+
+      Only the first question of a conversation is shared by all sessions,
+      follow-up questions are keyed by their conversation.
+    """
+    return answer_cache.key(
+        kind, state["agent_name"], question,
+        conversation_name=state["conversation_name"]
+        if is_follow_up(state) else "")
+
+
+def _convert_proto(value):
+    """Converts the protobuf maps and lists of a chart spec to Python values."""
+    if isinstance(value, MapComposite):
+        return {key: _convert_proto(item) for key, item in value.items()}
+    if isinstance(value, RepeatedComposite):
+        return [_convert_proto(item) for item in value]
+    if value is None or isinstance(value, (int, float, str, bool)):
+        return value
+    return MessageToDict(value)
+
+
+async def _query_chart_spec(question: str,
+                            state: Dict[str, Any]) -> Dict[str, Any] | None:
+    """Asks the data agent for a chart, returning its Vega-Lite spec."""
+    # The cached answers of the session are sent before the question
+    input_message = chat_messages(state, question)
+
+    # Ensure 'agent_parent' is available in context (e.g., from agent setup)
+    parent_name = state["agent_parent"]
+    data_agent_id = state["agent_name"]
+    conversation_id = state["conversation_name"]
+    # The conversation is created by the first chat of the session
+    await ensure_conversation(state)
+
+    # Create a conversation_reference
+    conversation_reference = geminidataanalytics.ConversationReference()
+    conversation_reference.conversation = conversation_id
+    conversation_reference.data_agent_context.data_agent = data_agent_id
+
+    client = get_client_registry().data_chat_async()
+    request = geminidataanalytics.ChatRequest(
+        messages=input_message,
+        parent=parent_name,
+        conversation_reference=conversation_reference,
+    )
+    stream = await client.chat(request=request)
+
+    vega_config = None
+    try:
+        async for reply in stream:
+            if "chart" in reply.system_message \
+                    and "result" in reply.system_message.chart:
+                vega_config = _convert_proto(
+                    reply.system_message.chart.result.vega_config)
+                break
+        # The question and the cached answers sent with it are now part of
+        # the conversation
+        record_chat(state, input_message)
+    finally:
+        # The messages after the chart, e.g. its textual summary, are not
+        # needed, so the exchange is cancelled instead of drained
+        stream.cancel()
+    return vega_config
 
 
-# Define the ADK Function Tool (Must be async since client.chat streams)
 async def query_and_save_chart(
     question: str,
-    tool_context: ToolContext
+    tool_context: ToolContext,
+    output_format: str = PNG
 ) -> Dict[str, Any]:
     """
     Queries the Conversational Analytics API, extracts chart data (Vega-Lite), 
-    renders it as a PNG, and saves the image to ADK artifact storage.
+    renders it as an image, and saves the image to ADK artifact storage.
+
+    Args:
+        question: Question answered by the chart
+        output_format: Optional. "png" for a full size PNG, "svg" for an SVG
+          or "png_preview" for a downscaled PNG when only a preview is needed
     """
+    if output_format not in OUTPUT_FORMATS:
+        return {"status": "error", "message": f"Unknown output format '{output_format}'. Use one of {OUTPUT_FORMATS}"}
     try:
-        # --- 1. Your Existing API Call Logic ---
-        input_message = [geminidataanalytics.Message(
-            user_message=geminidataanalytics.UserMessage(text=question)
-        )]
-        
-        # Ensure 'agent_parent' is available in context (e.g., from agent setup)
-        parent_name = tool_context.state["agent_parent"]
-        data_agent_id = tool_context.state["agent_name"]
-        
-        billing_project =configs.CLOUD_PROJECT
-        location = configs.CLOUD_LOCATION
-        conversation_id= tool_context.state["conversation_name"]
-
-        # Create a conversation_reference
-        conversation_reference = geminidataanalytics.ConversationReference()
-        conversation_reference.conversation = conversation_id
-        conversation_reference.data_agent_context.data_agent = data_agent_id
-
-        client = geminidataanalytics.DataChatServiceClient()
-        request = geminidataanalytics.ChatRequest(
-            messages=input_message,
-            parent=parent_name,
-            conversation_reference=conversation_reference, # messages field expects a list
-        )
-        # Use a synchronous client.chat call within an async function
-        stream = client.chat(request=request)
-
-        chart_data = None
-        # --- 2. Process the Streaming Response ---
-        for reply in stream:
-            if reply.system_message and reply.system_message.chart:
-                if "result" in reply.system_message.chart:
-                    # --- 3. Extract and Render the Chart ---
-                    # Function to safely convert protobuf map/composite types to Python dicts
-                    def _convert_proto(v):
-                        if isinstance(v, proto.marshal.collections.maps.MapComposite):
-                            return {k: _convert_proto(v) for k, v in v.items()}
-                        elif isinstance(v, proto.marshal.collections.RepeatedComposite):
-                            return [_convert_proto(el) for el in v]
-                        elif isinstance(v, (int, float, str, bool)):
-                            return v
-                        else:
-                            return MessageToDict(v)
-
-                    # Extract the Vega-Lite specification
-                    vega_config = _convert_proto(reply.system_message.chart.result.vega_config)
-                    
-                    # Use Altair to create the chart object from the Vega-Lite spec
-                    chart = alt.Chart.from_dict(vega_config)
-
-                    # Save the chart as a PNG to an in-memory buffer
-                    buffer = BytesIO()
-                    chart.save(buffer, format='png')
-                    buffer.seek(0)
-                    chart.display()
-
-                    # --- 4. Save the PNG to ADK Artifacts ---
-                    # Create the ADK Part object for binary data
-                    chart_artifact = Part(
-                        inline_data=Blob(
-                            mime_type="image/png",
-                            data=buffer.read()
-                        )
-                    )
-                    filename = f"analytics_chart.png"                    
-                    # Save the artifact using the ToolContext (must use await)
-                    version = await tool_context.save_artifact(
-                        filename=filename,
-                        artifact=chart_artifact
-                    )
-                    # --- 5. Return the Result ---
-                    return {
-                        "status": "success",
-                        "message": "Chart successfully generated and saved to session artifacts.",
-                        "filename": filename,
-                        "version": version
-                    }
+        # The chart of a question is reused until the data changes
+        cache_key = _answer_cache_key("chart", question, tool_context.state)
+        data_version = await answer_cache.data_version()
+        vega_config = answer_cache.get(cache_key, data_version)
+        cached = vega_config is not None
+        if not cached:
+            vega_config = await _query_chart_spec(question, tool_context.state)
+            if vega_config is None:
+                return {"status": "warning", "message": "Query successful, but no chart data was returned by the API."}
+            answer_cache.put(cache_key, data_version, vega_config)
+        else:
+            remember_cached_answer(tool_context.state, question,
+                                   vega_config=vega_config)
 
-        
-        return {"status": "warning", "message": "Query successful, but no chart data was returned by the API."}
+        # Render the chart on the worker processes, or reuse the image of
+        # the same spec
+        chart = await chart_renderer.render(vega_config, output_format)
+        chart_artifact = Part(
+            inline_data=Blob(
+                mime_type=chart.mime_type,
+                data=chart.data
+            )
+        )
+        filename = f"analytics_chart.{FILE_EXTENSIONS[output_format]}"
+        version = await tool_context.save_artifact(
+            filename=filename,
+            artifact=chart_artifact
+        )
+        return {
+            "status": "success",
+            "message": "Chart successfully generated and saved to session artifacts.",
+            "filename": filename,
+            "version": version,
+            "cached": cached
+        }
 
     except Exception as e:
         logger.error(f"An error occurred during chart processing: {e}")
@@ -125,15 +171,32 @@ analytics_chart_tool = FunctionTool(func=query_and_save_chart)
 async def  ask_lakehouse(
     question: str,
     tool_context: ToolContext,
-) -> str:
-    
-    messages = [geminidataanalytics.Message()]
-    messages[0].user_message.text = question
+) -> Dict[str, Any]:
+    """
+    Asks the Conversational Analytics data agent a question about the
+    bus stops, incidents and ridership.
 
+    Returns the final answer, the SQL query which answered it and the data
+    table of the query, with at most a limited number of rows.
+    """
     agent_name = tool_context.state["agent_name"] 
     conversation_name = tool_context.state["conversation_name"]
     parent = tool_context.state["agent_parent"]
 
+    # The answer to a question is reused until the data changes
+    cache_key = _answer_cache_key("answer", question, tool_context.state)
+    data_version = await answer_cache.data_version()
+    cached = answer_cache.get(cache_key, data_version)
+    if cached is not None:
+        remember_cached_answer(tool_context.state, question,
+                               answer=cached["answer"])
+        return {**cached, "cached": True}
+
+    # The conversation is created by the first chat of the session
+    await ensure_conversation(tool_context.state)
+    # The cached answers of the session are sent before the question
+    messages = chat_messages(tool_context.state, question)
+
     billing_project =configs.CLOUD_PROJECT
     # Create a conversation_reference
     conversation_reference = geminidataanalytics.ConversationReference()
@@ -147,57 +210,59 @@ async def  ask_lakehouse(
         conversation_reference = conversation_reference
     )
 
-    # Make the request
-    stream = data_chat_client.chat(request=request)
-    # Handle the response
-    responses = []
-    for response in stream:
-        responses.append(str(response.system_message))
-    
-    return responses
+    # Make the request, keeping only the answer, the SQL and a bounded
+    # table of the streamed messages
+    answer = LakehouseAnswer(max_rows=configs.lakehouse_answer_max_rows,
+                             max_bytes=configs.lakehouse_answer_max_bytes)
+    stream = await get_client_registry().data_chat_async().chat(
+        request=request)
+    async for response in stream:
+        answer.add(response)
+    # The question and the cached answers sent with it are now part of the
+    # conversation
+    record_chat(tool_context.state, messages)
 
+    response = answer.to_response()
+    if response["status"] == "success":
+        answer_cache.put(cache_key, data_version, response)
+    return {**response, "cached": False}
 
-# Initialize GCS client (Authenticates using Application Default Credentials)
-gcs_client = storage.Client()
 
 async def save_image_from_gcs(
     gs_uri: str, 
-    tool_context: ToolContext ) -> dict:
+    tool_context: ToolContext,
+    preview: bool = True) -> dict:
     """
-    1. Reads image data from GCS.
+    1. Reads image data from GCS, as a downscaled preview by default.
     2. Saves the image data as an ADK artifact.
+
+    Args:
+        gs_uri: gs:// URI of the image
+        preview: Optional. False saves the image at its full resolution,
+          only when the details of the image are needed
     """
     try:
-        # 1. Download the image blob from GCS
+        # 1. Download the image with a single request, or reuse the image
+        # and the preview made by any session of the process
         logger.info(f"Attempting to download {gs_uri} from GCS bucket...")
-        if not gs_uri.startswith("gs://"):
-                raise ValueError("Invalid GCS URI format. Must start with 'gs://'")
-            # Remove the "gs://" prefix
-        path_without_prefix = gs_uri[len("gs://"):]
-                # Split the path into bucket and object parts
-        parts = path_without_prefix.split("/", 1)
-        if len(parts) < 2:
-                raise ValueError("Invalid GCS URI format. Must include bucket and object.")
-        bucket_name = parts[0]
-        image_name = parts[1]
-        file_name= os.path.basename(gs_uri)
-        gcs_bucket = gcs_client.bucket(bucket_name)
-        gcs_blob = gcs_bucket.blob(image_name)
-
-        if not gcs_blob.exists():
+        images = get_image_preview_service()
+        image = await (images.preview(gs_uri) if preview
+                       else images.original(gs_uri))
+        if image is None:
             return {
                 "status": "error",
-                "message": f"Error: GCS object gs://{bucket_name}/{image_name} not found."
+                "message": f"Error: GCS object {gs_uri} not found."
             }
-
-        # Download the content bytes
-        image_bytes = gcs_blob.download_as_bytes()
-        logger.info(f"Successfully downloaded {len(image_bytes)} bytes.")
+        logger.info(f"Loaded {len(image.data)} bytes, cached: {image.cached}.")
+        file_name = os.path.basename(gs_uri)
+        if preview:
+            file_name = f"{os.path.splitext(file_name)[0]}_preview." \
+                f"{image.mime_type.split('/')[1]}"
 
         # 2. Create a types.Part object for the artifact
         image_artifact_part = types.Part.from_bytes(
-            data=image_bytes,
-            mime_type="image/jpg"
+            data=image.data,
+            mime_type=image.mime_type
         )
 
         # 3. Save the Part to the ADK Artifact Service
@@ -211,7 +276,10 @@ async def save_image_from_gcs(
         return {
             "status": "success",
             "message": f"Image '{file_name}' saved to Artifact Service (Version {version}).",
-            "image_filename": file_name # This name will be displayed in the UI
+            "image_filename": file_name, # This name will be displayed in the UI
+            "mime_type": image.mime_type,
+            "width": image.width,
+            "height": image.height
         }
 
     except Exception as e:
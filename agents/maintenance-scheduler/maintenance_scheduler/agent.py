@@ -23,25 +23,28 @@ from google.adk.planners import BuiltInPlanner
 from google.genai import types
 from google.genai.types import ThinkingConfig, HttpRetryOptions
 
-from .config import Config
+from .config import get_config
 from .prompts import GLOBAL_INSTRUCTION, INSTRUCTION, AUTONOMOUS_INSTRUCTIONS, \
     INTERACTIVE_INSTRUCTIONS
 from .shared_libraries.callbacks import (
     rate_limit_callback,
+    record_token_usage_callback,
     after_tool,
+    before_tool,
+    flush_scheduling_queue,
 )
-from .tools.email_content_generator import email_content_generator_tool
+from .tools.email_content_generator import email_content_generator_tool, \
+    generate_notification_emails_tool
 from .tools.tools import (
-    get_unresolved_incidents_tool,
-    get_expected_number_of_passengers_tool,
-    schedule_maintenance_tool,
+    get_data_tools,
+    find_maintenance_windows_tool,
     get_current_time,
     is_time_on_weekend
 )
 
 warnings.filterwarnings("ignore", category=UserWarning, module=".*pydantic.*")
 
-configs = Config()
+configs = get_config()
 
 # configure logging __name__
 logger = logging.getLogger(__name__)
@@ -84,13 +87,16 @@ root_agent = Agent(
     planner=BuiltInPlanner(
         thinking_config=ThinkingConfig(include_thoughts=configs.show_thoughts)),
     tools=[
-        get_unresolved_incidents_tool,
-        get_expected_number_of_passengers_tool,
-        schedule_maintenance_tool,
+        *get_data_tools(),
+        find_maintenance_windows_tool,
         get_current_time,
         email_content_generator_tool,
+        generate_notification_emails_tool,
         is_time_on_weekend
     ],
+    before_tool_callback=before_tool,
     after_tool_callback=after_tool,
     before_model_callback=rate_limit_callback,
+    after_model_callback=record_token_usage_callback,
+    after_agent_callback=flush_scheduling_queue,
 )
\ No newline at end of file
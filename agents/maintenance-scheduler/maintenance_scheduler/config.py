@@ -16,11 +16,11 @@
 
 import logging
 import os
+from functools import lru_cache
 
 from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
@@ -32,6 +32,15 @@ class AgentModel(BaseModel):
     model: str = Field(description="Model used by the agent")
 
 
+class ModelRateLimit(BaseModel):
+    """Rate limit of a model. 0 disables the limit."""
+
+    requests_per_minute: float = Field(
+        default=0, description="Requests per minute")
+    tokens_per_minute: float = Field(
+        default=0, description="Input and output tokens per minute")
+
+
 class Config(BaseSettings):
     """Configuration settings for the scheduling agent."""
 
@@ -75,8 +84,105 @@ class Config(BaseSettings):
     mcp_toolbox_uri: str | None = Field(default="",
                                         description="URI of the MCP server"
                                         )
+    bigquery_backend: str = Field(
+        default="bigquery",
+        description="'bigquery' runs the queries on BigQuery, 'duckdb' on a local DuckDB database, which requires the 'local' extra")
+    local_bigquery_database: str = Field(
+        default=":memory:",
+        description="Path of the DuckDB database used by the 'duckdb' backend")
+    local_bigquery_schema_dir: str = Field(
+        default="",
+        description="Directory with the table schemas of the 'duckdb' backend, defaults to the Terraform schemas")
+    telemetry_exporter: str = Field(
+        default="log",
+        description="Export of the tool call telemetry: 'log', 'opentelemetry' or 'none'")
+    bigquery_max_concurrent_jobs: int = Field(
+        default=8,
+        description="Maximum number of BigQuery jobs the tools run at the same time")
+    query_cost_estimates: bool = Field(
+        default=False,
+        description="Estimate the bytes processed by the tool queries with a dry run and report them in the tool responses")
+    query_max_bytes_processed: int = Field(
+        default=0,
+        description="Largest estimated number of bytes a tool query may process. Queries above it are rejected, AI.FORECAST calls fall back to the local forecaster. 0 disables the limit")
+    query_cost_cache_max_entries: int = Field(
+        default=256,
+        description="Number of query shapes whose dry-run estimate is cached. 0 disables the cache")
+    incident_cache_ttl_secs: float = Field(
+        default=300,
+        description="How long the list of unresolved incidents is cached. 0 disables the cache")
+    forecast_cache_bucket_minutes: int = Field(
+        default=60,
+        description="Length of the period during which a bus stop forecast is reused. 0 disables the cache")
+    incidents_page_size: int = Field(
+        default=100,
+        description="Default number of incidents returned by get_unresolved_incidents")
+    incidents_max_page_size: int = Field(
+        default=1000,
+        description="Largest number of incidents returned by get_unresolved_incidents")
+    forecast_backend: str = Field(
+        default="bigquery",
+        description="'bigquery' forecasts with AI.FORECAST, 'local' with the local seasonal forecaster")
+    forecast_timeout_secs: float = Field(
+        default=60,
+        description="Timeout of the AI.FORECAST call")
+    local_forecast_fallback: bool = Field(
+        default=True,
+        description="Use the local forecaster if the AI.FORECAST call fails or times out")
+    local_forecast_history_days: int = Field(
+        default=28,
+        description="Days of ridership history used by the local forecaster")
+    forecast_payload_format: str = Field(
+        default="rows",
+        description="Default format of the forecasts: 'rows', 'columnar' or 'columnar_rle'")
+    working_hours_start: int = Field(
+        default=8,
+        description="Hour when the regular working hours start")
+    working_hours_end: int = Field(
+        default=16,
+        description="Hour when the regular working hours end")
+    model_rate_limits: dict[str, ModelRateLimit] = Field(
+        default={},
+        description="Rate limits by model name, shared by all sessions of the process")
+    default_model_rate_limit: ModelRateLimit = Field(
+        default=ModelRateLimit(),
+        description="Rate limit of the models without an entry in model_rate_limits. Set it to the quota of the project")
+    session_requests_per_minute: float = Field(
+        default=10,
+        description="Model requests per minute of a single session, on top of the limits shared by all sessions. 0 disables the limit")
+    http_pool_max_connections: int = Field(
+        default=16,
+        description="Size of the connection pools of the shared BigQuery and Cloud Storage clients")
+    grpc_keepalive_time_ms: int = Field(
+        default=30_000,
+        description="Interval of the keep-alive pings of the shared gRPC channels")
+    email_batch_size: int = Field(
+        default=25,
+        description="Maximum number of notification emails generated by a single model call")
+    email_cache_max_entries: int = Field(
+        default=1000,
+        description="Number of generated notification emails which are cached. 0 disables the cache")
+    schedule_write_behind: bool = Field(
+        default=False,
+        description="Accept maintenance schedules immediately and write them in batches in the background")
+    schedule_queue_max_batch_size: int = Field(
+        default=20,
+        description="Number of accepted schedules which triggers a batched write")
+    schedule_queue_max_delay_secs: float = Field(
+        default=5,
+        description="Longest time an accepted schedule waits to be written")
+    schedule_queue_journal_path: str = Field(
+        default="",
+        description="JSONL journal of the accepted schedules, replayed after a restart. Empty disables the journal")
+
     def get_bigquery_data_project(self) -> str:
         return self.CLOUD_BIGQUERY_DATA_PROJECT or self.CLOUD_PROJECT
 
     def get_bigquery_run_project(self) -> str:
         return self.CLOUD_BIGQUERY_RUN_PROJECT or self.CLOUD_PROJECT
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Returns the settings of the agent, which are loaded once per process."""
+    return Config()
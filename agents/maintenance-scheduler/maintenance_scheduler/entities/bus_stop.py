@@ -14,7 +14,9 @@
 
 """Bus stop entity module."""
 
-from pydantic import BaseModel, Field
+from typing import Iterable, List
+
+from pydantic import BaseModel, Field, TypeAdapter
 
 
 class USAddress(BaseModel):
@@ -42,8 +44,31 @@ class BusStopIncident(BaseModel):
       Represents an incident with a bus stop.
     """
 
+    incident_id: str = Field(default="", description="Id of the incident")
     bus_stop: BusStop = Field(description="Bus stop")
     incident_image_url: str = Field(description="Image URL")
     incident_image_mime_type: str = Field(description="Image mime")
     status: str = Field(description="Status of the incident")
     description: str = Field(description="Description of the bus stop")
+
+
+incidents_adapter = TypeAdapter(List[BusStopIncident])
+
+
+def incidents_from_records(
+        records: Iterable[dict]) -> List[BusStopIncident]:
+    """
+      Builds incidents from nested records in bulk.
+
+      The records are validated by the precompiled adapter in a single call,
+      which is faster than creating the nested models one at a time.
+
+      Args:
+          records: Dictionaries with the fields of BusStopIncident, the bus
+            stop and its address are nested dictionaries
+
+      Returns:
+          list: List of bus stop incidents
+    """
+    return incidents_adapter.validate_python(
+        records if isinstance(records, list) else list(records))
@@ -0,0 +1,32 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Maintenance entity module."""
+
+from pydantic import BaseModel, Field
+
+
+class MaintenanceSchedule(BaseModel):
+    """
+      Maintenance of a bus stop to be scheduled
+    """
+
+    bus_stop_id: str = Field(description="Id of the bus stop")
+    maintenance_start: str = Field(
+        description="Date and time of the maintenance work")
+    reason: str = Field(
+        description="Explanation why this bus stop and time was selected")
+    notification_subject: str = Field(
+        description="Subject of the email to send to crew supervisor")
+    notification_content: str = Field(
+        description="Text of the email to send to crew supervisor")
@@ -31,7 +31,7 @@ INTERACTIVE_INSTRUCTIONS = """
 AUTONOMOUS_INSTRUCTIONS = """
 *   Assume that you need to schedule work autonomously
 *   Select the best possible solution and execute without confirmation
-*   Schedule one bus stop at a time
+*   When several bus stops are ready to be scheduled, schedule them together using 'schedule_maintenance_batch' tool
 *   Report if more bus stops require maintenance after completing scheduling
 """
 
@@ -52,8 +52,10 @@ INSTRUCTIONS:
   * Use the regular working hours in the city of New York, NY, USA to schedule regular maintenance.
   * Regular working hours are 8:00 AM to 4:00 PM and don't include weekends and holidays.
   * For regular maintenance find the time which affects as fewer passengers as possible.
+  * Use 'find_maintenance_windows' tool to find the best maintenance time. For safety concerns related incidents call it with working_hours_only=False and allow_weekends=True. When the user gives the hours the crews work, pass them as working_hours_start and working_hours_end.
   * Assume that it takes on average two hours to fix broken glass and three hours to remove graffiti.
   * Round the scheduled time to the nearest hour.
   * Schedule time at least a half an hour in the future.
   * You must use 'email_notification_generator' tool to generate notification content. 
+  * When notifications for several bus stops are needed, generate them all at once using 'generate_notification_emails' tool instead.
 """
\ No newline at end of file
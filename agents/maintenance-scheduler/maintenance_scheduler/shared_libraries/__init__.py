@@ -13,6 +13,9 @@
 # limitations under the License.
 """ includes all shared libraries for the agent."""
 from .callbacks import after_tool
+from .callbacks import before_tool
 from .callbacks import rate_limit_callback
+from .callbacks import record_token_usage_callback
 
-__all__ = ["rate_limit_callback", "after_tool"]
+__all__ = ["rate_limit_callback", "record_token_usage_callback", "after_tool",
+           "before_tool"]
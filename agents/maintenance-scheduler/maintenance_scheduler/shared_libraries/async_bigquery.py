@@ -0,0 +1,105 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Non-blocking BigQuery job execution for the agent tools."""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+from maintenance_scheduler.shared_libraries import telemetry
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBigQueryClient:
+    """
+      Runs blocking BigQuery client calls on a bounded thread pool.
+
+      A single Agent Engine replica serves several sessions on one event loop.
+      The BigQuery client only offers blocking calls, so each call is handed
+      to a worker thread and awaited. The pool size caps the number of jobs
+      which run at the same time; additional calls wait for a free worker.
+
+      The client is created by `client_factory` on the first call, so
+      importing the tools doesn't require credentials or network access.
+
+      The job statistics of every query are attributed to the tool call
+      which runs it.
+    """
+
+    def __init__(self, client_factory: Callable[[], Any],
+                 max_concurrent_jobs: int):
+        self._client_factory = client_factory
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_jobs,
+            thread_name_prefix="bigquery-tools")
+
+    @property
+    def client(self) -> Any:
+        return self._client_factory()
+
+    async def query_and_wait(
+        self,
+        process_rows: Callable[[Iterable], Any] = list,
+        **kwargs
+    ) -> Any:
+        """
+          Runs `query_and_wait` without blocking the event loop.
+
+          Args:
+              process_rows: Function applied to the row iterator in the worker
+                thread. Fetching additional result pages is blocking as well,
+                so by default all rows are materialized into a list.
+              **kwargs: Arguments of `bigquery.Client.query_and_wait`
+
+          Returns:
+              The result of `process_rows`.
+        """
+
+        def run_query():
+            start = time.perf_counter()
+            rows = self.client.query_and_wait(**kwargs)
+            result = process_rows(rows)
+            return result, telemetry.query_stats(
+                rows, (time.perf_counter() - start) * 1000)
+
+        loop = asyncio.get_running_loop()
+        result, stats = await loop.run_in_executor(self._executor, run_query)
+        telemetry.record_query(stats)
+        return result
+
+    async def dry_run(self, query: str, query_parameters: Sequence[Any] = (),
+                      project: Optional[str] = None) -> int:
+        """
+          Dry-runs a query without blocking the event loop.
+
+          Returns:
+              The number of bytes the query would process.
+        """
+        from google.cloud.bigquery import QueryJobConfig
+
+        def run_dry_run():
+            job = self.client.query(
+                query,
+                job_config=QueryJobConfig(
+                    dry_run=True, use_query_cache=False,
+                    query_parameters=list(query_parameters)),
+                project=project)
+            return job.total_bytes_processed or 0
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, run_dry_run)
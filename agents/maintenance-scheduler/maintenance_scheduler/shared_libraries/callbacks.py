@@ -15,28 +15,53 @@
 """Callback functions for Maintenance Scheduling Agent."""
 
 import logging
-import time
 from typing import Any, Dict, Optional
 
 from google.adk.agents.callback_context import CallbackContext
-from google.adk.models import LlmRequest
+from google.adk.models import LlmRequest, LlmResponse
 from google.adk.tools import BaseTool, ToolContext
-from google.genai.types import Part, FileData
 
-from maintenance_scheduler.entities.bus_stop import BusStopIncident
+from maintenance_scheduler.config import get_config
+from maintenance_scheduler.shared_libraries.rate_limiter import \
+    RateLimiterRegistry, SessionRateLimiter
+from maintenance_scheduler.shared_libraries.telemetry import ToolTelemetry, \
+    create_sink
+from maintenance_scheduler.tools import tools
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
-RATE_LIMIT_SECS = 60
-RPM_QUOTA = 10
+SCHEDULE_RESULTS_STATE_KEY = "maintenance_schedule_results"
+# Not persisted in the session
+RATE_LIMITED_MODEL_STATE_KEY = "temp:rate_limited_model"
+ESTIMATED_TOKENS_STATE_KEY = "temp:rate_limit_estimated_tokens"
+SESSION_RATE_LIMIT_STATE_KEY = "rate_limit_session_requests"
+CHARACTERS_PER_TOKEN = 4
+# Tokens of an image or another file in the request
+FILE_TOKENS = 258
 
+configs = get_config()
 
-def rate_limit_callback(
+tool_telemetry = ToolTelemetry(create_sink(configs.telemetry_exporter))
+
+rate_limiters = RateLimiterRegistry(
+    limits=configs.model_rate_limits,
+    default_limit=configs.default_model_rate_limit)
+
+session_rate_limiter = SessionRateLimiter(
+    requests_per_minute=configs.session_requests_per_minute,
+    state_key=SESSION_RATE_LIMIT_STATE_KEY)
+
+
+async def rate_limit_callback(
     callback_context: CallbackContext, llm_request: LlmRequest
 ) -> None:
     """Callback function that implements a query rate limit.
 
+    The requests of a session are limited first, then the requests and
+    tokens per minute of each model across all sessions of the process. The
+    request waits without blocking the other sessions.
+
     Args:
       callback_context: A CallbackContext obj representing the active callback
         context.
@@ -47,38 +72,56 @@ def rate_limit_callback(
             if part.text == "":
                 part.text = " "
 
-    now = time.time()
-    if "timer_start" not in callback_context.state:
-        callback_context.state["timer_start"] = now
-        callback_context.state["request_count"] = 1
-        logger.debug(
-            "rate_limit_callback [timestamp: %i, "
-            "req_count: 1, elapsed_secs: 0]",
-            now,
-        )
-        return
-
-    request_count = callback_context.state["request_count"] + 1
-    elapsed_secs = now - callback_context.state["timer_start"]
+    wait_secs = await session_rate_limiter.acquire(callback_context.state)
+    estimated_tokens = estimate_tokens(llm_request)
+    limiter = rate_limiters.get(llm_request.model)
+    wait_secs += await limiter.acquire(estimated_tokens)
+    callback_context.state[RATE_LIMITED_MODEL_STATE_KEY] = llm_request.model
+    callback_context.state[ESTIMATED_TOKENS_STATE_KEY] = estimated_tokens
     logger.debug(
-        "rate_limit_callback [timestamp: %i, request_count: %i,"
-        " elapsed_secs: %i]",
-        now,
-        request_count,
-        elapsed_secs,
-    )
-
-    if request_count > RPM_QUOTA:
-        delay = RATE_LIMIT_SECS - elapsed_secs + 1
-        if delay > 0:
-            logger.debug("Sleeping for %i seconds", delay)
-            time.sleep(delay)
-        callback_context.state["timer_start"] = now
-        callback_context.state["request_count"] = 1
-    else:
-        callback_context.state["request_count"] = request_count
+        "rate_limit_callback [model: %s, estimated_tokens: %i, "
+        "wait_secs: %.1f, stats: %s]",
+        llm_request.model, estimated_tokens, wait_secs, limiter.stats())
+    return None
+
+
+def record_token_usage_callback(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> None:
+    """Corrects the token estimate of rate_limit_callback with the usage.
+
+    Args:
+      callback_context: A CallbackContext obj representing the active callback
+        context.
+      llm_response: A LlmResponse obj representing the LLM response.
+    """
+    usage = llm_response.usage_metadata
+    if usage is None or not usage.total_token_count:
+        return None
+    if RATE_LIMITED_MODEL_STATE_KEY not in callback_context.state:
+        return None
+    rate_limiters.get(
+        callback_context.state[RATE_LIMITED_MODEL_STATE_KEY]).record_usage(
+        callback_context.state.get(ESTIMATED_TOKENS_STATE_KEY, 0),
+        usage.total_token_count)
+    return None
 
-    return
+
+def estimate_tokens(llm_request: LlmRequest) -> int:
+    """Estimates the number of input tokens of a request."""
+    characters = 0
+    files = 0
+    for content in llm_request.contents:
+        for part in content.parts or []:
+            if part.text:
+                characters += len(part.text)
+            elif part.file_data or part.inline_data:
+                files += 1
+    system_instruction = llm_request.config.system_instruction \
+        if llm_request.config else None
+    if isinstance(system_instruction, str):
+        characters += len(system_instruction)
+    return characters // CHARACTERS_PER_TOKEN + files * FILE_TOKENS
 
 
 def lowercase_value(value):
@@ -94,21 +137,53 @@ def lowercase_value(value):
         return value
 
 
+def before_tool(
+    tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext
+) -> Optional[Dict]:
+    """Starts the telemetry of a tool call."""
+    logger.info("Before tool: " + tool.name)
+    tool_telemetry.start(tool.name,
+                         function_call_id=tool_context.function_call_id or "",
+                         invocation_id=tool_context.invocation_id)
+    return None
+
+
 def after_tool(
     tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext,
     tool_response: Dict
 ) -> Optional[Dict]:
-    logger.info("After tool: " + tool.name)
-    # Temporarily disabled as artifacts don't work with references.
-    if tool.name == "get_unresolved_incidents" and False:
-        logger.info(f"Tool response: {tool_response}")
-        incident: BusStopIncident
-        for incident in tool_response:
-            logger.info("Adding artifact: " + incident.bus_stop.id)
-            tool_context.save_artifact(
-                filename="image-" + incident.bus_stop.id,
-                artifact=Part(
-                    file_data=FileData(file_uri=incident.source_image_uri,
-                                       mime_type=incident.source_image_mime_type))
-            )
+    """Finishes and exports the telemetry of a tool call."""
+    tool_call = tool_telemetry.finish(tool_context.function_call_id or "",
+                                      tool_response)
+    if tool_call is not None:
+        logger.info(
+            "After tool: %s [wall_time_ms: %.1f, queries: %i, "
+            "query_time_ms: %.1f, response_bytes: %i]", tool.name,
+            tool_call.wall_time_ms, len(tool_call.queries),
+            tool_call.query_time_ms, tool_call.response_bytes)
+    return None
+
+
+async def flush_scheduling_queue(
+    callback_context: CallbackContext
+) -> None:
+    """Writes the accepted maintenance schedules at the end of an invocation.
+
+    The status of each bus stop scheduled during the invocation is stored in
+    the session state under SCHEDULE_RESULTS_STATE_KEY.
+
+    Args:
+      callback_context: A CallbackContext obj representing the active callback
+        context.
+    """
+    if not tools.config.schedule_write_behind:
+        return None
+    await tools.scheduling_queue.flush()
+    results = tools.scheduling_queue.pop_results(
+        callback_context.invocation_id)
+    if results:
+        logger.info("Maintenance schedule results: %s", results)
+        callback_context.state[SCHEDULE_RESULTS_STATE_KEY] = {
+            **callback_context.state.get(SCHEDULE_RESULTS_STATE_KEY, {}),
+            **results}
     return None
@@ -0,0 +1,30 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Google API clients of the scheduler, shared by its tools."""
+
+from functools import lru_cache
+
+from maintenance_scheduler.config import get_config
+from shared_services.clients import ClientRegistry
+
+
+@lru_cache(maxsize=1)
+def get_client_registry() -> ClientRegistry:
+    """Returns the client registry of the process."""
+    config = get_config()
+    return ClientRegistry(
+        max_pool_connections=config.http_pool_max_connections,
+        keepalive_time_ms=config.grpc_keepalive_time_ms)
@@ -0,0 +1,116 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Process-wide cache of the generated notification emails."""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Tuple
+
+from maintenance_scheduler.entities.notification import Email, \
+    MaintenanceNotification
+
+logger = logging.getLogger(__name__)
+
+
+# Written by the model, the other fields are identifiers and compared as is
+FREE_TEXT_FIELDS = {"schedule_time", "reason", "street", "city", "state"}
+
+
+def notification_key(notification: MaintenanceNotification) -> str:
+    """
+      Cache key of a notification.
+
+      Free text fields are compared after trimming, collapsing whitespace and
+      case folding, so notifications which only differ in formatting share an
+      email. Identifiers such as the bus stop id and the image URI are case
+      sensitive and compared exactly.
+    """
+    normalized = {
+        name: " ".join(str(value).split()).casefold()
+        if name in FREE_TEXT_FIELDS else value
+        for name, value in notification.model_dump().items()}
+    return hashlib.sha256(
+        json.dumps(normalized, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class EmailCache:
+    """
+      Least recently used cache of emails by notification.
+
+      A `max_entries` of 0 disables the cache.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._emails: OrderedDict[str, Email] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get_many(
+        self,
+        notifications: Iterable[MaintenanceNotification]
+    ) -> Tuple[dict[str, Email], List[MaintenanceNotification]]:
+        """
+          Looks up the emails of notifications.
+
+          Returns:
+              The cached emails by notification key and the notifications
+              which need to be generated, without duplicates.
+        """
+        cached = {}
+        missing = {}
+        with self._lock:
+            for notification in notifications:
+                key = notification_key(notification)
+                if key in cached or key in missing:
+                    continue
+                if self.enabled and key in self._emails:
+                    self._emails.move_to_end(key)
+                    cached[key] = self._emails[key]
+                else:
+                    missing[key] = notification
+            self.hits += len(cached)
+            self.misses += len(missing)
+        logger.debug("Email cache hits: %s, misses: %s", len(cached),
+                     len(missing))
+        return cached, list(missing.values())
+
+    def put(self, notification: MaintenanceNotification,
+            email: Email) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            key = notification_key(notification)
+            self._emails[key] = email
+            self._emails.move_to_end(key)
+            while len(self._emails) > self.max_entries:
+                self._emails.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "cached_emails": len(self._emails),
+        }
@@ -0,0 +1,111 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Process-wide cache of the ridership forecasts of individual bus stops."""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Forecast of a single bus stop: (forecast timestamp in UTC, number of riders)
+ForecastPoints = List[Tuple[datetime, int]]
+
+
+class ForecastCache:
+    """
+      Caches forecasts by bus stop and forecast bucket.
+
+      A forecast is reused until the end of the bucket in which it was
+      computed. Only the current bucket is kept, so the cache never holds more
+      than one forecast per bus stop. Bus stops without ridership history are
+      cached as empty forecasts so they are not queried again.
+    """
+
+    def __init__(self, bucket_minutes: int,
+                 clock: Callable[[], float] = time.time):
+        self.bucket_minutes = bucket_minutes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._bucket = None
+        self._forecasts: dict[str, ForecastPoints] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.bucket_minutes > 0
+
+    def current_bucket(self) -> int:
+        if not self.enabled:
+            return 0
+        return int(self._clock() // (self.bucket_minutes * 60))
+
+    def get_many(
+        self,
+        bus_stop_ids: Iterable[str],
+        bucket: int
+    ) -> Tuple[dict[str, ForecastPoints], List[str]]:
+        """
+          Looks up forecasts of the current bucket.
+
+          Returns:
+              The cached forecasts and the list of bus stops which need to be
+              forecasted.
+        """
+        cached = {}
+        missing = []
+        with self._lock:
+            for bus_stop_id in dict.fromkeys(bus_stop_ids):
+                if self.enabled and self._bucket == bucket \
+                        and bus_stop_id in self._forecasts:
+                    cached[bus_stop_id] = self._forecasts[bus_stop_id]
+                else:
+                    missing.append(bus_stop_id)
+            self.hits += len(cached)
+            self.misses += len(missing)
+        logger.debug("Forecast cache hits: %s, misses: %s, stats: %s",
+                     len(cached), len(missing), self.stats())
+        return cached, missing
+
+    def put_many(self, forecasts: dict[str, ForecastPoints],
+                 bus_stop_ids: Iterable[str], bucket: int) -> None:
+        """
+          Stores the forecasts computed for the given bus stops.
+
+          Bus stops which are not present in `forecasts` are stored as empty.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._bucket != bucket:
+                if self._bucket is not None and bucket < self._bucket:
+                    # Result of a query which started before the bucket rolled
+                    return
+                self._bucket = bucket
+                self._forecasts = {}
+            for bus_stop_id in bus_stop_ids:
+                self._forecasts[bus_stop_id] = forecasts.get(bus_stop_id, [])
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "cached_bus_stops": len(self._forecasts),
+        }
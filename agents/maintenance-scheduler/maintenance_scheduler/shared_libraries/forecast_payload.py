@@ -0,0 +1,117 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Formats of the forecasts returned by get_expected_number_of_passengers."""
+
+from datetime import datetime, timedelta, tzinfo
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from maintenance_scheduler.shared_libraries.forecast_cache import \
+    ForecastPoints
+
+TIME_FORMAT = "%m/%d/%Y %H:%M"
+
+ROWS = "rows"
+COLUMNAR = "columnar"
+COLUMNAR_RLE = "columnar_rle"
+PAYLOAD_FORMATS = (ROWS, COLUMNAR, COLUMNAR_RLE)
+
+
+def to_grid(
+    points: ForecastPoints,
+    start: datetime,
+    end: datetime
+) -> Optional[Tuple[datetime, timedelta, np.ndarray]]:
+    """
+      Converts the forecast points between start and end to a regular grid.
+
+      Returns:
+          The time of the first point, the step and the number of riders, or
+          None if there are no points or the points are not equally spaced.
+    """
+    points = [point for point in points if start <= point[0] <= end]
+    if not points:
+        return None
+    first = points[0][0]
+    step = points[1][0] - first if len(points) > 1 else timedelta(minutes=15)
+    if step <= timedelta(0) or any(
+            timestamp != first + step * index
+            for index, (timestamp, _) in enumerate(points)):
+        return None
+    return first, step, np.fromiter((value for _, value in points),
+                                    dtype=np.int64, count=len(points))
+
+
+def rows_payload(points: ForecastPoints, start: datetime, end: datetime,
+                 time_zone: tzinfo) -> List[dict]:
+    """One `{'time', 'number_of_passengers'}` entry per forecast point."""
+    return [
+        {'time': timestamp.astimezone(time_zone).strftime(TIME_FORMAT),
+         'number_of_passengers': number_of_passengers}
+        for timestamp, number_of_passengers in points
+        if start <= timestamp <= end]
+
+
+def columnar_payload(points: ForecastPoints, start: datetime, end: datetime,
+                     time_zone: tzinfo,
+                     run_length_encoding: bool = False) -> Optional[dict]:
+    """
+      Start time, step and the packed number of riders of a bus stop.
+
+      With run length encoding the runs of equal numbers of riders are encoded
+      as `[number_of_passengers, number_of_steps]` pairs, which collapses the
+      periods without riders at night.
+
+      Returns:
+          The payload or None if there are no points in the period. Points
+          which are not equally spaced are returned in the rows format.
+    """
+    grid = to_grid(points, start, end)
+    if grid is None:
+        payload = rows_payload(points, start, end, time_zone)
+        return {"rows": payload} if payload else None
+    first, step, values = grid
+    payload = {
+        "start": first.astimezone(time_zone).strftime(TIME_FORMAT),
+        "step_minutes": int(step.total_seconds() // 60),
+    }
+    if run_length_encoding:
+        payload["number_of_passengers_rle"] = run_length_encode(values)
+    else:
+        payload["number_of_passengers"] = values.tolist()
+    return payload
+
+
+def run_length_encode(values: np.ndarray,
+                      min_run_length: int = 3) -> List[int | List[int]]:
+    """
+      Encodes runs of equal values as [value, run length] pairs.
+
+      Runs shorter than `min_run_length` are kept as individual values, which
+      are shorter than the pairs.
+    """
+    if len(values) == 0:
+        return []
+    run_starts = np.flatnonzero(np.diff(values, prepend=values[0] - 1))
+    run_lengths = np.diff(run_starts, append=len(values))
+    encoded = []
+    for value, run_length in zip(values[run_starts].tolist(),
+                                 run_lengths.tolist()):
+        if run_length >= min_run_length:
+            encoded.append([value, run_length])
+        else:
+            encoded.extend([value] * run_length)
+    return encoded
@@ -0,0 +1,117 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Process-wide cache of the unresolved bus stop incidents."""
+
+import logging
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from maintenance_scheduler.entities.bus_stop import BusStopIncident
+
+logger = logging.getLogger(__name__)
+
+
+class IncidentCache:
+    """
+      Time-bounded cache of the first page of OPEN incidents.
+
+      The cache is shared by all sessions of the process. Scheduling a bus
+      stop removes its incidents from the cached list right away, so a cached
+      list never contains incidents which were already scheduled by this
+      process. Stops scheduled while a query was in flight are remembered for
+      one TTL period and filtered out of the list when it is stored.
+    """
+
+    def __init__(self, ttl_secs: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl_secs = ttl_secs
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._incidents: Optional[List[BusStopIncident]] = None
+        self._next_page_token = ""
+        self._expires_at = 0.0
+        self._recently_scheduled: dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_secs > 0
+
+    def get(self) -> Optional[Tuple[List[BusStopIncident], str]]:
+        """
+          Returns the cached incidents and the token of the next page or None
+          if there is no fresh entry.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            if self._incidents is not None and self._clock() < self._expires_at:
+                self.hits += 1
+                incidents = list(self._incidents), self._next_page_token
+            else:
+                self.misses += 1
+                incidents = None
+        logger.debug("Incident cache %s, stats: %s",
+                     "hit" if incidents is not None else "miss", self.stats())
+        return incidents
+
+    def put(self, incidents: List[BusStopIncident],
+            next_page_token: str = "") -> None:
+        """Stores the result of the incident query."""
+        if not self.enabled:
+            return
+        with self._lock:
+            now = self._clock()
+            self._prune_recently_scheduled(now)
+            self._incidents = [
+                incident for incident in incidents
+                if incident.bus_stop.id not in self._recently_scheduled]
+            self._next_page_token = next_page_token
+            self._expires_at = now + self.ttl_secs
+
+    def mark_scheduled(self, bus_stop_id: str) -> None:
+        """Removes the incidents of a bus stop which is no longer OPEN."""
+        if not self.enabled:
+            return
+        with self._lock:
+            now = self._clock()
+            self._prune_recently_scheduled(now)
+            self._recently_scheduled[bus_stop_id] = now + self.ttl_secs
+            if self._incidents is not None:
+                self._incidents = [
+                    incident for incident in self._incidents
+                    if incident.bus_stop.id != bus_stop_id]
+
+    def _prune_recently_scheduled(self, now: float) -> None:
+        """Forgets the stops scheduled more than one TTL period ago."""
+        self._recently_scheduled = {
+            bus_stop_id: expires_at for bus_stop_id, expires_at in
+            self._recently_scheduled.items() if expires_at > now}
+
+    def invalidate(self) -> None:
+        """Drops the cached incidents."""
+        with self._lock:
+            self._incidents = None
+
+    def stats(self) -> dict:
+        """Hit and miss counters, used to tune the TTL."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
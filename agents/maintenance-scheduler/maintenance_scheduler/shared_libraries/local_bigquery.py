@@ -0,0 +1,405 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local stand-in for BigQuery running the tools' SQL on DuckDB.
+
+The tables of the `bus_stop_image_processing` dataset are created from the
+schemas in `infrastructure/terraform/bigquery-schema`. Queries are written in
+BigQuery SQL, translated to DuckDB SQL and run on an embedded database, so
+the tools can be load tested with realistic data volumes without network
+access. `AI.FORECAST` calls are answered by the local ridership forecaster.
+
+DuckDB and sqlglot are optional dependencies of the `local` extra. The
+module is only imported when the `duckdb` backend is selected.
+"""
+
+import json
+import logging
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+import numpy as np
+import pyarrow
+import pyarrow.compute
+from google.cloud.bigquery import ArrayQueryParameter, QueryJobConfig, \
+    Row, StructQueryParameter
+
+try:
+    import duckdb
+    import sqlglot
+    from sqlglot import exp
+except ImportError as ex:
+    raise ImportError(
+        f"The 'duckdb' BigQuery backend requires {ex.name}, which is "
+        f"installed with the 'local' extra: "
+        f"pip install 'maintenance_scheduler[local]'") from ex
+
+from maintenance_scheduler.config import get_config
+from maintenance_scheduler.shared_libraries.ridership_forecaster import \
+    SeasonalRidershipForecaster
+from maintenance_scheduler.shared_libraries.synthetic_ridership import \
+    generate_ridership_history
+
+logger = logging.getLogger(__name__)
+
+DATASET = "bus_stop_image_processing"
+
+DEFAULT_SCHEMA_DIR = Path(__file__).resolve().parents[4] / \
+    "infrastructure" / "terraform" / "bigquery-schema"
+
+# Tables whose schema file is not named after the table
+SCHEMA_FILES = {
+    "image_reports": "reports.json",
+}
+
+COLUMN_TYPES = {
+    "STRING": "VARCHAR",
+    "INT64": "BIGINT",
+    "INTEGER": "BIGINT",
+    "FLOAT64": "DOUBLE",
+    "FLOAT": "DOUBLE",
+    "NUMERIC": "DECIMAL(38, 9)",
+    "BOOL": "BOOLEAN",
+    "BOOLEAN": "BOOLEAN",
+    "BYTES": "BLOB",
+    "DATE": "DATE",
+    "DATETIME": "TIMESTAMP",
+    "TIME": "TIME",
+    "TIMESTAMP": "TIMESTAMPTZ",
+    "JSON": "VARCHAR",
+    # Stored as WKT, the spatial extension is not available offline
+    "GEOGRAPHY": "VARCHAR",
+}
+
+SYNTHETIC_RIDERSHIP_CHUNK_SIZE = 2_000
+
+DEFAULT_VALUES = {
+    "GENERATE_UUID()": "gen_random_uuid()::VARCHAR",
+    "CURRENT_TIMESTAMP()": "current_timestamp",
+}
+
+
+def column_type(field: dict) -> str:
+    """DuckDB type of a field of a BigQuery JSON schema."""
+    if field["type"] in ("RECORD", "STRUCT"):
+        column = "STRUCT(" + ", ".join(
+            f'"{child["name"]}" {column_type(child)}'
+            for child in field["fields"]) + ")"
+    else:
+        column = COLUMN_TYPES[field["type"]]
+    if field.get("mode") == "REPEATED":
+        column += "[]"
+    return column
+
+
+def create_table_statement(table: str, schema: list[dict]) -> str:
+    """CREATE TABLE statement of a BigQuery JSON schema."""
+    columns = []
+    for field in schema:
+        column = f'"{field["name"]}" {column_type(field)}'
+        if field.get("mode") == "REQUIRED":
+            column += " NOT NULL"
+        if field.get("defaultValueExpression") in DEFAULT_VALUES:
+            column += \
+                f" DEFAULT ({DEFAULT_VALUES[field['defaultValueExpression']]})"
+        columns.append(column)
+    return f'CREATE TABLE IF NOT EXISTS {DATASET}."{table}" ' \
+           f'({", ".join(columns)})'
+
+
+def query_parameters(job_config: Optional[QueryJobConfig]) -> dict:
+    """Converts BigQuery query parameters to DuckDB parameter values."""
+
+    def value(parameter):
+        if isinstance(parameter, StructQueryParameter):
+            return dict(parameter.struct_values)
+        if isinstance(parameter, ArrayQueryParameter):
+            return [value(item) if isinstance(item, StructQueryParameter)
+                    else item for item in parameter.values]
+        return parameter.value
+
+    if job_config is None:
+        return {}
+    return {parameter.name: value(parameter)
+            for parameter in job_config.query_parameters}
+
+
+class LocalRowIterator:
+    """
+      Result of a local query with the interface of a BigQuery RowIterator.
+
+      Rows are returned as `google.cloud.bigquery.Row`, so they can be read
+      by attribute or by key like the rows of a BigQuery result.
+    """
+
+    def __init__(self, table: pyarrow.Table):
+        self._table = table
+
+    @property
+    def total_rows(self) -> int:
+        return self._table.num_rows
+
+    def __iter__(self):
+        field_to_index = {name: index for index, name in
+                          enumerate(self._table.column_names)}
+        columns = [column.to_pylist() for column in self._table.columns]
+        for values in zip(*columns):
+            yield Row(values, field_to_index)
+
+    def to_arrow(self, bqstorage_client=None, **kwargs) -> pyarrow.Table:
+        return self._table
+
+
+class LocalBigQueryClient:
+    """
+      Drop-in replacement of bigquery.Client for the queries of the tools.
+
+      Args:
+          database: Path of the DuckDB database, ":memory:" for a database
+            which only lives as long as the client
+          schema_dir: Directory with the BigQuery JSON schemas of the tables
+          forecaster: Forecaster answering the AI.FORECAST calls
+    """
+
+    def __init__(self, database: str = ":memory:",
+                 schema_dir: Union[str, Path] = DEFAULT_SCHEMA_DIR,
+                 forecaster: Optional[SeasonalRidershipForecaster] = None):
+        self.forecaster = forecaster or SeasonalRidershipForecaster()
+        self._connection = duckdb.connect(database)
+        self._connection.execute("SET TimeZone = 'UTC'")
+        self._connection.execute(f"CREATE SCHEMA IF NOT EXISTS {DATASET}")
+        table_files = {schema_file: table
+                       for table, schema_file in SCHEMA_FILES.items()}
+        for schema_path in sorted(Path(schema_dir).glob("*.json")):
+            table = table_files.get(schema_path.name, schema_path.stem)
+            with open(schema_path, "r", encoding="utf-8") as schema_file:
+                self._connection.execute(
+                    create_table_statement(table, json.load(schema_file)))
+
+    def load_table(self, table: str,
+                   rows: Union[pyarrow.Table, Iterable[dict]]) -> int:
+        """
+          Appends rows to a table of the dataset.
+
+          Columns missing from the rows get their default value.
+
+          Returns:
+              Number of loaded rows
+        """
+        if not isinstance(rows, pyarrow.Table):
+            rows = pyarrow.Table.from_pylist(list(rows))
+        cursor = self._connection.cursor()
+        try:
+            cursor.register("loaded_rows", rows)
+            cursor.execute(f'INSERT INTO {DATASET}."{table}" BY NAME '
+                           f'SELECT * FROM loaded_rows')
+        finally:
+            cursor.close()
+        return rows.num_rows
+
+    def query_and_wait(self, query: str,
+                       job_config: Optional[QueryJobConfig] = None,
+                       project: Optional[str] = None,
+                       **kwargs) -> LocalRowIterator:
+        """
+          Runs a BigQuery query or script.
+
+          Returns:
+              Rows of the last statement
+        """
+        parameters = query_parameters(job_config)
+        # Every query gets its own cursor, queries run in worker threads
+        cursor = self._connection.cursor()
+        try:
+            result = None
+            for statement in sqlglot.parse(query, read="bigquery"):
+                if statement is None:
+                    continue
+                statement = self._replace_forecasts(cursor, statement,
+                                                    parameters)
+                result = self._execute(cursor, statement, parameters)
+            return LocalRowIterator(result if result is not None
+                                    else pyarrow.table({}))
+        finally:
+            cursor.close()
+
+    def _execute(self, cursor, statement: exp.Expression,
+                 parameters: dict) -> pyarrow.Table:
+        for table in statement.find_all(exp.Table):
+            # Tables are addressed by dataset and name only
+            table.set("catalog", None)
+        names = {parameter.name for parameter in
+                 statement.find_all(exp.Parameter, exp.Placeholder)}
+        sql = statement.sql(dialect="duckdb")
+        logger.debug("Running local query: %s", sql)
+        return cursor.execute(
+            sql, {name: value for name, value in parameters.items()
+                  if name in names}).to_arrow_table()
+
+    def _replace_forecasts(self, cursor, statement: exp.Expression,
+                           parameters: dict) -> exp.Expression:
+        """Replaces the AI.FORECAST calls by local forecast tables."""
+        for index, forecast in enumerate(
+                list(statement.find_all(exp.AIForecast))):
+            arguments = {argument.this.name.lower(): argument.expression
+                         for argument in forecast.args.values()
+                         if isinstance(argument, exp.Kwarg)}
+            id_columns = [column.name for column in
+                          arguments["id_cols"].expressions] \
+                if "id_cols" in arguments else []
+            if len(id_columns) != 1:
+                raise ValueError(
+                    "Local AI.FORECAST requires exactly one id column")
+            history = self._execute(cursor, forecast.this.this.copy(),
+                                    parameters)
+            table_name = f"local_forecast_{index}"
+            cursor.register(table_name, self._forecast(
+                history,
+                id_column=id_columns[0],
+                data_column=arguments["data_col"].name,
+                timestamp_column=arguments["timestamp_col"].name,
+                horizon=int(arguments["horizon"].name)
+                if "horizon" in arguments else 10))
+            forecast.parent.replace(exp.to_table(table_name))
+        return statement
+
+    def _forecast(self, history: pyarrow.Table, id_column: str,
+                  data_column: str, timestamp_column: str,
+                  horizon: int) -> pyarrow.Table:
+        """
+          Forecasts each series of the history from the end of the history.
+
+          Returns:
+              Table with the id column, `forecast_timestamp` and
+              `forecast_value`, like the result of AI.FORECAST
+        """
+        row_ids = history.column(id_column).to_pylist()
+        ids = list(dict.fromkeys(row_ids))
+        event_ts = history.column(timestamp_column).cast(
+            pyarrow.timestamp("us")).to_numpy().astype("datetime64[m]")
+        profiles = self.forecaster.fit_rows(
+            ids, row_ids, event_ts,
+            history.column(data_column).to_numpy().astype(np.float64))
+        last_ts = pyarrow.compute.max(history.column(timestamp_column))
+        start = last_ts.as_py() if last_ts.is_valid \
+            else datetime.now(tz=timezone.utc)
+        forecast = self.forecaster.forecast(ids, profiles, start, horizon)
+        timestamps = np.datetime64(forecast.start.replace(tzinfo=None), "us") \
+            + np.arange(horizon) * np.timedelta64(forecast.step)
+        return pyarrow.table({
+            id_column: pyarrow.array(np.repeat(np.array(ids, dtype=object),
+                                               horizon), pyarrow.string()),
+            "forecast_timestamp": pyarrow.array(
+                np.tile(timestamps, len(ids)),
+                pyarrow.timestamp("us", tz="UTC")),
+            "forecast_value": pyarrow.array(
+                forecast.values.reshape(-1), pyarrow.float64()),
+        })
+
+
+def load_synthetic_dataset(client: LocalBigQueryClient,
+                           number_of_bus_stops: int,
+                           number_of_incidents: int,
+                           end: datetime,
+                           days: int = 28,
+                           seed: Optional[int] = None) -> list[str]:
+    """
+      Fills the tables with synthetic bus stops, incidents and ridership.
+
+      Args:
+          client: Local BigQuery client to load the data into
+          number_of_bus_stops: Number of bus stops
+          number_of_incidents: Number of OPEN incidents, one per bus stop
+          end: End of the ridership history
+          days: Number of days of ridership history
+          seed: Seed of the random ridership
+
+      Returns:
+          Ids of the bus stops
+    """
+    bus_stop_ids = [f"stop-{index:06d}" for index in
+                    range(number_of_bus_stops)]
+    client.load_table("bus_stops", pyarrow.table({
+        "bus_stop_id": bus_stop_ids,
+        "address": [{"street": f"{index} Main Street",
+                     "city": "Anytown", "state": "NY",
+                     "zip": f"{10001 + index % 100}"}
+                    for index in range(number_of_bus_stops)],
+        "school_zone": [False] * number_of_bus_stops,
+        "seating": [True] * number_of_bus_stops,
+        "num_benches": [1] * number_of_bus_stops,
+        "maps": [False] * number_of_bus_stops,
+        "shelter_ads": [False] * number_of_bus_stops,
+        "lighting": [True] * number_of_bus_stops,
+        "location": ["POINT(-73.98 40.75)"] * number_of_bus_stops,
+    }))
+    incident_bus_stop_ids = bus_stop_ids[:number_of_incidents]
+    client.load_table("image_reports", pyarrow.table({
+        "report_id": [f"report-{bus_stop_id}"
+                      for bus_stop_id in incident_bus_stop_ids],
+        "uri": [f"gs://bus-stop-images/images/{bus_stop_id}.jpeg"
+                for bus_stop_id in incident_bus_stop_ids],
+        "content_type": ["image/jpeg"] * number_of_incidents,
+        "image_created": pyarrow.array([end] * number_of_incidents,
+                                       pyarrow.timestamp("us", tz="UTC")),
+        "bus_stop_id": incident_bus_stop_ids,
+        "model_used": ["synthetic"] * number_of_incidents,
+        "cleanliness_level": [2] * number_of_incidents,
+        "safety_level": [3] * number_of_incidents,
+        "description": ["The glass panel of the bus shelter is broken."]
+                       * number_of_incidents,
+        "number_of_people": [0] * number_of_incidents,
+        "is_bus_stop": [True] * number_of_incidents,
+    }))
+    client.load_table("incidents", pyarrow.table({
+        "incident_id": [f"incident-{bus_stop_id}"
+                        for bus_stop_id in incident_bus_stop_ids],
+        "bus_stop_id": incident_bus_stop_ids,
+        "status": ["OPEN"] * number_of_incidents,
+        "open_report_id": [f"report-{bus_stop_id}"
+                           for bus_stop_id in incident_bus_stop_ids],
+    }))
+    # The ridership is generated and loaded in chunks of bus stops to keep
+    # the memory footprint bounded for large fleets
+    rng = np.random.default_rng(seed)
+    for chunk_start in range(0, number_of_bus_stops,
+                             SYNTHETIC_RIDERSHIP_CHUNK_SIZE):
+        chunk_bus_stop_ids = bus_stop_ids[
+            chunk_start:chunk_start + SYNTHETIC_RIDERSHIP_CHUNK_SIZE]
+        event_ts, num_riders = generate_ridership_history(
+            len(chunk_bus_stop_ids), end=end, days=days,
+            seed=int(rng.integers(2 ** 32)))
+        client.load_table("bus_ridership", pyarrow.table({
+            "bus_stop_id": pyarrow.DictionaryArray.from_arrays(
+                np.repeat(np.arange(len(chunk_bus_stop_ids), dtype=np.int32),
+                          len(event_ts)),
+                pyarrow.array(chunk_bus_stop_ids, pyarrow.string())),
+            "num_riders": num_riders.reshape(-1).astype(np.int64),
+            "event_ts": pyarrow.array(
+                np.tile(event_ts.astype("datetime64[us]"),
+                        len(chunk_bus_stop_ids)),
+                pyarrow.timestamp("us", tz="UTC")),
+        }))
+    return bus_stop_ids
+
+
+@lru_cache(maxsize=1)
+def get_local_bigquery_client() -> LocalBigQueryClient:
+    """Returns the local BigQuery stand-in of the process."""
+    config = get_config()
+    return LocalBigQueryClient(
+        database=config.local_bigquery_database,
+        schema_dir=config.local_bigquery_schema_dir or DEFAULT_SCHEMA_DIR)
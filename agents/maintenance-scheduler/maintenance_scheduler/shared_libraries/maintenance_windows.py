@@ -0,0 +1,132 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Search of the maintenance windows which affect the fewest passengers."""
+
+import math
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from maintenance_scheduler.shared_libraries.ridership_forecaster import \
+    local_calendar
+
+# Days with a larger weekday() are weekends, same as in is_time_on_weekend
+LAST_WEEKDAY = 4
+
+
+def find_maintenance_windows(
+    values: np.ndarray,
+    start: datetime,
+    step: timedelta,
+    time_zone: ZoneInfo,
+    duration: timedelta,
+    not_before: datetime,
+    working_hours: Optional[Tuple[int, int]] = None,
+    allow_weekends: bool = True,
+    on_the_hour: bool = True,
+    number_of_windows: int = 3
+) -> List[List[Tuple[int, int]]]:
+    """
+      Finds the windows with the lowest expected number of passengers.
+
+      The number of passengers of every possible window is computed at once
+      for all bus stops as a sliding window sum. The best windows of a bus
+      stop don't overlap.
+
+      Args:
+          values: Expected number of passengers of each bus stop, shape
+            (number of bus stops, number of steps)
+          start: Time of the first step
+          step: Time between steps
+          time_zone: Time zone used by the working hours and weekend rules
+          duration: Duration of the maintenance
+          not_before: The earliest start of the maintenance
+          working_hours: Optional (start hour, end hour) which the maintenance
+            must fit into
+          allow_weekends: Whether the maintenance can start or end on the
+            weekend
+          on_the_hour: Whether the maintenance must start at the first step
+            of an hour
+          number_of_windows: Maximum number of windows per bus stop
+
+      Returns:
+          For each bus stop, the list of (index of the first step, expected
+          number of passengers) of the best windows, best first.
+    """
+    number_of_bus_stops, number_of_steps = values.shape
+    window_steps = max(1, math.ceil(duration / step))
+    number_of_starts = number_of_steps - window_steps + 1
+    if number_of_starts <= 0:
+        return [[] for _ in range(number_of_bus_stops)]
+
+    cumulative = np.zeros((number_of_bus_stops, number_of_steps + 1))
+    np.cumsum(values, axis=1, out=cumulative[:, 1:])
+    window_sums = cumulative[:, window_steps:] \
+        - cumulative[:, :number_of_starts]
+
+    valid = _valid_starts(start, step, number_of_starts, time_zone, duration,
+                          not_before, working_hours, allow_weekends,
+                          on_the_hour)
+    scores = np.where(valid[np.newaxis, :], window_sums, np.inf)
+
+    positions = np.arange(number_of_starts)
+    rows = np.arange(number_of_bus_stops)
+    windows = [[] for _ in range(number_of_bus_stops)]
+    for _ in range(number_of_windows):
+        best = np.argmin(scores, axis=1)
+        best_scores = scores[rows, best]
+        if not np.isfinite(best_scores).any():
+            break
+        for bus_stop, (index, score) in enumerate(
+                zip(best.tolist(), best_scores.tolist())):
+            if math.isfinite(score):
+                windows[bus_stop].append((index, int(round(score))))
+        overlapping = np.abs(positions[np.newaxis, :]
+                             - best[:, np.newaxis]) < window_steps
+        scores[overlapping] = np.inf
+    return windows
+
+
+def _valid_starts(start: datetime, step: timedelta, number_of_starts: int,
+                  time_zone: ZoneInfo, duration: timedelta,
+                  not_before: datetime,
+                  working_hours: Optional[Tuple[int, int]],
+                  allow_weekends: bool, on_the_hour: bool) -> np.ndarray:
+    step_minutes = int(step.total_seconds() // 60)
+    duration_minutes = int(math.ceil(duration.total_seconds() / 60))
+    first = np.datetime64(
+        start.astimezone(timezone.utc).replace(tzinfo=None), "m")
+    starts = first + np.arange(number_of_starts) * np.timedelta64(
+        step_minutes, "m")
+    # The last minute of the maintenance
+    ends = starts + np.timedelta64(max(duration_minutes - 1, 0), "m")
+    start_day, start_minute = local_calendar(starts, time_zone)
+    end_day, _ = local_calendar(ends, time_zone)
+
+    not_before = np.datetime64(
+        not_before.astimezone(timezone.utc).replace(tzinfo=None), "m")
+    valid = starts >= not_before
+    if not allow_weekends:
+        valid &= (start_day <= LAST_WEEKDAY) & (end_day <= LAST_WEEKDAY)
+    if working_hours:
+        first_hour, last_hour = working_hours
+        valid &= (start_minute >= first_hour * 60) \
+            & (start_minute + duration_minutes <= last_hour * 60)
+    if on_the_hour:
+        # Forecasts which are not aligned to the hour use the first step
+        valid &= start_minute % 60 < step_minutes
+    return valid
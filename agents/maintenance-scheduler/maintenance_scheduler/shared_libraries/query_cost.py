@@ -0,0 +1,196 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Dry-run cost estimates of the tool queries.
+
+Before a tool query runs, a dry run returns the number of bytes BigQuery
+would process. The estimate only depends on the query text and the tables
+it reads, so it is cached by the shape of the query: its normalized text and
+the names and types of its parameters, but not their values.
+
+Queries estimated above the byte budget are rejected on their first dry run.
+
+Dry runs report an upper bound for clustered tables, as the blocks pruned by
+the clustering are only known when the query runs. Splitting a query by the
+clustering column, e.g. the bus stops, doesn't lower its estimate, only
+filters on the partitioning column do.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """A query is estimated to process more bytes than the budget."""
+
+    def __init__(self, estimated_bytes_processed: int,
+                 max_bytes_processed: int):
+        super().__init__(
+            f"The query would process {estimated_bytes_processed} bytes, "
+            f"more than the limit of {max_bytes_processed} bytes")
+        self.estimated_bytes_processed = estimated_bytes_processed
+        self.max_bytes_processed = max_bytes_processed
+
+
+@dataclass
+class QueryEstimate:
+    """Dry-run estimate of one query."""
+    total_bytes_processed: int
+    cached: bool = False
+
+
+@dataclass
+class QueryCost:
+    """Estimates of the queries run and rejected by one tool call."""
+    estimates: List[QueryEstimate] = field(default_factory=list)
+    queries: int = 0
+    rejected: List[QueryEstimate] = field(default_factory=list)
+
+    def add(self, estimate: QueryEstimate) -> None:
+        self.estimates.append(estimate)
+        self.queries += 1
+
+    def reject(self, estimate: QueryEstimate) -> None:
+        self.rejected.append(estimate)
+
+    @property
+    def estimated_bytes_processed(self) -> int:
+        return sum(estimate.total_bytes_processed
+                   for estimate in self.estimates)
+
+    def __bool__(self) -> bool:
+        return bool(self.estimates or self.rejected)
+
+    def to_metadata(self) -> dict:
+        """The estimates as reported in the tool response."""
+        metadata = {
+            "estimated_bytes_processed": self.estimated_bytes_processed,
+            "queries": self.queries,
+            "estimates_cached": all(
+                estimate.cached
+                for estimate in self.estimates + self.rejected),
+        }
+        if self.rejected:
+            metadata["rejected_estimated_bytes_processed"] = [
+                estimate.total_bytes_processed for estimate in self.rejected]
+        return metadata
+
+
+def _array_length_bucket(length: int) -> int:
+    """Rounds a list length up to a power of two."""
+    return 1 << max(length - 1, 0).bit_length()
+
+
+def query_shape(query: str, query_parameters: Sequence[Any] = ()) -> str:
+    """
+      Cache key of a query estimate.
+
+      Whitespace is normalized and parameter values are left out, except
+      for the length of array parameters, which is rounded up to a power of
+      two.
+    """
+    parameters = []
+    for parameter in query_parameters:
+        if hasattr(parameter, "array_type"):
+            parameters.append((
+                parameter.name, f"ARRAY<{parameter.array_type}>",
+                _array_length_bucket(len(parameter.values))))
+        else:
+            parameters.append((parameter.name,
+                               getattr(parameter, "type_", None), None))
+    return hashlib.sha256(json.dumps(
+        [" ".join(query.split()), sorted(parameters, key=str)]
+    ).encode("utf-8")).hexdigest()
+
+
+class QueryCostGuard:
+    """
+      Estimates tool queries with cached dry runs and enforces the budget.
+
+      A `max_bytes_processed` of 0 only reports the estimates. A
+      `max_entries` of 0 disables the cache of estimates.
+    """
+
+    def __init__(self, max_bytes_processed: int, max_entries: int):
+        self.max_bytes_processed = max_bytes_processed
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._estimates: OrderedDict[str, int] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def within_budget(self, total_bytes_processed: int) -> bool:
+        return not self.max_bytes_processed \
+            or total_bytes_processed <= self.max_bytes_processed
+
+    async def estimate(self, async_client, query: str,
+                       query_parameters: Sequence[Any] = (),
+                       project: Optional[str] = None) -> QueryEstimate:
+        """Dry-runs the query, unless a query of the same shape was."""
+        key = query_shape(query, query_parameters)
+        with self._lock:
+            total_bytes_processed = self._estimates.get(key)
+            if total_bytes_processed is not None:
+                self._estimates.move_to_end(key)
+                self.hits += 1
+                return QueryEstimate(total_bytes_processed, cached=True)
+            self.misses += 1
+        total_bytes_processed = await async_client.dry_run(
+            query, query_parameters=query_parameters, project=project)
+        logger.debug("Query estimated to process %s bytes",
+                     total_bytes_processed)
+        if self.max_entries > 0:
+            with self._lock:
+                self._estimates[key] = total_bytes_processed
+                self._estimates.move_to_end(key)
+                while len(self._estimates) > self.max_entries:
+                    self._estimates.popitem(last=False)
+        return QueryEstimate(total_bytes_processed)
+
+    async def check(self, async_client, query: str,
+                    query_parameters: Sequence[Any] = (),
+                    project: Optional[str] = None,
+                    cost: Optional[QueryCost] = None) -> QueryEstimate:
+        """
+          Estimates a query before it runs.
+
+          Raises:
+              QueryBudgetExceeded: If the estimate is above the budget.
+        """
+        estimate = await self.estimate(async_client, query, query_parameters,
+                                       project)
+        if not self.within_budget(estimate.total_bytes_processed):
+            if cost is not None:
+                cost.reject(estimate)
+            raise QueryBudgetExceeded(estimate.total_bytes_processed,
+                                      self.max_bytes_processed)
+        if cost is not None:
+            cost.add(estimate)
+        return estimate
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "cached_estimates": len(self._estimates),
+        }
@@ -0,0 +1,209 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Process-wide rate limiting of the model calls.
+
+Every model has a request bucket and a token bucket shared by all sessions of
+the process. A caller reserves capacity in both buckets and waits
+asynchronously until the reservation is covered, so callers are served in
+the order they arrive and the event loop is never blocked.
+
+A session also has its own request bucket, kept in the session state, so a
+single session can't use up the capacity shared by all sessions.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from maintenance_scheduler.config import ModelRateLimit
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_MINUTE = 60
+
+
+class TokenBucket:
+    """
+      Token bucket which allows callers to reserve more than is available.
+
+      The bucket holds at most one minute worth of tokens. A reservation which
+      exceeds the available tokens leaves the bucket in debt, and the
+      returned delay is the time needed to pay the debt back.
+    """
+
+    def __init__(self, per_minute: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.capacity = per_minute
+        self.refill_per_sec = per_minute / SECONDS_PER_MINUTE
+        self._clock = clock
+        self._level = per_minute
+        self._updated = clock()
+
+    def reserve(self, amount: float) -> float:
+        """Takes tokens and returns the delay in seconds until they are due."""
+        self._refill()
+        self._level -= amount
+        return max(0.0, -self._level / self.refill_per_sec)
+
+    def to_dict(self) -> dict:
+        """The level of the bucket, to store it in a session state."""
+        return {"level": self._level, "updated": self._updated}
+
+    def restore(self, saved: dict) -> None:
+        """Sets the level of the bucket from `to_dict`."""
+        self._level = saved["level"]
+        self._updated = saved["updated"]
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._level = min(
+            self.capacity,
+            self._level + (now - self._updated) * self.refill_per_sec)
+        self._updated = now
+
+
+class ModelRateLimiter:
+    """
+      Limits the requests and tokens per minute of a model.
+
+      Tokens are reserved with an estimate before the request and corrected
+      with the actual usage after the response.
+    """
+
+    def __init__(self, limit: ModelRateLimit,
+                 clock: Callable[[], float] = time.monotonic):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(limit.requests_per_minute, clock) \
+            if limit.requests_per_minute > 0 else None
+        self._tokens = TokenBucket(limit.tokens_per_minute, clock) \
+            if limit.tokens_per_minute > 0 else None
+        self.requests = 0
+        self.delayed_requests = 0
+        self.waiting = 0
+        self.total_wait_secs = 0.0
+        self.max_wait_secs = 0.0
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """
+          Waits until a request with the estimated number of tokens is allowed.
+
+          Returns:
+              Time spent waiting in seconds
+        """
+        with self._lock:
+            delay = 0.0
+            if self._requests:
+                delay = self._requests.reserve(1)
+            if self._tokens and tokens:
+                delay = max(delay, self._tokens.reserve(tokens))
+            self.requests += 1
+            if delay > 0:
+                self.delayed_requests += 1
+                self.waiting += 1
+                self.total_wait_secs += delay
+                self.max_wait_secs = max(self.max_wait_secs, delay)
+        if delay > 0:
+            logger.debug("Rate limit reached, waiting for %.1f seconds", delay)
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+        return delay
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Charges the difference between the actual and estimated tokens."""
+        if not self._tokens or actual_tokens == estimated_tokens:
+            return
+        with self._lock:
+            self._tokens.reserve(actual_tokens - estimated_tokens)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "delayed_requests": self.delayed_requests,
+                "waiting": self.waiting,
+                "total_wait_secs": self.total_wait_secs,
+                "max_wait_secs": self.max_wait_secs,
+                "average_wait_secs": self.total_wait_secs / self.requests
+                if self.requests else 0.0,
+            }
+
+
+class SessionRateLimiter:
+    """
+      Limits the requests per minute of each session.
+
+      The bucket of a session is stored in its state under `state_key`, so it
+      lasts across the invocations of the session. Wall clock time is used,
+      as the state may be restored by another process.
+    """
+
+    def __init__(self, requests_per_minute: float, state_key: str,
+                 clock: Callable[[], float] = time.time):
+        self.requests_per_minute = requests_per_minute
+        self.state_key = state_key
+        self._clock = clock
+
+    async def acquire(self, state) -> float:
+        """
+          Waits until the session is allowed another request.
+
+          Returns:
+              Time spent waiting in seconds
+        """
+        if self.requests_per_minute <= 0:
+            return 0.0
+        bucket = TokenBucket(self.requests_per_minute, self._clock)
+        saved = state.get(self.state_key)
+        if saved:
+            bucket.restore(saved)
+        delay = bucket.reserve(1)
+        state[self.state_key] = bucket.to_dict()
+        if delay > 0:
+            logger.debug("Session rate limit reached, waiting for %.1f "
+                         "seconds", delay)
+            await asyncio.sleep(delay)
+        return delay
+
+
+class RateLimiterRegistry:
+    """Creates one rate limiter per model on first use."""
+
+    def __init__(self, limits: dict[str, ModelRateLimit],
+                 default_limit: ModelRateLimit,
+                 clock: Callable[[], float] = time.monotonic):
+        self.limits = limits
+        self.default_limit = default_limit
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._limiters: dict[str, ModelRateLimiter] = {}
+
+    def get(self, model: Optional[str]) -> ModelRateLimiter:
+        model = model or ""
+        with self._lock:
+            if model not in self._limiters:
+                self._limiters[model] = ModelRateLimiter(
+                    self.limits.get(model, self.default_limit), self._clock)
+            return self._limiters[model]
+
+    def stats(self) -> dict[str, dict]:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {model: limiter.stats() for model, limiter in limiters.items()}
@@ -0,0 +1,249 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local ridership forecasting based on weekly seasonal profiles.
+
+The forecaster is used when BigQuery's AI.FORECAST is not available, e.g. when
+the remote call times out or the agent runs offline. The expected number of
+riders of a bus stop is the average number of riders observed at the same day
+of the week and time of the day. All bus stops are processed in a single
+vectorized pass.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from maintenance_scheduler.shared_libraries.forecast_cache import \
+    ForecastPoints
+
+logger = logging.getLogger(__name__)
+
+DAYS_PER_WEEK = 7
+MINUTES_PER_DAY = 24 * 60
+# 1970-01-01 was a Thursday, weekday() == 3
+EPOCH_WEEKDAY = 3
+
+
+class RidershipForecast:
+    """
+      Forecast of several bus stops on a shared time grid.
+
+      `values[i, j]` is the expected number of riders at bus stop
+      `bus_stop_ids[i]` at `start + j * step`.
+    """
+
+    def __init__(self, bus_stop_ids: List[str], start: datetime,
+                 step: timedelta, values: np.ndarray):
+        self.bus_stop_ids = bus_stop_ids
+        self.start = start
+        self.step = step
+        self.values = values
+
+    def timestamps(self) -> List[datetime]:
+        return [self.start + self.step * index
+                for index in range(self.values.shape[1])]
+
+    def to_points(self) -> dict[str, ForecastPoints]:
+        """Converts the forecast to the format used by the forecast cache."""
+        timestamps = self.timestamps()
+        return {
+            bus_stop_id: list(zip(timestamps, row))
+            for bus_stop_id, row in zip(self.bus_stop_ids,
+                                        self.values.tolist())}
+
+
+class SeasonalRidershipForecaster:
+    """
+      Forecasts ridership using day-of-week and time-of-day profiles.
+
+      Seasons missing from the history of a bus stop fall back to the average
+      of the same time of the day on other days, and then to the average of
+      the bus stop.
+    """
+
+    def __init__(self, step_minutes: int = 15,
+                 time_zone: ZoneInfo = ZoneInfo("America/New_York")):
+        if MINUTES_PER_DAY % step_minutes:
+            raise ValueError("step_minutes must divide a day")
+        self.step = timedelta(minutes=step_minutes)
+        self.step_minutes = step_minutes
+        self.time_zone = time_zone
+        self.slots_per_day = MINUTES_PER_DAY // step_minutes
+        self.number_of_seasons = DAYS_PER_WEEK * self.slots_per_day
+
+    def seasons(self, timestamps: np.ndarray) -> np.ndarray:
+        """
+          Season index of UTC timestamps in the forecaster's time zone.
+
+          The season index is `day_of_week * slots_per_day + slot_of_day`,
+          where Monday is day 0.
+        """
+        day_of_week, minute_of_day = local_calendar(timestamps,
+                                                    self.time_zone)
+        return day_of_week * self.slots_per_day \
+            + minute_of_day // self.step_minutes
+
+    def fit_series(self, event_ts: np.ndarray,
+                   num_riders: np.ndarray) -> np.ndarray:
+        """
+          Computes the seasonal profiles of bus stops sharing a time grid.
+
+          Args:
+              event_ts: UTC timestamps of the observations, shape (T,)
+              num_riders: Number of riders, shape (number of bus stops, T)
+
+          Returns:
+              Profiles of shape (number of bus stops, number of seasons)
+        """
+        number_of_bus_stops = num_riders.shape[0]
+        seasons = self.seasons(np.asarray(event_ts))
+        codes = (np.arange(number_of_bus_stops)[:, np.newaxis]
+                 * self.number_of_seasons + seasons[np.newaxis, :])
+        return self._profiles(codes.ravel(), num_riders.ravel(),
+                              number_of_bus_stops)
+
+    def fit_rows(self, bus_stop_ids: Sequence[str], row_bus_stop_ids: np.ndarray,
+                 event_ts: np.ndarray, num_riders: np.ndarray) -> np.ndarray:
+        """
+          Computes the seasonal profiles from observations in rows.
+
+          Args:
+              bus_stop_ids: Bus stops to compute the profiles for
+              row_bus_stop_ids: Bus stop id of each observation
+              event_ts: UTC timestamp of each observation
+              num_riders: Number of riders of each observation
+
+          Returns:
+              Profiles of shape (len(bus_stop_ids), number of seasons)
+        """
+        bus_stop_index = {bus_stop_id: index
+                          for index, bus_stop_id in enumerate(bus_stop_ids)}
+        stop_codes = np.fromiter(
+            (bus_stop_index.get(bus_stop_id, -1)
+             for bus_stop_id in row_bus_stop_ids),
+            dtype=np.int64, count=len(row_bus_stop_ids))
+        known = stop_codes >= 0
+        seasons = self.seasons(np.asarray(event_ts)[known])
+        codes = stop_codes[known] * self.number_of_seasons + seasons
+        return self._profiles(codes, np.asarray(num_riders)[known],
+                              len(bus_stop_ids))
+
+    def forecast(self, bus_stop_ids: List[str], profiles: np.ndarray,
+                 start: datetime, horizon: int) -> RidershipForecast:
+        """
+          Forecasts `horizon` steps from the first step boundary after start.
+        """
+        start = _ceil_datetime(start.astimezone(timezone.utc), self.step)
+        grid_start = np.datetime64(start.replace(tzinfo=None), "m")
+        grid = grid_start + np.arange(horizon) * np.timedelta64(
+            self.step_minutes, "m")
+        values = profiles[:, self.seasons(grid)]
+        return RidershipForecast(
+            bus_stop_ids=list(bus_stop_ids),
+            start=start,
+            step=self.step,
+            values=np.rint(np.maximum(values, 0)).astype(np.int64))
+
+    def forecast_rows(self, bus_stop_ids: List[str], rows: Iterable,
+                      start: datetime, horizon: int) -> RidershipForecast:
+        """
+          Fits and forecasts `bus_ridership` rows in one call.
+
+          Bus stops without any rows are not included in the forecast.
+
+          Args:
+              bus_stop_ids: Bus stops to forecast
+              rows: Rows with `bus_stop_id`, `event_ts` and `num_riders`
+              start: Start of the forecast
+              horizon: Number of forecasted steps
+        """
+        row_bus_stop_ids = []
+        event_ts = []
+        num_riders = []
+        for row in rows:
+            row_bus_stop_ids.append(row.bus_stop_id)
+            event_ts.append(
+                row.event_ts.astimezone(timezone.utc).replace(tzinfo=None))
+            num_riders.append(row.num_riders)
+        observed_bus_stop_ids = set(row_bus_stop_ids)
+        bus_stop_ids = [bus_stop_id for bus_stop_id in dict.fromkeys(bus_stop_ids)
+                        if bus_stop_id in observed_bus_stop_ids]
+        profiles = self.fit_rows(
+            bus_stop_ids, row_bus_stop_ids,
+            np.array(event_ts, dtype="datetime64[m]"),
+            np.array(num_riders, dtype=np.float64))
+        return self.forecast(bus_stop_ids, profiles, start, horizon)
+
+    def _profiles(self, codes: np.ndarray, num_riders: np.ndarray,
+                  number_of_bus_stops: int) -> np.ndarray:
+        shape = (number_of_bus_stops, self.number_of_seasons)
+        size = number_of_bus_stops * self.number_of_seasons
+        sums = np.bincount(codes, weights=num_riders, minlength=size) \
+            .reshape(shape)
+        counts = np.bincount(codes, minlength=size).reshape(shape)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            profiles = sums / counts
+
+            # Fallback for the seasons without observations: the same time
+            # of the day on the other days, then the bus stop average.
+            by_slot_sums = sums.reshape(
+                number_of_bus_stops, DAYS_PER_WEEK, self.slots_per_day) \
+                .sum(axis=1)
+            by_slot_counts = counts.reshape(
+                number_of_bus_stops, DAYS_PER_WEEK, self.slots_per_day) \
+                .sum(axis=1)
+            by_slot = np.tile(by_slot_sums / by_slot_counts,
+                              (1, DAYS_PER_WEEK))
+            overall = (sums.sum(axis=1) / counts.sum(axis=1))[:, np.newaxis]
+
+        profiles = np.where(counts > 0, profiles, by_slot)
+        profiles = np.where(np.isnan(profiles), overall, profiles)
+        return np.nan_to_num(profiles, nan=0.0)
+
+
+def local_calendar(timestamps: np.ndarray,
+                   time_zone: ZoneInfo) -> Tuple[np.ndarray, np.ndarray]:
+    """
+      Day of the week (Monday is 0) and minute of the day of UTC timestamps
+      in the given time zone.
+    """
+    timestamps = timestamps.astype("datetime64[m]")
+    # UTC offsets only change on hour boundaries, so they are computed
+    # once per distinct hour.
+    hours, hour_index = np.unique(timestamps.astype("datetime64[h]"),
+                                  return_inverse=True)
+    offsets = np.array(
+        [_utc_offset_minutes(hour, time_zone) for hour in hours.tolist()],
+        dtype="timedelta64[m]")
+    local = timestamps + offsets[hour_index.reshape(timestamps.shape)]
+    local_days = local.astype("datetime64[D]")
+    minute_of_day = (local - local_days).astype(np.int64)
+    day_of_week = (local_days.astype(np.int64) + EPOCH_WEEKDAY) % DAYS_PER_WEEK
+    return day_of_week, minute_of_day
+
+
+def _utc_offset_minutes(hour: datetime, time_zone: ZoneInfo) -> int:
+    offset = hour.replace(tzinfo=timezone.utc).astimezone(
+        time_zone).utcoffset()
+    return int(offset.total_seconds() // 60)
+
+
+def _ceil_datetime(value: datetime, step: timedelta) -> datetime:
+    remainder = (value - datetime.min.replace(tzinfo=value.tzinfo)) % step
+    return value + (step - remainder) if remainder else value
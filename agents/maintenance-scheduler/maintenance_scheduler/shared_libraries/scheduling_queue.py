@@ -0,0 +1,254 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Write-behind queue of the maintenance schedules.
+
+Schedules are accepted immediately and written in batches, when the queue
+reaches its size limit, when the oldest schedule waited for the time limit or
+when the queue is flushed at the end of an agent invocation.
+
+Every accepted schedule is appended to a JSONL journal before it is
+acknowledged and marked as done after it is written. Schedules which were
+accepted but not written when the process stopped are replayed from the
+journal when the queue is created again. The journal is written on a
+dedicated thread, so the fsync of an append doesn't block the event loop.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional
+
+from maintenance_scheduler.entities.maintenance import MaintenanceSchedule
+
+logger = logging.getLogger(__name__)
+
+# Writes a batch of schedules and returns the status of each bus stop
+WriteBatch = Callable[[List[MaintenanceSchedule]], Awaitable[dict[str, str]]]
+
+
+@dataclass
+class PendingSchedule:
+    sequence: int
+    invocation_id: str
+    schedule: MaintenanceSchedule
+
+
+class SchedulingQueue:
+    """
+      Batches maintenance schedules and writes them behind the callers.
+
+      A bus stop is written at most once per batch. A schedule of a bus stop
+      which is already pending replaces the pending one. The results of the
+      writes are kept per invocation until they are collected with
+      `pop_results`, for at most `max_results` invocations.
+
+      Schedules replayed from the journal or left pending by a failed write
+      are written by the next timer, which starts once an event loop runs.
+    """
+
+    def __init__(self, write_batch: WriteBatch, max_batch_size: int,
+                 max_delay_secs: float, journal_path: str = "",
+                 max_results: int = 1000):
+        self._write_batch = write_batch
+        self.max_batch_size = max_batch_size
+        self.max_delay_secs = max_delay_secs
+        self.journal_path = journal_path
+        self.max_results = max_results
+        self._pending: dict[str, PendingSchedule] = {}
+        self._results: OrderedDict[str, dict[str, str]] = OrderedDict()
+        self._sequence = 0
+        self._flush_lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self._tasks: set[asyncio.Task] = set()
+        # A single thread keeps the journal records in order
+        self._journal_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="schedule-journal") \
+            if journal_path else None
+        if self.journal_path:
+            self._replay_journal()
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                # Started by the first enqueue or flush
+                pass
+            else:
+                self._flush_pending_later()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def enqueue(self, schedule: MaintenanceSchedule,
+                      invocation_id: str = "") -> int:
+        """
+          Accepts a schedule for writing.
+
+          Returns:
+              Number of schedules waiting to be written
+        """
+        self._sequence += 1
+        entry = PendingSchedule(self._sequence, invocation_id, schedule)
+        await self._append_to_journal({
+            "op": "enqueue",
+            "sequence": entry.sequence,
+            "invocation_id": invocation_id,
+            "schedule": schedule.model_dump()})
+        replaced = self._pending.get(schedule.bus_stop_id)
+        if replaced is not None and replaced.sequence > entry.sequence:
+            # A newer schedule of the bus stop was accepted during the append
+            replaced, entry = entry, replaced
+        self._pending[schedule.bus_stop_id] = entry
+        if replaced is not None:
+            await self._append_to_journal({"op": "done",
+                                           "sequences": [replaced.sequence]})
+
+        if len(self._pending) >= self.max_batch_size:
+            self._start(self.flush())
+        else:
+            self._flush_pending_later()
+        return len(self._pending)
+
+    async def flush(self) -> dict[str, str]:
+        """
+          Writes all pending schedules as one batch.
+
+          Schedules which fail to be written stay pending and are retried by
+          the next flush.
+
+          Returns:
+              The status of each written bus stop
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return {}
+            batch = list(self._pending.values())
+            self._pending = {}
+            try:
+                statuses = await self._write_batch(
+                    [entry.schedule for entry in batch])
+            except Exception as ex:
+                logger.error("Writing %s maintenance schedules failed: %s",
+                             len(batch), str(ex))
+                for entry in batch:
+                    # Newer schedules of the same bus stop take precedence
+                    self._pending.setdefault(entry.schedule.bus_stop_id,
+                                             entry)
+                    self._record(entry, "error")
+                self._flush_pending_later()
+                return {entry.schedule.bus_stop_id: "error"
+                        for entry in batch}
+
+            await self._append_to_journal({
+                "op": "done",
+                "sequences": [entry.sequence for entry in batch]})
+            for entry in batch:
+                self._record(entry, statuses.get(entry.schedule.bus_stop_id,
+                                                 "error"))
+            logger.info("Wrote %s maintenance schedules", len(batch))
+            return {entry.schedule.bus_stop_id:
+                    statuses.get(entry.schedule.bus_stop_id, "error")
+                    for entry in batch}
+
+    def pop_results(self, invocation_id: str) -> dict[str, str]:
+        """Returns and forgets the write results of an invocation."""
+        return self._results.pop(invocation_id, {})
+
+    def _record(self, entry: PendingSchedule, status: str) -> None:
+        results = self._results.setdefault(entry.invocation_id, {})
+        results[entry.schedule.bus_stop_id] = status
+        self._results.move_to_end(entry.invocation_id)
+        while len(self._results) > self.max_results:
+            # Results of invocations which never collected them
+            self._results.popitem(last=False)
+
+    def _flush_pending_later(self) -> None:
+        """Starts the flush timer, unless it is running."""
+        if self._pending and (self._timer is None or self._timer.done()):
+            self._timer = self._start(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.max_delay_secs)
+        # Schedules accepted during the flush start a new timer
+        self._timer = None
+        await self.flush()
+
+    def _start(self, coroutine) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(coroutine)
+        # Keeps a reference until the task is done
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _append_to_journal(self, record: dict) -> None:
+        if not self.journal_path:
+            return
+        await asyncio.get_running_loop().run_in_executor(
+            self._journal_executor, self._write_journal_record, record)
+
+    def _write_journal_record(self, record: dict) -> None:
+        with open(self.journal_path, "a", encoding="utf-8") as journal:
+            journal.write(json.dumps(record) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+
+    def _replay_journal(self) -> None:
+        """
+          Restores the schedules which were accepted but not written.
+
+          The journal is compacted to the pending schedules. A partially
+          written last record, left by a crash during the append, is ignored.
+        """
+        if not os.path.exists(self.journal_path):
+            return
+        enqueued: dict[int, dict] = {}
+        with open(self.journal_path, encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("Skipping a corrupted journal record")
+                    continue
+                if record.get("op") == "enqueue":
+                    enqueued[record["sequence"]] = record
+                elif record.get("op") == "done":
+                    for sequence in record["sequences"]:
+                        enqueued.pop(sequence, None)
+
+        for sequence in sorted(enqueued):
+            record = enqueued[sequence]
+            schedule = MaintenanceSchedule.model_validate(record["schedule"])
+            self._pending.pop(schedule.bus_stop_id, None)
+            self._pending[schedule.bus_stop_id] = PendingSchedule(
+                sequence, record.get("invocation_id", ""), schedule)
+        self._sequence = max(enqueued, default=0)
+
+        compacted_path = self.journal_path + ".tmp"
+        with open(compacted_path, "w", encoding="utf-8") as journal:
+            for entry in self._pending.values():
+                journal.write(json.dumps({
+                    "op": "enqueue",
+                    "sequence": entry.sequence,
+                    "invocation_id": entry.invocation_id,
+                    "schedule": entry.schedule.model_dump()}) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+        os.replace(compacted_path, self.journal_path)
+        if self._pending:
+            logger.info("Replaying %s pending maintenance schedules",
+                        len(self._pending))
@@ -0,0 +1,97 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Synthetic ridership history for offline runs and benchmarks.
+
+Mirrors the `generate_synthetic_ridership` stored procedure and the
+`generate_number_of_riders` function defined in the Terraform scripts.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from maintenance_scheduler.shared_libraries.ridership_forecaster import \
+    SeasonalRidershipForecaster
+
+
+def generate_ridership_history(
+    number_of_bus_stops: int,
+    end: datetime,
+    days: int = 31,
+    step_minutes: int = 15,
+    time_zone: ZoneInfo = ZoneInfo("America/New_York"),
+    seed: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+      Generates the ridership of bus stops at regular intervals.
+
+      Args:
+          number_of_bus_stops: Number of bus stops
+          end: End of the history
+          days: Length of the history
+          step_minutes: Interval between the observations
+          time_zone: Time zone of the bus stops
+          seed: Seed of the random number generator
+
+      Returns:
+          UTC timestamps of the observations, shape (T,), and the number of
+          riders, shape (number_of_bus_stops, T).
+    """
+    rng = np.random.default_rng(seed)
+    forecaster = SeasonalRidershipForecaster(step_minutes=step_minutes,
+                                             time_zone=time_zone)
+
+    end = end.astimezone(timezone.utc).replace(tzinfo=None)
+    start = end - timedelta(days=days)
+    event_ts = np.arange(np.datetime64(start, "m"), np.datetime64(end, "m"),
+                         np.timedelta64(step_minutes, "m"))
+    seasons = forecaster.seasons(event_ts)
+    day_of_week = seasons // forecaster.slots_per_day
+    hour = (seasons % forecaster.slots_per_day) * step_minutes // 60
+
+    base_number_of_riders = 10 + np.floor(
+        rng.random(number_of_bus_stops) * 10)
+    busy_in_morning = rng.random(number_of_bus_stops) < 0.5
+    busy_in_evening = rng.random(number_of_bus_stops) < 0.5
+    busy_on_weekend = rng.random(number_of_bus_stops) < 0.5
+
+    # Add 20% variance. The multipliers are applied in place to keep the
+    # memory footprint at one array for large fleets.
+    num_riders = 0.9 + rng.random(
+        (number_of_bus_stops, len(event_ts)), dtype=np.float32) / 5
+    num_riders *= base_number_of_riders[:, np.newaxis].astype(np.float32)
+
+    # Temperature and precipitation are constant, so their multipliers are 1.
+    is_weekday = (day_of_week < 5)[np.newaxis, :]
+    np.multiply(num_riders, 2, out=num_riders, where=is_weekday)
+    np.multiply(num_riders,
+                np.where(busy_on_weekend, 3, 1)[:, np.newaxis]
+                .astype(np.float32),
+                out=num_riders, where=~is_weekday)
+
+    night = (hour <= 6)[np.newaxis, :]
+    morning = ((hour >= 7) & (hour <= 9))[np.newaxis, :]
+    evening = ((hour >= 15) & (hour <= 18))[np.newaxis, :]
+    np.multiply(num_riders, 0, out=num_riders, where=night)
+    for peak, busy in ((morning, busy_in_morning),
+                       (evening, busy_in_evening)):
+        np.multiply(num_riders,
+                    np.where(busy, 1.5, 1.3)[:, np.newaxis].astype(np.float32),
+                    out=num_riders, where=peak)
+
+    num_riders = np.rint(num_riders, out=num_riders).astype(np.int32)
+    return event_ts, num_riders
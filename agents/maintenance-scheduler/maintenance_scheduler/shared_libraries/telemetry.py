@@ -0,0 +1,279 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Telemetry of the tool calls.
+
+A tool call is started by the before_tool callback and finished by the
+after_tool callback. BigQuery queries run by the tool in between are
+attributed to the call through a context variable, so the time spent in
+AI.FORECAST or in a DML statement can be told apart from the model time.
+
+Finished calls are exported to a sink: the log with process-wide aggregates,
+OpenTelemetry spans, or nowhere.
+"""
+
+import contextvars
+import json
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, List, Optional, Protocol
+
+from pydantic_core import to_json
+
+logger = logging.getLogger(__name__)
+
+LOG_EXPORTER = "log"
+OPENTELEMETRY_EXPORTER = "opentelemetry"
+NO_EXPORTER = "none"
+EXPORTERS = [LOG_EXPORTER, OPENTELEMETRY_EXPORTER, NO_EXPORTER]
+
+
+@dataclass
+class QueryStats:
+    """Statistics of one BigQuery query run by a tool."""
+    wall_time_ms: float
+    job_id: Optional[str] = None
+    query_id: Optional[str] = None
+    total_bytes_processed: Optional[int] = None
+    slot_millis: Optional[int] = None
+    # BigQuery reports cached results as processing no bytes
+    cache_hit: Optional[bool] = None
+    total_rows: Optional[int] = None
+    dml_affected_rows: Optional[int] = None
+
+
+@dataclass
+class ToolCallStats:
+    """Statistics of one tool call."""
+    tool_name: str
+    function_call_id: str = ""
+    invocation_id: str = ""
+    start_time_ns: int = 0
+    wall_time_ms: float = 0.0
+    response_bytes: int = 0
+    queries: List[QueryStats] = field(default_factory=list)
+
+    @property
+    def query_time_ms(self) -> float:
+        return sum(query.wall_time_ms for query in self.queries)
+
+    @property
+    def total_bytes_processed(self) -> int:
+        return sum(query.total_bytes_processed or 0 for query in self.queries)
+
+    @property
+    def slot_millis(self) -> int:
+        return sum(query.slot_millis or 0 for query in self.queries)
+
+
+_current_tool_call: contextvars.ContextVar[Optional[ToolCallStats]] = \
+    contextvars.ContextVar("current_tool_call", default=None)
+
+
+def query_stats(rows: Any, wall_time_ms: float) -> QueryStats:
+    """Reads the job statistics of a `query_and_wait` result."""
+    total_bytes_processed = getattr(rows, "total_bytes_processed", None)
+    return QueryStats(
+        wall_time_ms=wall_time_ms,
+        job_id=getattr(rows, "job_id", None),
+        query_id=getattr(rows, "query_id", None),
+        total_bytes_processed=total_bytes_processed,
+        slot_millis=getattr(rows, "slot_millis", None),
+        cache_hit=total_bytes_processed == 0
+        if total_bytes_processed is not None else None,
+        total_rows=getattr(rows, "total_rows", None),
+        dml_affected_rows=getattr(rows, "num_dml_affected_rows", None))
+
+
+def record_query(stats: QueryStats) -> None:
+    """Attributes a query to the current tool call, if there is one."""
+    tool_call = _current_tool_call.get()
+    if tool_call is not None:
+        tool_call.queries.append(stats)
+
+
+def payload_size(payload: Any) -> int:
+    """Size of a tool response serialized as JSON."""
+    return len(to_json(payload, fallback=str))
+
+
+class TelemetrySink(Protocol):
+    def export(self, tool_call: ToolCallStats) -> None:
+        ...
+
+
+class LogSink:
+    """
+      Logs every tool call and keeps process-wide aggregates by tool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tools: dict[str, dict] = {}
+
+    def export(self, tool_call: ToolCallStats) -> None:
+        logger.info("Tool call telemetry: %s", json.dumps(asdict(tool_call)))
+        with self._lock:
+            stats = self._tools.setdefault(tool_call.tool_name, {
+                "calls": 0,
+                "total_wall_time_ms": 0.0,
+                "max_wall_time_ms": 0.0,
+                "total_query_time_ms": 0.0,
+                "queries": 0,
+                "cache_hits": 0,
+                "total_bytes_processed": 0,
+                "slot_millis": 0,
+                "total_response_bytes": 0,
+                "max_response_bytes": 0,
+            })
+            stats["calls"] += 1
+            stats["total_wall_time_ms"] += tool_call.wall_time_ms
+            stats["max_wall_time_ms"] = max(stats["max_wall_time_ms"],
+                                            tool_call.wall_time_ms)
+            stats["total_query_time_ms"] += tool_call.query_time_ms
+            stats["queries"] += len(tool_call.queries)
+            stats["cache_hits"] += sum(
+                1 for query in tool_call.queries if query.cache_hit)
+            stats["total_bytes_processed"] += tool_call.total_bytes_processed
+            stats["slot_millis"] += tool_call.slot_millis
+            stats["total_response_bytes"] += tool_call.response_bytes
+            stats["max_response_bytes"] = max(stats["max_response_bytes"],
+                                              tool_call.response_bytes)
+
+    def stats(self) -> dict[str, dict]:
+        with self._lock:
+            return {tool_name: {
+                **stats,
+                "average_wall_time_ms": stats["total_wall_time_ms"]
+                                        / stats["calls"],
+            } for tool_name, stats in self._tools.items()}
+
+
+class OpenTelemetrySink:
+    """
+      Exports every tool call as a span with a child span per query.
+
+      The spans go to the tracer provider of the process, e.g. the one set
+      up by Agent Engine tracing.
+    """
+
+    def __init__(self, tracer_provider=None):
+        from opentelemetry import trace
+        self._tracer = trace.get_tracer(__name__,
+                                        tracer_provider=tracer_provider)
+
+    def export(self, tool_call: ToolCallStats) -> None:
+        from opentelemetry import trace
+        end_time_ns = tool_call.start_time_ns \
+            + int(tool_call.wall_time_ms * 1_000_000)
+        span = self._tracer.start_span(
+            f"tool_call {tool_call.tool_name}",
+            start_time=tool_call.start_time_ns,
+            attributes={
+                "tool.name": tool_call.tool_name,
+                "tool.function_call_id": tool_call.function_call_id,
+                "tool.invocation_id": tool_call.invocation_id,
+                "tool.wall_time_ms": tool_call.wall_time_ms,
+                "tool.response_bytes": tool_call.response_bytes,
+                "bigquery.queries": len(tool_call.queries),
+                "bigquery.total_bytes_processed":
+                    tool_call.total_bytes_processed,
+                "bigquery.slot_millis": tool_call.slot_millis,
+            })
+        context = trace.set_span_in_context(span)
+        for query in tool_call.queries:
+            query_span = self._tracer.start_span(
+                "bigquery.query", context=context,
+                attributes={
+                    f"bigquery.{name}": value
+                    for name, value in asdict(query).items()
+                    if value is not None})
+            query_span.end()
+        span.end(end_time=end_time_ns)
+
+
+class NoSink:
+    def export(self, tool_call: ToolCallStats) -> None:
+        pass
+
+
+def create_sink(exporter: str) -> TelemetrySink:
+    if exporter == LOG_EXPORTER:
+        return LogSink()
+    if exporter == OPENTELEMETRY_EXPORTER:
+        return OpenTelemetrySink()
+    if exporter == NO_EXPORTER:
+        return NoSink()
+    raise ValueError(f"Unknown telemetry exporter '{exporter}'. "
+                     f"Use one of {EXPORTERS}")
+
+
+class ToolTelemetry:
+    """
+      Tracks the tool calls in flight and exports them when they finish.
+
+      Calls are tracked by function call id, as the before and after
+      callbacks of parallel tool calls interleave, so calls without an id
+      are not tracked. A call which raises never finishes, so only the last
+      `max_in_flight` calls are kept.
+
+      Args:
+          sink: Exporter of the finished tool calls
+          clock_ns: Clock of the wall time of the tool calls
+          max_in_flight: Number of tool calls which are tracked
+    """
+
+    def __init__(self, sink: TelemetrySink,
+                 clock_ns=time.perf_counter_ns, max_in_flight: int = 1000):
+        self.sink = sink
+        self._clock_ns = clock_ns
+        self.max_in_flight = max_in_flight
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, tuple[ToolCallStats, int]] = {}
+
+    def start(self, tool_name: str, function_call_id: str = "",
+              invocation_id: str = "") -> ToolCallStats:
+        tool_call = ToolCallStats(tool_name=tool_name,
+                                  function_call_id=function_call_id,
+                                  invocation_id=invocation_id,
+                                  start_time_ns=time.time_ns())
+        if not function_call_id:
+            return tool_call
+        with self._lock:
+            self._in_flight[function_call_id] = (tool_call, self._clock_ns())
+            while len(self._in_flight) > self.max_in_flight:
+                orphan = next(iter(self._in_flight))
+                logger.warning("Tool call %s never finished", orphan)
+                del self._in_flight[orphan]
+        _current_tool_call.set(tool_call)
+        return tool_call
+
+    def finish(self, function_call_id: str,
+               response: Any) -> Optional[ToolCallStats]:
+        with self._lock:
+            tool_call, started = self._in_flight.pop(function_call_id,
+                                                     (None, 0))
+        if tool_call is None:
+            return None
+        tool_call.wall_time_ms = (self._clock_ns() - started) / 1_000_000
+        tool_call.response_bytes = payload_size(response)
+        if _current_tool_call.get() is tool_call:
+            _current_tool_call.set(None)
+        try:
+            self.sink.export(tool_call)
+        except Exception as ex:
+            logger.error("Export of tool call telemetry failed: %s", str(ex))
+        return tool_call
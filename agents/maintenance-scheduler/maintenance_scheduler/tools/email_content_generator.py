@@ -15,20 +15,33 @@
 
 """Email content module"""
 
+import json
 import logging
+from functools import lru_cache
+from typing import Any, List
 
+from google import genai
 from google.adk.agents import Agent
-from google.adk.tools import agent_tool
-from .email_content_generator_prompts import INSTRUCTION
+from google.adk.tools import ToolContext, agent_tool
+from google.genai import types
+from pydantic import Field
+from .email_content_generator_prompts import BATCH_INSTRUCTION, INSTRUCTION
 
-from maintenance_scheduler.config import Config
+from maintenance_scheduler.config import get_config
 from maintenance_scheduler.entities.notification import Email, \
     MaintenanceNotification
+from maintenance_scheduler.shared_libraries import callbacks
+from maintenance_scheduler.shared_libraries.callbacks import \
+    rate_limit_callback, record_token_usage_callback
+from maintenance_scheduler.shared_libraries.email_cache import EmailCache, \
+    notification_key
 
-configs = Config()
+configs = get_config()
 
 logger = logging.getLogger(__name__)
 
+email_cache = EmailCache(max_entries=configs.email_cache_max_entries)
+
 email_notification_generator = Agent(
     name=configs.email_generator_agent_settings.name,
     description=configs.email_generator_agent_settings.description,
@@ -38,8 +51,142 @@ email_notification_generator = Agent(
     output_schema=Email,
     output_key="email",
     disallow_transfer_to_parent=True,
-    disallow_transfer_to_peers=True
+    disallow_transfer_to_peers=True,
+    before_model_callback=rate_limit_callback,
+    after_model_callback=record_token_usage_callback,
 )
 
+
+
+class CachedEmailAgentTool(agent_tool.AgentTool):
+    """
+      Runs the email generator agent for notifications without a cached email.
+
+      The emails are shared with generate_notification_emails, so a bus stop
+      gets the same email from both tools.
+    """
+
+    async def run_async(self, *, args: dict[str, Any],
+                        tool_context: ToolContext) -> Any:
+        try:
+            notification = MaintenanceNotification.model_validate(args)
+        except ValueError:
+            # The agent reports the invalid arguments
+            return await super().run_async(args=args,
+                                           tool_context=tool_context)
+
+        cached, _ = email_cache.get_many([notification])
+        if cached:
+            email = next(iter(cached.values())).model_dump()
+            tool_context.state[email_notification_generator.output_key] = email
+            return email
+
+        email = await super().run_async(args=args, tool_context=tool_context)
+        if isinstance(email, dict):
+            email_cache.put(notification, Email.model_validate(email))
+        return email
+
+
 email_content_generator_tool = \
-    agent_tool.AgentTool(agent=email_notification_generator)
+    CachedEmailAgentTool(agent=email_notification_generator)
+
+
+class NotificationEmail(Email):
+    """
+    Email generated for one of the notifications of a batch
+    """
+
+    notification_index: int = Field(
+        description="Index of the notification in the list")
+
+
+@lru_cache(maxsize=1)
+def get_genai_client() -> genai.Client:
+    if configs.GENAI_USE_VERTEXAI.lower() in ("1", "true"):
+        return genai.Client(vertexai=True, project=configs.CLOUD_PROJECT,
+                            location=configs.CLOUD_LOCATION)
+    return genai.Client(api_key=configs.API_KEY)
+
+
+async def generate_notification_emails(
+    notifications: List[MaintenanceNotification]
+) -> dict:
+    """
+      Generates the notification emails of several bus stop maintenances
+
+      Args:
+          notifications: Maintenance notifications, one per bus stop
+
+      Returns:
+          status and the list of emails, in the order of the notifications
+    """
+    try:
+        notifications = [MaintenanceNotification.model_validate(notification)
+                         for notification in notifications]
+    except ValueError as ex:
+        logger.error("Invalid notifications: %s", str(ex))
+        return {
+            "status": "error"
+        }
+
+    emails, missing = email_cache.get_many(notifications)
+    batch_size = max(1, configs.email_batch_size)
+    try:
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            for notification, email in zip(batch, await _generate_emails(batch)):
+                email_cache.put(notification, email)
+                emails[notification_key(notification)] = email
+    except Exception as ex:
+        logger.error("Generating notification emails failed: %s", str(ex))
+        return {
+            "status": "error"
+        }
+
+    logger.info("Generated %s notification emails, cache stats: %s",
+                len(missing), email_cache.stats())
+    return {
+        "status": "success",
+        "emails": [emails[notification_key(notification)]
+                   for notification in notifications]
+    }
+
+
+async def _generate_emails(
+    notifications: List[MaintenanceNotification]
+) -> List[Email]:
+    """Generates the emails of the notifications with a single model call."""
+    model = configs.email_generator_agent_settings.model
+    prompt = json.dumps([
+        {"notification_index": index, **notification.model_dump()}
+        for index, notification in enumerate(notifications)])
+    estimated_tokens = len(BATCH_INSTRUCTION + prompt) \
+        // callbacks.CHARACTERS_PER_TOKEN
+    limiter = callbacks.rate_limiters.get(model)
+    await limiter.acquire(estimated_tokens)
+
+    response = await get_genai_client().aio.models.generate_content(
+        model=model,
+        contents=prompt,
+        config=types.GenerateContentConfig(
+            system_instruction=BATCH_INSTRUCTION,
+            response_mime_type="application/json",
+            response_schema=list[NotificationEmail],
+            temperature=0.1,
+        ))
+    if response.usage_metadata and response.usage_metadata.total_token_count:
+        limiter.record_usage(estimated_tokens,
+                             response.usage_metadata.total_token_count)
+
+    generated = {email.notification_index: email
+                 for email in response.parsed or []}
+    if set(generated) != set(range(len(notifications))):
+        raise ValueError(
+            f"Expected {len(notifications)} emails, received indexes "
+            f"{sorted(generated)}")
+    return [Email(email_subject=generated[index].email_subject,
+                  email_body=generated[index].email_body)
+            for index in range(len(notifications))]
+
+
+generate_notification_emails_tool = generate_notification_emails
@@ -35,3 +35,9 @@ Sincerely,
 
 Automated Scheduling Assistant
 """
+
+BATCH_INSTRUCTION = INSTRUCTION + """
+You will receive a JSON list of bus stop maintenance notifications. Generate
+one email for every notification and return the notification_index of the
+notification which the email belongs to.
+"""
@@ -15,78 +15,179 @@
 
 """Tools module for the maintenance scheduling agent."""
 
+import asyncio
 import logging
-import random
-from datetime import datetime, timedelta
-from typing import List
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
 from zoneinfo import ZoneInfo
 
-from google.api_core.client_info import ClientInfo
+import numpy as np
+import pyarrow
+import pyarrow.compute
 from google.cloud import bigquery
-from google.cloud.bigquery.enums import JobCreationMode
 from google.cloud.bigquery.job import QueryJobConfig
+from google.adk.tools import ToolContext
+
+from maintenance_scheduler.config import get_config
+from maintenance_scheduler.entities.bus_stop import BusStopIncident, \
+    incidents_from_records
+from maintenance_scheduler.entities.maintenance import MaintenanceSchedule
+from maintenance_scheduler.shared_libraries import forecast_payload, \
+    maintenance_windows
+from maintenance_scheduler.shared_libraries.async_bigquery import \
+    AsyncBigQueryClient
+from maintenance_scheduler.shared_libraries.clients import \
+    get_client_registry
+from maintenance_scheduler.shared_libraries.forecast_cache import \
+    ForecastCache, ForecastPoints
+from maintenance_scheduler.shared_libraries.incident_cache import \
+    IncidentCache
+from maintenance_scheduler.shared_libraries.query_cost import QueryCost, \
+    QueryCostGuard, QueryBudgetExceeded
+from maintenance_scheduler.shared_libraries.ridership_forecaster import \
+    SeasonalRidershipForecaster
+from maintenance_scheduler.shared_libraries.scheduling_queue import \
+    SchedulingQueue
+from maintenance_scheduler.shared_libraries.synthetic_ridership import \
+    generate_ridership_history
+
+config = get_config()
+
+
+def get_bigquery_client() -> bigquery.Client:
+    """The shared BigQuery client, which is created on first use."""
+    if config.bigquery_backend == "duckdb":
+        from maintenance_scheduler.shared_libraries.local_bigquery import \
+            get_local_bigquery_client
+        return get_local_bigquery_client()
+    return get_client_registry().bigquery(
+        user_agent="cloud-solutions/data-to-ai-agents-scheduler-usage-v1")
+
+
+def get_bigquery_read_client():
+    """The BigQuery Storage Read API client, None for the local backend."""
+    if config.bigquery_backend == "duckdb":
+        return None
+    return get_client_registry().bigquery_read()
+
+
+def _estimate_query_costs() -> bool:
+    """Whether tool queries are dry-run first. DuckDB has no dry runs."""
+    return config.query_cost_estimates and config.bigquery_backend == "bigquery"
+
+
+def _with_query_cost(result: dict, query_cost: QueryCost) -> dict:
+    """Adds the estimates of the queries run by a tool to its response."""
+    if query_cost:
+        result["query_cost"] = query_cost.to_metadata()
+    return result
+
+
+async_bigquery_client = AsyncBigQueryClient(
+    get_bigquery_client,
+    max_concurrent_jobs=config.bigquery_max_concurrent_jobs)
+
+incident_cache = IncidentCache(ttl_secs=config.incident_cache_ttl_secs)
+
+forecast_cache = ForecastCache(
+    bucket_minutes=config.forecast_cache_bucket_minutes)
+
+query_cost_guard = QueryCostGuard(
+    max_bytes_processed=config.query_max_bytes_processed,
+    max_entries=config.query_cost_cache_max_entries)
 
-from toolbox_core import ToolboxSyncClient
-
-from maintenance_scheduler.config import Config
-from maintenance_scheduler.entities.bus_stop import BusStop, BusStopIncident, \
-    USAddress
+logger = logging.getLogger(__name__)
 
-bigquery_client = bigquery.Client(client_info=ClientInfo(
-    user_agent="cloud-solutions/data-to-ai-agents-scheduler-usage-v1"),
-    default_job_creation_mode=JobCreationMode.JOB_CREATION_OPTIONAL
-)
+time_zone = ZoneInfo("America/New_York")
 
-config = Config()
+FORECAST_PERIOD = timedelta(days=3)
 
-logger = logging.getLogger(__name__)
+local_forecaster = SeasonalRidershipForecaster(step_minutes=15,
+                                               time_zone=time_zone)
 
-time_zone = ZoneInfo("America/New_York")
+scheduling_queue = SchedulingQueue(
+    write_batch=lambda schedules: _write_maintenance_schedules(schedules),
+    max_batch_size=config.schedule_queue_max_batch_size,
+    max_delay_secs=config.schedule_queue_max_delay_secs,
+    journal_path=config.schedule_queue_journal_path)
 
 
-async def get_unresolved_incidents() -> List[BusStopIncident]:
-    # TODO: fix the example
+async def get_unresolved_incidents(
+    page_size: int = 0,
+    page_token: str = "",
+    city: str = "",
+    zip_code: str = ""
+) -> dict:
     """
       Get a list of unresolved bus stop incidents.
 
+      Incidents are returned in pages ordered by the incident id. If there
+      are more incidents, the result contains the `next_page_token` to pass to
+      the next call.
+
+      Args:
+          page_size: Maximum number of incidents to return, 0 for the default
+          page_token: `next_page_token` of the previous page, empty for the
+            first page
+          city: Only return incidents of bus stops in this city
+          zip_code: Only return incidents of bus stops with this ZIP code
+
       Returns:
           list: List of bust stop incidents
 
       Example:
           >>> get_unresolved_incidents()
-          [BusStopIncident(bus_stop=BusStop(id='5', address=USAddress(street='4999 list Avenue', city='Anytown', state='NY', zip='10001')), source_image_uri='gs://my-bucket-bus-stop-images/images/PA-02.jpg', source_image_mime_type='image/jpeg', status='open', description='"The bus stop appears to have some cleanliness issues. There is litter and dead leaves on the sidewalk and along the curb. The trash can is open and appears to have some trash inside. The bench has some wear and tear, but does not appear to be damaged. There are no obvious safety hazards. The bus stop includes a bench and a trash can. There is a bus stop sign visible in the background."'), BusStopIncident(bus_stop=BusStop(id='7', address=USAddress(street='3643 Tasmanian devil Street', city='Anytown', state='NY', zip='10001')), source_image_uri='gs://my-bucket-bus-stop-images/images/PC-01.jpg', source_image_mime_type='image/jpeg', status='open', description='"The bus stop appears to have a bench, a trash can, and a bus stop sign. The bench has some wear and tear, and there are leaves on the ground around the bench, indicating a need for cleaning. The trash can is present, which is good for cleanliness. There is no visible graffiti or damage to the bus stop amenities. The red curb is in good condition. The overall cleanliness is slightly compromised by the leaves and general wear, warranting a cleaning."')]
+          [BusStopIncident(bus_stop=BusStop(id='5', address=USAddress(street='4999 list Avenue', city='Anytown', state='NY', zip='10001')), incident_image_url='https://storage.mtls.cloud.google.com/my-bucket-bus-stop-images/images/PA-02.jpg', incident_image_mime_type='image/jpeg', status='open', description='"The bus stop appears to have some cleanliness issues. There is litter and dead leaves on the sidewalk and along the curb. The trash can is open and appears to have some trash inside. The bench has some wear and tear, but does not appear to be damaged. There are no obvious safety hazards. The bus stop includes a bench and a trash can. There is a bus stop sign visible in the background."'), BusStopIncident(bus_stop=BusStop(id='7', address=USAddress(street='3643 Tasmanian devil Street', city='Anytown', state='NY', zip='10001')), incident_image_url='https://storage.mtls.cloud.google.com/my-bucket-bus-stop-images/images/PC-01.jpg', incident_image_mime_type='image/jpeg', status='open', description='"The bus stop appears to have a bench, a trash can, and a bus stop sign. The bench has some wear and tear, and there are leaves on the ground around the bench, indicating a need for cleaning. The trash can is present, which is good for cleanliness. There is no visible graffiti or damage to the bus stop amenities. The red curb is in good condition. The overall cleanliness is slightly compromised by the leaves and general wear, warranting a cleaning."')]
       """
 
-    logger.info("Getting the list of incidents")
+    logger.info("Getting the list of incidents, page_size: %s, page_token: %s, "
+                "city: %s, zip_code: %s", page_size, page_token, city,
+                zip_code)
+    page_size = min(page_size or config.incidents_page_size,
+                    config.incidents_max_page_size)
+    # Only the first page of all incidents is requested repeatedly
+    first_page = not (page_token or city or zip_code) \
+        and page_size == config.incidents_page_size
     incidents = []
+    next_page_token = ""
+    query_cost = QueryCost()
     if config.mock_tools:
-        incidents.append(
-            BusStopIncident(
-                status="open",
-                bus_stop=BusStop(
-                    id='stop-1',
-                    address=USAddress(street="123 Main", city="New York",
-                                      state="NY", zip="10001")),
-                source_image_uri=f"https://storage.mtls.cloud.google.com/{config.CLOUD_PROJECT}-multimodal/sources/MA-02-broken-glass.jpg",
-                source_image_mime_type="image/jpeg"))
-        incidents.append(
-            BusStopIncident(
-                status="open",
-                bus_stop=BusStop(
-                    id='stop-2',
-                    address=USAddress(
-                        street="457 1st Street", city="New York", state="NY",
-                        zip="10002")),
-                source_image_uri="https://storage.mtls.cloud.google.com/{config.CLOUD_PROJECT}-multimodal/sources/MC-02-dirty-damaged.jpg",
-                source_image_mime_type="image/jpeg"))
+        incidents = incidents_from_records([
+            {
+                "incident_id": "incident-1",
+                "status": "open",
+                "bus_stop": {
+                    "id": "stop-1",
+                    "address": {"street": "123 Main", "city": "New York",
+                                "state": "NY", "zip": "10001"}},
+                "incident_image_url": f"https://storage.mtls.cloud.google.com/{config.CLOUD_PROJECT}-multimodal/sources/MA-02-broken-glass.jpg",
+                "incident_image_mime_type": "image/jpeg",
+                "description": "The glass panel of the bus shelter is broken."
+            },
+            {
+                "incident_id": "incident-2",
+                "status": "open",
+                "bus_stop": {
+                    "id": "stop-2",
+                    "address": {"street": "457 1st Street",
+                                "city": "New York", "state": "NY",
+                                "zip": "10002"}},
+                "incident_image_url": f"https://storage.mtls.cloud.google.com/{config.CLOUD_PROJECT}-multimodal/sources/MC-02-dirty-damaged.jpg",
+                "incident_image_mime_type": "image/jpeg",
+                "description": "The bus stop is dirty and the bench is damaged."
+            },
+        ])
+    elif first_page and (cached_page := incident_cache.get()) is not None:
+        incidents, next_page_token = cached_page
     else:
-        try:
-            rows = bigquery_client.query_and_wait(
-                project=config.get_bigquery_run_project(),
-                job_config=QueryJobConfig(
-                    job_timeout_ms=60 * 1000
-                ),
-                query=f"""
+        query_parameters = [
+            bigquery.ScalarQueryParameter('page_token', "STRING", page_token),
+            bigquery.ScalarQueryParameter('city', "STRING", city),
+            bigquery.ScalarQueryParameter('zip_code', "STRING", zip_code),
+            # One more row tells if there is a next page
+            bigquery.ScalarQueryParameter('limit', "INT64", page_size + 1),
+        ]
+        query = f"""
                 SELECT incidents.incident_id, incidents.bus_stop_id, incidents.status,
                     reports.uri as source_image_uri, reports.content_type as source_image_mime_type,
                     reports.description, bus_stops.address
@@ -95,26 +196,39 @@ async def get_unresolved_incidents() -> List[BusStopIncident]:
                     ON incidents.open_report_id = reports.report_id
                 JOIN `{config.get_bigquery_data_project()}.bus_stop_image_processing.bus_stops` bus_stops
                     ON incidents.bus_stop_id = bus_stops.bus_stop_id
-                WHERE incidents.status = 'OPEN' 
+                WHERE incidents.status = 'OPEN'
+                    AND incidents.incident_id > @page_token
+                    AND (@city = '' OR LOWER(bus_stops.address.city) = LOWER(@city))
+                    AND (@zip_code = '' OR bus_stops.address.zip = @zip_code)
+                ORDER BY incidents.incident_id
+                LIMIT @limit
             """
+        try:
+            if _estimate_query_costs():
+                await query_cost_guard.check(
+                    async_bigquery_client, query, query_parameters,
+                    project=config.get_bigquery_run_project(),
+                    cost=query_cost)
+            incidents = await async_bigquery_client.query_and_wait(
+                process_rows=_incidents_from_arrow,
+                project=config.get_bigquery_run_project(),
+                job_config=QueryJobConfig(
+                    job_timeout_ms=60 * 1000,
+                    query_parameters=query_parameters
+                ),
+                query=query
             )
-
-            for row in rows:
-                incidents.append(BusStopIncident(
-                    status=row.status.lower(),
-                    incident_image_url=row.source_image_uri.replace("gs://",
-                                                                    "https://storage.mtls.cloud.google.com/"),
-                    incident_image_mime_type=row.source_image_mime_type,
-                    description=row.description,
-                    bus_stop=BusStop(
-                        id=row.bus_stop_id,
-                        address=USAddress(
-                            street=row.address['street'],
-                            city=row.address['city'],
-                            state=row.address['state'],
-                            zip=row.address['zip'])
-                    )
-                ))
+            if len(incidents) > page_size:
+                incidents = incidents[:page_size]
+                next_page_token = incidents[-1].incident_id
+            if first_page:
+                incident_cache.put(incidents, next_page_token)
+        except QueryBudgetExceeded as ex:
+            logger.error("Call to retrieve incidents rejected: %s", str(ex))
+            return _with_query_cost({
+                "status": "error",
+                "message": str(ex)
+            }, query_cost)
         except Exception as ex:
             logger.error("Call to retrieve incidents failed: %s", str(ex))
             return {
@@ -122,17 +236,69 @@ async def get_unresolved_incidents() -> List[BusStopIncident]:
             }
 
     logger.info("Retrieved incidents: %s", incidents)
-    return {
+    result = {
         "status": "success",
         "bus_stop_incidents": incidents
     }
+    if next_page_token:
+        result["next_page_token"] = next_page_token
+    return _with_query_cost(result, query_cost)
+
 
+def _incidents_from_arrow(rows) -> List[BusStopIncident]:
+    """
+      Decodes the incident query result column by column.
 
-def get_expected_number_of_passengers(bus_stop_ids: list) -> dict:
+      The result is downloaded as an Arrow table, using the BigQuery Storage
+      Read API for large results, instead of being parsed one row at a time.
+    """
+    table = rows.to_arrow(bqstorage_client=get_bigquery_read_client())
+    if table.num_rows == 0:
+        return []
+    address = table.column("address").combine_chunks()
+    columns = zip(
+        table.column("incident_id").to_pylist(),
+        table.column("bus_stop_id").to_pylist(),
+        pyarrow.compute.utf8_lower(table.column("status")).to_pylist(),
+        pyarrow.compute.replace_substring(
+            table.column("source_image_uri"), "gs://",
+            "https://storage.mtls.cloud.google.com/").to_pylist(),
+        table.column("source_image_mime_type").to_pylist(),
+        table.column("description").to_pylist(),
+        address.field("street").to_pylist(),
+        address.field("city").to_pylist(),
+        address.field("state").to_pylist(),
+        address.field("zip").to_pylist())
+    return incidents_from_records(
+        ({
+            "incident_id": incident_id,
+            "status": status,
+            "bus_stop": {
+                "id": bus_stop_id,
+                "address": {"street": street, "city": city, "state": state,
+                            "zip": zip_code}},
+            "incident_image_url": incident_image_url,
+            "incident_image_mime_type": incident_image_mime_type,
+            "description": description
+        } for (incident_id, bus_stop_id, status, incident_image_url,
+               incident_image_mime_type, description, street, city, state,
+               zip_code) in columns))
+
+
+async def get_expected_number_of_passengers(
+    bus_stop_ids: list,
+    payload_format: str = ""
+) -> dict:
     """Provides expected number of passengers for a particular bus stop at some point in the future.
 
       Args:
           bus_stop_ids: The list of bus stop ids
+          payload_format: Optional. "rows" returns a list of time and number
+            of passengers pairs. "columnar" returns the time of the first
+            entry, the number of minutes between entries and the list of the
+            numbers of passengers. "columnar_rle" is the same as "columnar",
+            but three or more consecutive equal numbers of passengers are
+            returned as a [number_of_passengers, number_of_entries] pair.
 
       Returns:
           A dictionary, where the key is the bus stop id  and the value is the list
@@ -149,84 +315,350 @@ def get_expected_number_of_passengers(bus_stop_ids: list) -> dict:
               {"time": "2025-04-21 18:07:33.463897+00:00", "number_of_passengers":	7},
               {"time": "2025-04-21 18:08:33.463897+00:00", "number_of_passengers":	10}]
           }
+          >>> get_expected_number_of_passengers(bus_stop_ids=['bus-stop-1'], payload_format='columnar_rle')
+          {"bus-stop-1":
+              {"start": "04/21/2025 18:15", "step_minutes": 15,
+               "number_of_passengers_rle": [13, 13, 15, [0, 28], 4]}
+          }
       """
     logger.info("Retrieving expected number of passengers for %s", bus_stop_ids)
 
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ArrayQueryParameter('bus_stop_ids', "STRING", bus_stop_ids)
-        ]
-    )
+    payload_format = payload_format or config.forecast_payload_format
+    if payload_format not in forecast_payload.PAYLOAD_FORMATS:
+        return {
+            "status": "error",
+            "message": f"Unknown payload format '{payload_format}'. "
+                       f"Use one of {forecast_payload.PAYLOAD_FORMATS}"
+        }
+
+    query_cost = QueryCost()
+    try:
+        forecasts = await _get_forecasts(bus_stop_ids, query_cost)
+    except QueryBudgetExceeded as ex:
+        logger.error("Call to retrieve bus stop ridership rejected: %s",
+                     str(ex))
+        return _with_query_cost({
+            "status": "error",
+            "message": str(ex)
+        }, query_cost)
+    except Exception as ex:
+        logger.error("Call to retrieve bus stop ridership failed: %s",
+                     str(ex))
+        return {
+            "status": "error"
+        }
 
     all_bus_stop_forecasts = {}
-    if config.mock_tools:
-        for bus_stop_id in bus_stop_ids:
-            forecast = []
-            base_number_of_passengers = random.randint(5, 20)
-            for next_increment in range(10, 3 * 24 * 60, 15):
-                forecast.append({'time': (
-                    datetime.now(tz=time_zone) + timedelta(
-                    minutes=next_increment)
-                ).isoformat(), 'number_of_passengers': (
-                    base_number_of_passengers + random.randint(3, 10))})
+    now = datetime.now(tz=timezone.utc)
+    forecast_end = now + FORECAST_PERIOD
+    for bus_stop_id in bus_stop_ids:
+        points = forecasts.get(bus_stop_id, [])
+        if payload_format == forecast_payload.ROWS:
+            forecast = forecast_payload.rows_payload(
+                points, now, forecast_end, time_zone)
+        else:
+            forecast = forecast_payload.columnar_payload(
+                points, now, forecast_end, time_zone,
+                run_length_encoding=(
+                    payload_format == forecast_payload.COLUMNAR_RLE))
+        if forecast:
             all_bus_stop_forecasts[bus_stop_id] = forecast
-    else:
-        try:
-            rows = bigquery_client.query_and_wait(
-                job_config=job_config,
-                project=config.get_bigquery_run_project(),
-                query=f"""
-                WITH forecast AS (
-                    SELECT
-                      bus_stop_id, forecast_timestamp, 
-                      CAST(forecast_value AS INT64) as expected_number_of_passengers
-                    FROM
-                      AI.FORECAST(
-                        (SELECT bus_stop_id, event_ts, num_riders
-                          FROM `{config.get_bigquery_data_project()}.bus_stop_image_processing.bus_ridership`
-                          WHERE bus_stop_id IN UNNEST(@bus_stop_ids)),
-                        data_col => 'num_riders',
-                        timestamp_col => 'event_ts',
-                        model => 'TimesFM 2.0',
-                        id_cols => ['bus_stop_id'],
-                        horizon => 500,
-                        confidence_level => .8)
-                )
-                SELECT bus_stop_id, forecast_timestamp, expected_number_of_passengers 
-                    FROM forecast WHERE forecast_timestamp BETWEEN CURRENT_TIMESTAMP() AND TIMESTAMP_ADD(CURRENT_TIMESTAMP(), INTERVAL 3 DAY) """
-            )
 
-            for row in rows:
-                bus_stop_id = row.bus_stop_id
-                forecast = all_bus_stop_forecasts[bus_stop_id] \
-                    if bus_stop_id in all_bus_stop_forecasts else []
-                forecast.append(
-                    {'time': row.forecast_timestamp
-                    .replace(tzinfo=ZoneInfo('UTC')).astimezone(time_zone)
-                    .strftime("%m/%d/%Y %H:%M"),
-                     'number_of_passengers': row.expected_number_of_passengers
-                     })
-                all_bus_stop_forecasts[bus_stop_id] = forecast
+    return _with_query_cost({
+        "status": "success",
+        "forecast": all_bus_stop_forecasts
+    }, query_cost)
+
+
+async def find_maintenance_windows(
+    bus_stop_ids: list,
+    duration_hours: float,
+    working_hours_only: bool = True,
+    working_hours_start: Optional[int] = None,
+    working_hours_end: Optional[int] = None,
+    allow_weekends: bool = False,
+    min_lead_minutes: int = 30,
+    number_of_windows: int = 3
+) -> dict:
+    """
+      Finds the maintenance windows which affect the fewest passengers.
 
-        except Exception as ex:
-            logger.error("Call to retrieve bus stop ridership failed: %s",
-                         str(ex))
-            return {
-                "status": "error"
-            }
+      Use this tool instead of reading the forecasts of
+      get_expected_number_of_passengers to select the maintenance time.
+      Windows start at the first forecast step of an hour and don't
+      overlap each other.
+
+      Args:
+          bus_stop_ids: The list of bus stop ids
+          duration_hours: Expected duration of the maintenance in hours
+          working_hours_only: Whether the maintenance must take place within
+            the working hours
+          working_hours_start: Optional hour, from 0 to 23, when the working
+            hours start, instead of the regular start
+          working_hours_end: Optional hour, from 1 to 24, when the working
+            hours end, instead of the regular end
+          allow_weekends: Whether the maintenance can take place on weekends
+          min_lead_minutes: Minimum number of minutes between now and the
+            start of the maintenance
+          number_of_windows: Maximum number of windows returned per bus stop
+
+      Returns:
+          For each bus stop, the best windows with their start time, end time
+          and the expected number of passengers during the window, best first.
 
-    return {
+      Example:
+          >>> find_maintenance_windows(bus_stop_ids=['bus-stop-1'], duration_hours=2)
+          {"status": "success", "windows": {"bus-stop-1": [
+              {"start": "04/22/2025 10:00", "end": "04/22/2025 12:00",
+               "expected_number_of_passengers": 73},
+              {"start": "04/21/2025 13:00", "end": "04/21/2025 15:00",
+               "expected_number_of_passengers": 80}]}}
+      """
+    logger.info("Finding maintenance windows for %s, duration: %s hours",
+                bus_stop_ids, duration_hours)
+    if duration_hours <= 0 or number_of_windows <= 0:
+        return {
+            "status": "error",
+            "message": "duration_hours and number_of_windows must be positive"
+        }
+    if working_hours_start is None:
+        working_hours_start = config.working_hours_start
+    if working_hours_end is None:
+        working_hours_end = config.working_hours_end
+    if not 0 <= working_hours_start < working_hours_end <= 24:
+        return {
+            "status": "error",
+            "message": "working hours must satisfy "
+                       "0 <= working_hours_start < working_hours_end <= 24"
+        }
+
+    query_cost = QueryCost()
+    try:
+        forecasts = await _get_forecasts(bus_stop_ids, query_cost)
+    except QueryBudgetExceeded as ex:
+        logger.error("Call to retrieve bus stop ridership rejected: %s",
+                     str(ex))
+        return _with_query_cost({
+            "status": "error",
+            "message": str(ex)
+        }, query_cost)
+    except Exception as ex:
+        logger.error("Call to retrieve bus stop ridership failed: %s",
+                     str(ex))
+        return {
+            "status": "error"
+        }
+
+    now = datetime.now(tz=timezone.utc)
+    duration = timedelta(hours=duration_hours)
+    # Bus stops sharing the same forecast grid are searched together
+    grids = {}
+    for bus_stop_id in dict.fromkeys(bus_stop_ids):
+        grid = forecast_payload.to_grid(forecasts.get(bus_stop_id, []), now,
+                                        now + FORECAST_PERIOD)
+        if grid is not None:
+            first, step, values = grid
+            grids.setdefault((first, step, len(values)), []).append(
+                (bus_stop_id, values))
+
+    all_windows = {bus_stop_id: [] for bus_stop_id in bus_stop_ids}
+    for (first, step, _), bus_stops in grids.items():
+        windows = maintenance_windows.find_maintenance_windows(
+            np.stack([values for _, values in bus_stops]),
+            start=first,
+            step=step,
+            time_zone=time_zone,
+            duration=duration,
+            not_before=now + timedelta(minutes=min_lead_minutes),
+            working_hours=(working_hours_start, working_hours_end)
+            if working_hours_only else None,
+            allow_weekends=allow_weekends,
+            number_of_windows=number_of_windows)
+        for (bus_stop_id, _), bus_stop_windows in zip(bus_stops, windows):
+            all_windows[bus_stop_id] = [
+                {"start": (first + step * index).astimezone(time_zone)
+                .strftime(forecast_payload.TIME_FORMAT),
+                 "end": (first + step * index + duration).astimezone(time_zone)
+                 .strftime(forecast_payload.TIME_FORMAT),
+                 "expected_number_of_passengers": number_of_passengers}
+                for index, number_of_passengers in bus_stop_windows]
+
+    return _with_query_cost({
         "status": "success",
-        "forecast": all_bus_stop_forecasts
-    }
+        "windows": all_windows
+    }, query_cost)
+
+
+async def _get_forecasts(
+    bus_stop_ids: List[str],
+    query_cost: QueryCost
+) -> dict[str, ForecastPoints]:
+    """
+      Forecasts of the bus stops, served from the cache when possible.
+
+      The estimates of the forecast queries are added to `query_cost`.
+    """
+    if config.mock_tools:
+        return _mock_forecasts(bus_stop_ids)
+
+    forecast_bucket = forecast_cache.current_bucket()
+    forecasts, missing_bus_stop_ids = forecast_cache.get_many(
+        bus_stop_ids, forecast_bucket)
+    if missing_bus_stop_ids:
+        new_forecasts = await _forecast_number_of_passengers(
+            missing_bus_stop_ids, query_cost)
+        forecast_cache.put_many(new_forecasts, missing_bus_stop_ids,
+                                forecast_bucket)
+        forecasts.update(new_forecasts)
+    return forecasts
+
+
+async def _forecast_number_of_passengers(
+    bus_stop_ids: List[str],
+    query_cost: QueryCost
+) -> dict[str, ForecastPoints]:
+    """
+      Forecasts the ridership using the configured forecast backend.
 
+      AI.FORECAST calls which fail, take longer than `forecast_timeout_secs`
+      or are estimated above the byte budget fall back to the local
+      forecaster if `local_forecast_fallback` is set.
+    """
+    if config.forecast_backend == "local":
+        return await _forecast_number_of_passengers_locally(bus_stop_ids,
+                                                            query_cost)
+    try:
+        return await asyncio.wait_for(
+            _forecast_number_of_passengers_with_bigquery(bus_stop_ids,
+                                                         query_cost),
+            timeout=config.forecast_timeout_secs)
+    except Exception as ex:
+        if not config.local_forecast_fallback:
+            raise
+        logger.warning("AI.FORECAST call failed, using the local forecaster: "
+                       "%s", repr(ex))
+        return await _forecast_number_of_passengers_locally(bus_stop_ids,
+                                                            query_cost)
+
+
+def _forecast_horizon() -> int:
+    """Number of forecasted steps."""
+    # Forecasts are reused until the end of the cache bucket, so the forecast
+    # period is extended by the bucket length.
+    return int((FORECAST_PERIOD + timedelta(
+        minutes=forecast_cache.bucket_minutes)) / local_forecaster.step)
+
+
+async def _forecast_number_of_passengers_with_bigquery(
+    bus_stop_ids: List[str],
+    query_cost: QueryCost
+) -> dict[str, ForecastPoints]:
+    """
+      Runs AI.FORECAST for the given bus stops.
 
-def schedule_maintenance(
+      A query estimated above the byte budget is rejected. The dry run
+      doesn't account for the pruning of the clustered `bus_ridership`
+      table, so fewer bus stops don't lower the estimate.
+    """
+    forecast_minutes = int(FORECAST_PERIOD.total_seconds() // 60) \
+        + forecast_cache.bucket_minutes
+    query_parameters = [
+        bigquery.ArrayQueryParameter('bus_stop_ids', "STRING", bus_stop_ids),
+        bigquery.ScalarQueryParameter('forecast_minutes', "INT64",
+                                      forecast_minutes)
+    ]
+
+    query = f"""
+        WITH forecast AS (
+            SELECT
+              bus_stop_id, forecast_timestamp,
+              CAST(forecast_value AS INT64) as expected_number_of_passengers
+            FROM
+              AI.FORECAST(
+                (SELECT bus_stop_id, event_ts, num_riders
+                  FROM `{config.get_bigquery_data_project()}.bus_stop_image_processing.bus_ridership`
+                  WHERE bus_stop_id IN UNNEST(@bus_stop_ids)),
+                data_col => 'num_riders',
+                timestamp_col => 'event_ts',
+                model => 'TimesFM 2.0',
+                id_cols => ['bus_stop_id'],
+                horizon => 500,
+                confidence_level => .8)
+        )
+        SELECT bus_stop_id, forecast_timestamp, expected_number_of_passengers
+            FROM forecast WHERE forecast_timestamp BETWEEN CURRENT_TIMESTAMP() AND TIMESTAMP_ADD(CURRENT_TIMESTAMP(), INTERVAL @forecast_minutes MINUTE)
+            ORDER BY bus_stop_id, forecast_timestamp """
+    if _estimate_query_costs():
+        await query_cost_guard.check(
+            async_bigquery_client, query, query_parameters,
+            project=config.get_bigquery_run_project(), cost=query_cost)
+    rows = await async_bigquery_client.query_and_wait(
+        job_config=bigquery.QueryJobConfig(
+            job_timeout_ms=int(config.forecast_timeout_secs * 1000),
+            query_parameters=query_parameters),
+        project=config.get_bigquery_run_project(),
+        query=query)
+
+    forecasts = {}
+    for row in rows:
+        forecasts.setdefault(row.bus_stop_id, []).append(
+            (row.forecast_timestamp.replace(tzinfo=timezone.utc),
+             row.expected_number_of_passengers))
+    return forecasts
+
+
+async def _forecast_number_of_passengers_locally(
+    bus_stop_ids: List[str],
+    query_cost: QueryCost
+) -> dict[str, ForecastPoints]:
+    """Forecasts the ridership from the recent `bus_ridership` history."""
+    query_parameters = [
+        bigquery.ArrayQueryParameter('bus_stop_ids', "STRING", bus_stop_ids),
+        bigquery.ScalarQueryParameter('history_days', "INT64",
+                                      config.local_forecast_history_days)
+    ]
+
+    query = f"""
+        SELECT bus_stop_id, event_ts, num_riders
+            FROM `{config.get_bigquery_data_project()}.bus_stop_image_processing.bus_ridership`
+            WHERE bus_stop_id IN UNNEST(@bus_stop_ids)
+                AND event_ts >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL @history_days DAY) """
+    if _estimate_query_costs():
+        await query_cost_guard.check(
+            async_bigquery_client, query, query_parameters,
+            project=config.get_bigquery_run_project(), cost=query_cost)
+    start = datetime.now(tz=timezone.utc)
+    horizon = _forecast_horizon()
+    # The forecast is computed in the worker thread which reads the rows.
+    forecast = await async_bigquery_client.query_and_wait(
+        job_config=bigquery.QueryJobConfig(query_parameters=query_parameters),
+        project=config.get_bigquery_run_project(),
+        query=query,
+        process_rows=lambda rows:
+        local_forecaster.forecast_rows(bus_stop_ids, rows, start, horizon))
+    return forecast.to_points()
+
+
+def _mock_forecasts(bus_stop_ids: List[str]) -> dict[str, ForecastPoints]:
+    """Forecasts the ridership of synthetic bus stops."""
+    now = datetime.now(tz=timezone.utc)
+    event_ts, num_riders = generate_ridership_history(
+        len(bus_stop_ids), end=now,
+        days=config.local_forecast_history_days,
+        step_minutes=int(local_forecaster.step.total_seconds() // 60),
+        time_zone=time_zone)
+    profiles = local_forecaster.fit_series(event_ts, num_riders)
+    return local_forecaster.forecast(
+        bus_stop_ids, profiles, now, _forecast_horizon()).to_points()
+
+
+async def schedule_maintenance(
     bus_stop_id: str,
     maintenance_start: str,
     reason: str,
     notification_subject: str,
-    notification_content: str
+    notification_content: str,
+    tool_context: ToolContext = None
 ) -> dict:
     """
       Schedule a bus stop maintenance
@@ -240,7 +672,9 @@ def schedule_maintenance(
 
 
       Returns:
-        status of the scheduling.
+        status of the scheduling. It is 'accepted' if the maintenance will be
+        written in the background, the result is reported when the current
+        request completes.
 
       Example:
           >>> schedule_maintenance('stop-1', "April 2, 2025, at 3:00 PM EST", "Broken glass is a safety concern and needs to be cleaned right away.", "Bus stop stop-1 maintenance required", "Notification content")
@@ -251,6 +685,18 @@ def schedule_maintenance(
         f"Scheduling maintenance for {bus_stop_id} at {maintenance_start} "
         f"because: {reason}, subject: {notification_subject}, content: {notification_content}")
 
+    if config.schedule_write_behind:
+        pending = await scheduling_queue.enqueue(
+            MaintenanceSchedule(
+                bus_stop_id=bus_stop_id,
+                maintenance_start=maintenance_start,
+                reason=reason,
+                notification_subject=notification_subject,
+                notification_content=notification_content),
+            invocation_id=tool_context.invocation_id if tool_context else "")
+        # The incident stays listed until the batch with it is written
+        return {"status": "accepted", "pending_schedules": pending}
+
     if not config.mock_tools:
         job_config = bigquery.QueryJobConfig(
             query_parameters=[
@@ -266,7 +712,7 @@ def schedule_maintenance(
             ]
         )
         try:
-            bigquery_client.query_and_wait(
+            await async_bigquery_client.query_and_wait(
                 project=config.get_bigquery_run_project(),
                 job_config=job_config,
                 query=f"""
@@ -285,10 +731,120 @@ def schedule_maintenance(
             return {
                 "status": "error"
             }
+        incident_cache.mark_scheduled(bus_stop_id)
 
     return {"status": "success"}
 
 
+async def schedule_maintenance_batch(
+    schedules: List[MaintenanceSchedule]
+) -> dict:
+    """
+      Schedule maintenance of several bus stops at once
+
+      Args:
+          schedules: Maintenance to schedule, one entry per bus stop
+
+      Returns:
+        status of the scheduling and the result for each bus stop, which is
+        'scheduled' or 'no_open_incident'.
+
+      Example:
+          >>> schedule_maintenance_batch([{"bus_stop_id": "stop-1", "maintenance_start": "April 2, 2025, at 3:00 PM EST", "reason": "Broken glass is a safety concern and needs to be cleaned right away.", "notification_subject": "Bus stop stop-1 maintenance required", "notification_content": "Notification content"}])
+          {'status': 'success', 'results': {'stop-1': 'scheduled'}}
+      """
+
+    try:
+        # A bus stop can only be merged once, the last entry wins
+        schedules = list({
+            schedule.bus_stop_id: schedule for schedule in (
+                MaintenanceSchedule.model_validate(schedule)
+                for schedule in schedules)}.values())
+    except ValueError as ex:
+        logger.error("Invalid maintenance schedules: %s", str(ex))
+        return {
+            "status": "error"
+        }
+
+    logger.info("Scheduling maintenance for %s bus stops: %s",
+                len(schedules),
+                [schedule.bus_stop_id for schedule in schedules])
+
+    if not schedules:
+        return {"status": "success", "results": {}}
+
+    try:
+        results = await _write_maintenance_schedules(schedules)
+    except Exception as ex:
+        logger.error("Call to merge incidents failed: %s", str(ex))
+        return {
+            "status": "error"
+        }
+    return {"status": "success", "results": results}
+
+
+async def _write_maintenance_schedules(
+    schedules: List[MaintenanceSchedule]
+) -> dict[str, str]:
+    """
+      Schedules the maintenance of several bus stops with a single MERGE.
+
+      Returns:
+          'scheduled' or 'no_open_incident' for each bus stop
+    """
+    if config.mock_tools:
+        return {schedule.bus_stop_id: "scheduled" for schedule in schedules}
+
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[
+            bigquery.ArrayQueryParameter('schedules', "STRUCT", [
+                bigquery.StructQueryParameter(
+                    None,
+                    *[bigquery.ScalarQueryParameter(name, "STRING", value)
+                      for name, value in schedule.model_dump().items()])
+                for schedule in schedules])
+        ]
+    )
+    incidents_table = \
+        f"`{config.get_bigquery_data_project()}.bus_stop_image_processing.incidents`"
+    scheduled_bus_stop_ids = await async_bigquery_client.query_and_wait(
+        process_rows=lambda rows: {row.bus_stop_id for row in rows},
+        project=config.get_bigquery_run_project(),
+        job_config=job_config,
+        query=f"""
+        MERGE {incidents_table} incidents
+        USING UNNEST(@schedules) schedules
+        ON incidents.bus_stop_id = schedules.bus_stop_id
+            AND incidents.status = 'OPEN'
+        WHEN MATCHED THEN UPDATE SET
+            status = 'SCHEDULED',
+            maintenance_details = STRUCT(
+                schedules.maintenance_start as scheduled_time,
+                schedules.reason as reason,
+                schedules.notification_subject as notification_subject,
+                schedules.notification_content as notification_body);
+
+        SELECT DISTINCT incidents.bus_stop_id
+        FROM {incidents_table} incidents
+        JOIN UNNEST(@schedules) schedules
+            ON incidents.bus_stop_id = schedules.bus_stop_id
+        WHERE incidents.status = 'SCHEDULED'
+            AND incidents.maintenance_details.scheduled_time
+                = schedules.maintenance_start
+            AND incidents.maintenance_details.reason = schedules.reason
+        """
+    )
+
+    results = {}
+    for schedule in schedules:
+        if schedule.bus_stop_id in scheduled_bus_stop_ids:
+            incident_cache.mark_scheduled(schedule.bus_stop_id)
+            results[schedule.bus_stop_id] = "scheduled"
+        else:
+            results[schedule.bus_stop_id] = "no_open_incident"
+    return results
+
+
 def get_current_time() -> str:
     """
       Returns current time
@@ -323,13 +879,27 @@ def is_time_on_weekend(day: int, month: int, year: int) -> bool:
 
 get_unresolved_incidents_tool = get_unresolved_incidents
 get_expected_number_of_passengers_tool = get_expected_number_of_passengers
+find_maintenance_windows_tool = find_maintenance_windows
 schedule_maintenance_tool = schedule_maintenance
+schedule_maintenance_batch_tool = schedule_maintenance_batch
+
 
-if config.use_mcp_toolbox:
+def get_data_tools() -> list:
+    """
+      Tools which read and update the incidents and the ridership data.
+
+      When the MCP toolbox is used, the tools are loaded from the toolbox
+      server when the agent first needs them.
+    """
+    if not config.use_mcp_toolbox:
+        return [get_unresolved_incidents_tool,
+                get_expected_number_of_passengers_tool,
+                schedule_maintenance_tool,
+                schedule_maintenance_batch_tool]
     if not config.mcp_toolbox_uri:
         raise ValueError(
             "mcp_toolbox_uri must be set when use_mcp_toolbox is set to True.")
-    toolbox = ToolboxSyncClient(config.mcp_toolbox_uri)
-    get_unresolved_incidents_tool = toolbox.load_tool('get-unresolved-incidents')
-    get_expected_number_of_passengers_tool = toolbox.load_tool('get-expected-number-of-passengers')
-    schedule_maintenance_tool = toolbox.load_tool('schedule-maintenance')
+    from google.adk.tools.toolbox_toolset import ToolboxToolset
+    return [ToolboxToolset(
+        server_url=config.mcp_toolbox_uri,
+        toolset_name='maintenance_scheduler')]
@@ -0,0 +1,193 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Long-lived Google API clients shared by the tools of the process.
+
+Creating a client sets up credentials, TLS connections and, for gRPC based
+APIs, a channel. The registry creates every client once and hands out the
+same instance to all tools, so repeated tool calls reuse warm connections.
+
+HTTP based clients (BigQuery, Cloud Storage) get a connection pool sized for
+the number of concurrent tool calls. gRPC based clients (Conversational
+Analytics) get a channel with keep-alive pings, so idle channels are not
+silently dropped between agent turns. gRPC asyncio channels are bound to the
+event loop which created them, so async clients are kept per event loop.
+"""
+
+import asyncio
+import logging
+import threading
+from collections import Counter
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOUD_PLATFORM_SCOPE = "https://www.googleapis.com/auth/cloud-platform"
+
+
+class ClientRegistry:
+    """
+      Creates Google API clients on first use and reuses them afterwards.
+
+      Clients are keyed by their type and settings. The module level imports
+      of the client libraries are deferred until a client is requested, so
+      agents only pay for the APIs they use. An agent keeps one registry for
+      the process.
+
+      Args:
+          max_pool_connections: Size of the connection pools of the HTTP
+              based clients
+          keepalive_time_ms: Interval of the keep-alive pings of the gRPC
+              channels
+    """
+
+    def __init__(self, max_pool_connections: int = 16,
+                 keepalive_time_ms: int = 30_000):
+        self.max_pool_connections = max_pool_connections
+        self.keepalive_time_ms = keepalive_time_ms
+        self._lock = threading.Lock()
+        self._clients: dict[tuple, Any] = {}
+        self._sessions: dict[tuple, Any] = {}
+        self._handouts: Counter = Counter()
+
+    def bigquery(self, project: Optional[str] = None,
+                 user_agent: Optional[str] = None):
+        """BigQuery client which creates jobs only when needed."""
+
+        def create():
+            from google.api_core.client_info import ClientInfo
+            from google.cloud import bigquery
+            from google.cloud.bigquery.enums import JobCreationMode
+            session = self._http_session(key)
+            return bigquery.Client(
+                project=project,
+                credentials=session.credentials,
+                _http=session,
+                client_info=ClientInfo(user_agent=user_agent)
+                if user_agent else None,
+                default_job_creation_mode=JobCreationMode
+                .JOB_CREATION_OPTIONAL)
+
+        key = ("bigquery", project, user_agent)
+        return self._get(key, create)
+
+    def storage(self, project: Optional[str] = None):
+        """Cloud Storage client."""
+
+        def create():
+            from google.cloud import storage
+            session = self._http_session(key)
+            return storage.Client(project=project,
+                                  credentials=session.credentials,
+                                  _http=session)
+
+        key = ("storage", project)
+        return self._get(key, create)
+
+    def bigquery_read(self):
+        """BigQuery Storage Read API client used to download large results."""
+        from google.cloud import bigquery_storage
+        return self._get(
+            ("bigquery_read",),
+            lambda: self._grpc_client(bigquery_storage.BigQueryReadClient))
+
+    def data_chat(self):
+        """Conversational Analytics chat client."""
+        from google.cloud import geminidataanalytics
+        return self._get(
+            ("data_chat",),
+            lambda: self._grpc_client(
+                geminidataanalytics.DataChatServiceClient))
+
+    def data_chat_async(self):
+        """Conversational Analytics chat client for the running event loop."""
+        from google.cloud import geminidataanalytics
+        loop = asyncio.get_running_loop()
+        return self._get(
+            ("data_chat_async", loop),
+            lambda: self._grpc_client(
+                geminidataanalytics.DataChatServiceAsyncClient,
+                transport="grpc_asyncio"))
+
+    def data_agent(self):
+        """Conversational Analytics data agent client."""
+        from google.cloud import geminidataanalytics
+        return self._get(
+            ("data_agent",),
+            lambda: self._grpc_client(
+                geminidataanalytics.DataAgentServiceClient))
+
+    def stats(self) -> dict[str, dict]:
+        """
+          Number of times each client was handed out and, for HTTP based
+          clients, the state of the connection pools by host.
+        """
+        with self._lock:
+            keys = list(self._clients)
+            stats = {}
+            for key in keys:
+                client_stats = {"handouts": self._handouts[key]}
+                if key in self._sessions:
+                    client_stats["pools"] = _pool_stats(self._sessions[key])
+                stats["/".join(str(part) for part in key
+                               if part is not None)] = client_stats
+        return stats
+
+    def _get(self, key: tuple, create: Callable[[], Any]) -> Any:
+        with self._lock:
+            self._handouts[key] += 1
+            if key not in self._clients:
+                logger.info("Creating %s client", key[0])
+                self._clients[key] = create()
+            return self._clients[key]
+
+    def _http_session(self, key: tuple):
+        import google.auth
+        from google.auth.transport.requests import AuthorizedSession
+        from requests.adapters import HTTPAdapter
+
+        credentials, _ = google.auth.default(scopes=[CLOUD_PLATFORM_SCOPE])
+        session = AuthorizedSession(credentials)
+        # Connections are kept alive by the pool and reused by the next call
+        adapter = HTTPAdapter(pool_connections=self.max_pool_connections,
+                              pool_maxsize=self.max_pool_connections)
+        session.mount("https://", adapter)
+        self._sessions[key] = session
+        return session
+
+    def _grpc_client(self, client_class, transport: str = "grpc"):
+        transport_class = client_class.get_transport_class(transport)
+        channel = transport_class.create_channel(options=[
+            ("grpc.keepalive_time_ms", self.keepalive_time_ms),
+            ("grpc.keepalive_timeout_ms", 10_000),
+            ("grpc.keepalive_permit_without_calls", 1),
+            ("grpc.http2.max_pings_without_data", 0),
+        ])
+        return client_class(transport=transport_class(channel=channel))
+
+
+def _pool_stats(session) -> dict[str, dict]:
+    pools = session.get_adapter("https://").poolmanager.pools
+    stats = {}
+    for pool_key in list(pools.keys()):
+        pool = pools.get(pool_key)
+        if pool is None:
+            continue
+        stats[pool.host] = {
+            "connections_created": pool.num_connections,
+            "requests": pool.num_requests,
+            "idle_connections": pool.pool.qsize() if pool.pool else 0,
+            "max_connections": pool.pool.maxsize if pool.pool else 0,
+        }
+    return stats
@@ -0,0 +1,214 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cached, non-blocking downloads of Cloud Storage objects.
+
+An object is downloaded with a single request, which also returns its
+generation, etag and content type, and a missing object is reported by the
+download itself instead of a separate existence check.
+
+Downloaded objects are kept in a process-wide cache bounded by their total
+size, so the images of a bus stop are downloaded once for all sessions.
+Cached objects are served without a request for `revalidate_secs`; after that
+the download is conditional on the generation and only transfers the object
+if it was replaced.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Returned by a conditional download if the cached generation is current
+_NOT_MODIFIED = object()
+
+
+def parse_gcs_uri(gs_uri: str) -> Tuple[str, str]:
+    """
+      Splits a gs:// URI into the bucket and the object name.
+
+      Raises:
+          ValueError: If the URI is not a gs:// URI of an object.
+    """
+    if not gs_uri.startswith("gs://"):
+        raise ValueError("Invalid GCS URI format. Must start with 'gs://'")
+    parts = gs_uri[len("gs://"):].split("/", 1)
+    if len(parts) < 2 or not parts[0] or not parts[1]:
+        raise ValueError(
+            "Invalid GCS URI format. Must include bucket and object.")
+    return parts[0], parts[1]
+
+
+@dataclass
+class GcsObject:
+    """Content and metadata of a Cloud Storage object."""
+    bucket: str
+    name: str
+    data: bytes
+    generation: Optional[int] = None
+    etag: Optional[str] = None
+    content_type: Optional[str] = None
+    cached: bool = False
+
+    @property
+    def uri(self) -> str:
+        return f"gs://{self.bucket}/{self.name}"
+
+
+class GcsObjectCache:
+    """
+      Least recently used cache of objects, bounded by their total size.
+
+      Objects larger than `max_bytes` are not cached. A `max_bytes` of 0
+      disables the cache.
+    """
+
+    def __init__(self, max_bytes: int,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._objects: OrderedDict[Tuple[str, str], Tuple[GcsObject, float]] \
+            = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, bucket: str,
+            name: str) -> Tuple[Optional[GcsObject], float]:
+        """Returns the cached object and the age of the entry in seconds."""
+        with self._lock:
+            entry = self._objects.get((bucket, name))
+            if entry is None:
+                self.misses += 1
+                return None, 0.0
+            self._objects.move_to_end((bucket, name))
+            self.hits += 1
+            gcs_object, stored = entry
+            return gcs_object, self._clock() - stored
+
+    def put(self, gcs_object: GcsObject) -> None:
+        """Stores or refreshes an object."""
+        size = len(gcs_object.data)
+        if size > self.max_bytes:
+            return
+        key = (gcs_object.bucket, gcs_object.name)
+        with self._lock:
+            previous = self._objects.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= len(previous[0].data)
+            self._objects[key] = (gcs_object, self._clock())
+            self.size_bytes += size
+            while self.size_bytes > self.max_bytes:
+                _, (evicted, _) = self._objects.popitem(last=False)
+                self.size_bytes -= len(evicted.data)
+
+    def remove(self, bucket: str, name: str) -> None:
+        with self._lock:
+            entry = self._objects.pop((bucket, name), None)
+            if entry is not None:
+                self.size_bytes -= len(entry[0].data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "cached_objects": len(self._objects),
+            "size_bytes": self.size_bytes,
+        }
+
+
+class AsyncGcsObjectLoader:
+    """
+      Downloads Cloud Storage objects on a bounded thread pool.
+
+      The Cloud Storage client only offers blocking calls, so downloads are
+      handed to worker threads and awaited, like the BigQuery jobs of the
+      tools.
+    """
+
+    def __init__(self, client_factory: Callable[[], Any],
+                 cache: GcsObjectCache, revalidate_secs: float,
+                 max_concurrent_downloads: int):
+        self._client_factory = client_factory
+        self.cache = cache
+        self.revalidate_secs = revalidate_secs
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_downloads,
+            thread_name_prefix="gcs-downloads")
+        self.downloads = 0
+        self.not_modified = 0
+
+    async def load(self, gs_uri: str) -> Optional[GcsObject]:
+        """
+          Returns the object of a gs:// URI, from the cache when possible.
+
+          Returns:
+              The object, or None if it doesn't exist.
+
+          Raises:
+              ValueError: If the URI is not a gs:// URI of an object.
+        """
+        bucket, name = parse_gcs_uri(gs_uri)
+        cached, age_secs = self.cache.get(bucket, name)
+        if cached is not None and age_secs < self.revalidate_secs:
+            return replace(cached, cached=True)
+
+        loop = asyncio.get_running_loop()
+        gcs_object = await loop.run_in_executor(
+            self._executor, self._download, bucket, name,
+            cached.generation if cached is not None else None)
+        if gcs_object is None:
+            self.cache.remove(bucket, name)
+            return None
+        if gcs_object is _NOT_MODIFIED:
+            self.cache.put(cached)
+            return replace(cached, cached=True)
+        self.cache.put(gcs_object)
+        return gcs_object
+
+    def _download(self, bucket: str, name: str,
+                  cached_generation: Optional[int]) -> Any:
+        from google.api_core.exceptions import NotFound, NotModified
+
+        blob = self._client_factory().bucket(bucket).blob(name)
+        try:
+            data = blob.download_as_bytes(
+                if_generation_not_match=cached_generation)
+        except NotModified:
+            self.not_modified += 1
+            return _NOT_MODIFIED
+        except NotFound:
+            logger.info("GCS object gs://%s/%s not found", bucket, name)
+            return None
+        self.downloads += 1
+        # The metadata comes with the response headers of the download
+        return GcsObject(bucket=bucket, name=name, data=data,
+                         generation=blob.generation, etag=blob.etag,
+                         content_type=blob.content_type)
+
+    def stats(self) -> dict:
+        return {
+            **self.cache.stats(),
+            "downloads": self.downloads,
+            "not_modified": self.not_modified,
+        }
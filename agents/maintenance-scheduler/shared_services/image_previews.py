@@ -0,0 +1,234 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Resized previews of the bus stop images.
+
+Bus stop images are stored at the resolution of the camera. Showing one in a
+UI or passing it to a model rarely needs more than a preview, which is a
+fraction of the size to store, transfer and, for multimodal models, of the
+number of input tokens.
+
+Previews are encoded as WebP or JPEG and cached by the etag of the source
+image, its size and the format, so a replaced image gets new previews. The
+mime type of the images is detected from their content, as the content type
+of the objects is not reliable.
+"""
+
+import asyncio
+import io
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from shared_services.gcs_objects import AsyncGcsObjectLoader
+
+logger = logging.getLogger(__name__)
+
+WEBP = "webp"
+JPEG = "jpeg"
+PREVIEW_FORMATS = [WEBP, JPEG]
+
+MIME_TYPES = {
+    WEBP: "image/webp",
+    JPEG: "image/jpeg",
+}
+
+UNKNOWN_MIME_TYPE = "application/octet-stream"
+
+
+@dataclass
+class EncodedImage:
+    """Encoded image with its dimensions."""
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    cached: bool = False
+
+
+def describe_image(data: bytes,
+                   default_mime_type: str = UNKNOWN_MIME_TYPE) -> EncodedImage:
+    """Wraps an image, reading its mime type and size from its header."""
+    from PIL import Image, UnidentifiedImageError
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return EncodedImage(
+                data=data,
+                mime_type=Image.MIME.get(image.format, default_mime_type),
+                width=image.width, height=image.height)
+    except (UnidentifiedImageError, OSError):
+        return EncodedImage(data=data, mime_type=default_mime_type, width=0,
+                            height=0)
+
+
+def make_preview(data: bytes, max_size: int, image_format: str,
+                 quality: int) -> EncodedImage:
+    """
+      Downscales an image to fit a `max_size` square and encodes it.
+
+      The orientation of the EXIF metadata is applied, as the metadata is not
+      kept. Images smaller than `max_size` are re-encoded, but not enlarged.
+    """
+    from PIL import Image, ImageOps
+    with Image.open(io.BytesIO(data)) as source:
+        # JPEG images are decoded at the smallest scale which still fits
+        source.draft("RGB", (max_size, max_size))
+        image = ImageOps.exif_transpose(source)
+        image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        keep_alpha = image_format == WEBP and image.mode in ("RGBA", "LA")
+        image = image.convert("RGBA" if keep_alpha else "RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, format=image_format.upper(), quality=quality)
+        return EncodedImage(data=buffer.getvalue(),
+                            mime_type=MIME_TYPES[image_format],
+                            width=image.width, height=image.height)
+
+
+class PreviewCache:
+    """
+      Least recently used cache of previews, bounded by their total size.
+
+      A `max_bytes` of 0 disables the cache.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._previews: OrderedDict[tuple, EncodedImage] = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[EncodedImage]:
+        with self._lock:
+            preview = self._previews.get(key)
+            if preview is None:
+                self.misses += 1
+                return None
+            self._previews.move_to_end(key)
+            self.hits += 1
+            return preview
+
+    def put(self, key: tuple, preview: EncodedImage) -> None:
+        if len(preview.data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._previews.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= len(previous.data)
+            self._previews[key] = preview
+            self.size_bytes += len(preview.data)
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self._previews.popitem(last=False)
+                self.size_bytes -= len(evicted.data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "cached_previews": len(self._previews),
+            "size_bytes": self.size_bytes,
+        }
+
+
+class ImagePreviewService:
+    """
+      Serves Cloud Storage images and their previews.
+
+      Source images are loaded through the shared object loader. Previews
+      are made on a thread pool, as Pillow releases the GIL while decoding,
+      resizing and encoding.
+
+      Args:
+          loader: Loader of the source images
+          cache: Cache of the previews
+          max_size: Default size of the longest side of a preview in pixels
+          image_format: Default format of the previews, "webp" or "jpeg"
+          quality: Encoding quality of the previews, from 1 to 100
+          max_workers: Number of previews made at the same time
+    """
+
+    def __init__(self, loader: AsyncGcsObjectLoader, cache: PreviewCache,
+                 max_size: int, image_format: str, quality: int,
+                 max_workers: int):
+        if image_format not in PREVIEW_FORMATS:
+            raise ValueError(f"Unknown preview format '{image_format}'. "
+                             f"Use one of {PREVIEW_FORMATS}")
+        self.loader = loader
+        self.cache = cache
+        self.max_size = max_size
+        self.image_format = image_format
+        self.quality = quality
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="previews")
+
+    async def original(self, gs_uri: str) -> Optional[EncodedImage]:
+        """
+          The source image with its detected mime type.
+
+          Returns:
+              The image, or None if it doesn't exist.
+        """
+        source = await self.loader.load(gs_uri)
+        if source is None:
+            return None
+        image = describe_image(
+            source.data,
+            default_mime_type=source.content_type or UNKNOWN_MIME_TYPE)
+        image.cached = source.cached
+        return image
+
+    async def preview(self, gs_uri: str, max_size: int = 0,
+                      image_format: str = "") -> Optional[EncodedImage]:
+        """
+          A preview of the image, made once per source version.
+
+          Args:
+              gs_uri: gs:// URI of the source image
+              max_size: Size of the longest side in pixels, 0 for the default
+              image_format: "webp" or "jpeg", empty for the default
+
+          Returns:
+              The preview, or None if the source image doesn't exist.
+        """
+        max_size = max_size or self.max_size
+        image_format = image_format or self.image_format
+        if image_format not in PREVIEW_FORMATS:
+            raise ValueError(f"Unknown preview format '{image_format}'. "
+                             f"Use one of {PREVIEW_FORMATS}")
+        source = await self.loader.load(gs_uri)
+        if source is None:
+            return None
+        key = (source.bucket, source.name,
+               source.etag or source.generation, max_size, image_format)
+        preview = self.cache.get(key)
+        if preview is not None:
+            return replace(preview, cached=True)
+
+        loop = asyncio.get_running_loop()
+        preview = await loop.run_in_executor(
+            self._executor, make_preview, source.data, max_size,
+            image_format, self.quality)
+        logger.debug("Preview of %s: %s bytes instead of %s", gs_uri,
+                     len(preview.data), len(source.data))
+        self.cache.put(key, preview)
+        return preview
+
+    def stats(self) -> dict:
+        return self.cache.stats()
@@ -0,0 +1,75 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measures the construction time of the bus stop incidents.
+
+Run with: pytest tests/benchmarks --run-benchmarks
+"""
+
+import time
+
+import pytest
+
+from maintenance_scheduler.entities.bus_stop import BusStop, \
+    BusStopIncident, USAddress, incidents_from_records
+
+
+def incident_records(number_of_rows):
+    return [{
+        "incident_id": f"incident-{index}",
+        "status": "open",
+        "bus_stop": {
+            "id": f"stop-{index}",
+            "address": {"street": f"{index} Main Street", "city": "New York",
+                        "state": "NY", "zip": "10001"}},
+        "incident_image_url": f"https://storage.mtls.cloud.google.com/"
+                              f"bucket/images/{index}.jpeg",
+        "incident_image_mime_type": "image/jpeg",
+        "description": "The glass panel of the bus shelter is broken."
+    } for index in range(number_of_rows)]
+
+
+def one_model_at_a_time(records):
+    return [
+        BusStopIncident(
+            incident_id=record["incident_id"],
+            status=record["status"],
+            bus_stop=BusStop(
+                id=record["bus_stop"]["id"],
+                address=USAddress(**record["bus_stop"]["address"])),
+            incident_image_url=record["incident_image_url"],
+            incident_image_mime_type=record["incident_image_mime_type"],
+            description=record["description"])
+        for record in records]
+
+
+@pytest.mark.benchmark
+def test_bulk_incident_construction():
+    records = incident_records(100_000)
+
+    results = {}
+    for name, build in [
+        ("per model", one_model_at_a_time),
+        ("type adapter", incidents_from_records),
+    ]:
+        start = time.perf_counter()
+        incidents = build(records)
+        results[name] = time.perf_counter() - start
+        assert incidents[-1] == one_model_at_a_time(records[-1:])[0]
+
+    print(f"\n{len(records):,} incidents:")
+    for name, secs in results.items():
+        print(f"  {name:>12}: {secs * 1000:8.1f}ms "
+              f"({secs / results['per model']:6.1%})")
+    assert results["type adapter"] < results["per model"]
@@ -0,0 +1,248 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Latency, memory and response size of the tools at fleet scale.
+
+The tools run against synthetic fleets in the local DuckDB stand-in of the
+BigQuery dataset. Results are compared with the baselines in
+baselines/fleet.json and a regression fails the benchmark.
+
+Run with: pytest tests/benchmarks --run-benchmarks
+Update the baselines with: pytest tests/benchmarks --run-benchmarks \
+    --update-baselines -k fleet
+"""
+
+import json
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from google.adk.models import LlmRequest
+from google.genai import types
+from pydantic_core import to_json
+
+pytest.importorskip("duckdb")
+pytest.importorskip("sqlglot")
+
+from maintenance_scheduler.config import ModelRateLimit
+from maintenance_scheduler.shared_libraries import callbacks
+from maintenance_scheduler.shared_libraries.async_bigquery import \
+    AsyncBigQueryClient
+from maintenance_scheduler.shared_libraries.forecast_cache import \
+    ForecastCache
+from maintenance_scheduler.shared_libraries.incident_cache import \
+    IncidentCache
+from maintenance_scheduler.shared_libraries.local_bigquery import \
+    LocalBigQueryClient, load_synthetic_dataset
+from maintenance_scheduler.shared_libraries.rate_limiter import \
+    RateLimiterRegistry, SessionRateLimiter
+from maintenance_scheduler.shared_libraries.scheduling_queue import \
+    SchedulingQueue
+from maintenance_scheduler.tools import tools
+
+BASELINES_PATH = Path(__file__).parent / "baselines" / "fleet.json"
+
+FLEET_SIZES = [10, 1_000, 10_000, 100_000]
+RIDERSHIP_DAYS = 7
+REPEAT = 3
+
+# Latency depends on the machine, sizes are deterministic
+LATENCY_TOLERANCE = 2.0
+LATENCY_SLACK_MS = 25
+MEMORY_TOLERANCE = 1.25
+MEMORY_SLACK_BYTES = 256 * 1024
+RESPONSE_TOLERANCE = 1.05
+
+MAINTENANCE_START = "April 2, 2025, at 3:00 PM EST"
+
+
+def maintenance_schedule(bus_stop_id):
+    return {"bus_stop_id": bus_stop_id,
+            "maintenance_start": MAINTENANCE_START,
+            "reason": "Broken glass",
+            "notification_subject": f"Maintenance of {bus_stop_id}",
+            "notification_content": "The glass panel needs to be replaced."}
+
+
+@pytest.fixture(scope="module", params=FLEET_SIZES, ids=lambda size: f"{size}")
+def fleet(request, tmp_path_factory):
+    number_of_bus_stops = request.param
+    client = LocalBigQueryClient(database=str(
+        tmp_path_factory.mktemp("fleet") / f"{number_of_bus_stops}.duckdb"))
+    start = time.perf_counter()
+    bus_stop_ids = load_synthetic_dataset(
+        client, number_of_bus_stops=number_of_bus_stops,
+        number_of_incidents=max(5, number_of_bus_stops // 10),
+        end=datetime.now(tz=timezone.utc), days=RIDERSHIP_DAYS, seed=1)
+    print(f"\nloaded a fleet of {number_of_bus_stops:,} bus stops in "
+          f"{time.perf_counter() - start:.1f}s")
+    return SimpleNamespace(client=client, bus_stop_ids=bus_stop_ids)
+
+
+@pytest.fixture
+def fleet_tools(fleet, monkeypatch):
+    """Routes the tools to the fleet without caches."""
+    monkeypatch.setattr(tools.config, "mock_tools", False)
+    monkeypatch.setattr(tools.config, "bigquery_backend", "duckdb")
+    monkeypatch.setattr(tools.config, "forecast_backend", "bigquery")
+    monkeypatch.setattr(tools.config, "local_forecast_fallback", False)
+    monkeypatch.setattr(tools, "async_bigquery_client", AsyncBigQueryClient(
+        lambda: fleet.client, max_concurrent_jobs=8))
+    monkeypatch.setattr(tools, "incident_cache", IncidentCache(ttl_secs=0))
+    monkeypatch.setattr(tools, "forecast_cache",
+                        ForecastCache(bucket_minutes=0))
+    monkeypatch.setattr(tools.config, "schedule_write_behind", False)
+    monkeypatch.setattr(tools, "scheduling_queue", SchedulingQueue(
+        tools._write_maintenance_schedules, max_batch_size=100,
+        max_delay_secs=60))
+    monkeypatch.setattr(callbacks, "rate_limiters", RateLimiterRegistry(
+        limits={}, default_limit=ModelRateLimit(requests_per_minute=0)))
+    monkeypatch.setattr(callbacks, "session_rate_limiter", SessionRateLimiter(
+        requests_per_minute=0, state_key="rate_limit_session_requests"))
+    return fleet
+
+
+def benchmark_calls(fleet):
+    """The measured calls by name, each returns the response to size."""
+    incident_bus_stop_ids = fleet.bus_stop_ids[:5]
+
+    async def get_unresolved_incidents():
+        return await tools.get_unresolved_incidents()
+
+    async def get_unresolved_incidents_by_zip():
+        return await tools.get_unresolved_incidents(zip_code="10001")
+
+    async def get_expected_number_of_passengers():
+        return await tools.get_expected_number_of_passengers(
+            fleet.bus_stop_ids[:10])
+
+    async def schedule_maintenance():
+        return await tools.schedule_maintenance(
+            **maintenance_schedule(incident_bus_stop_ids[0]))
+
+    async def schedule_maintenance_batch():
+        return await tools.schedule_maintenance_batch(
+            [maintenance_schedule(bus_stop_id)
+             for bus_stop_id in incident_bus_stop_ids])
+
+    async def rate_limit_callback():
+        incidents = await tools.get_unresolved_incidents()
+        callback_context = SimpleNamespace(state={})
+        await callbacks.rate_limit_callback(callback_context, LlmRequest(
+            model="gemini-2.5-flash",
+            contents=[types.Content(role="user", parts=[
+                types.Part(text=to_json(incidents).decode())])]))
+        return callback_context.state
+
+    async def flush_scheduling_queue():
+        tools.config.schedule_write_behind = True
+        try:
+            tool_context = SimpleNamespace(invocation_id="benchmark")
+            for bus_stop_id in incident_bus_stop_ids:
+                await tools.schedule_maintenance(
+                    **maintenance_schedule(bus_stop_id),
+                    tool_context=tool_context)
+            callback_context = SimpleNamespace(invocation_id="benchmark",
+                                               state={})
+            await callbacks.flush_scheduling_queue(callback_context)
+        finally:
+            tools.config.schedule_write_behind = False
+        return callback_context.state
+
+    return {call.__name__: call for call in [
+        get_unresolved_incidents, get_unresolved_incidents_by_zip,
+        get_expected_number_of_passengers, schedule_maintenance,
+        schedule_maintenance_batch, rate_limit_callback,
+        flush_scheduling_queue]}
+
+
+async def measure(call) -> dict:
+    latencies = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = await call()
+        latencies.append(time.perf_counter() - start)
+    assert not isinstance(result, dict) or result.get("status") != "error"
+
+    # Python allocations of all threads, native DuckDB memory is not included
+    tracemalloc.start()
+    try:
+        await call()
+        _, peak_memory_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "latency_ms": round(statistics.median(latencies) * 1000, 1),
+        "peak_memory_bytes": peak_memory_bytes,
+        "response_bytes": len(to_json(result)),
+    }
+
+
+def regressions(result: dict, baseline: dict) -> list[str]:
+    limits = {
+        "latency_ms": baseline["latency_ms"] * LATENCY_TOLERANCE
+                      + LATENCY_SLACK_MS,
+        "peak_memory_bytes": baseline["peak_memory_bytes"] * MEMORY_TOLERANCE
+                             + MEMORY_SLACK_BYTES,
+        "response_bytes": baseline["response_bytes"] * RESPONSE_TOLERANCE,
+    }
+    return [f"{metric}: {result[metric]:,} > {limit:,.0f} "
+            f"(baseline {baseline[metric]:,})"
+            for metric, limit in limits.items() if result[metric] > limit]
+
+
+def load_baselines() -> dict:
+    if not BASELINES_PATH.exists():
+        return {}
+    with open(BASELINES_PATH, "r", encoding="utf-8") as baselines_file:
+        return json.load(baselines_file)
+
+
+def store_baselines(baselines: dict) -> None:
+    with open(BASELINES_PATH, "w", encoding="utf-8") as baselines_file:
+        json.dump(baselines, baselines_file, indent=2, sort_keys=True)
+        baselines_file.write("\n")
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_fleet_benchmark(fleet_tools, request):
+    fleet_size = str(len(fleet_tools.bus_stop_ids))
+    results = {name: await measure(call)
+               for name, call in benchmark_calls(fleet_tools).items()}
+
+    print(f"\n{int(fleet_size):,} bus stops:")
+    for name, result in results.items():
+        print(f"  {name:>34}: {result['latency_ms']:9.1f}ms "
+              f"{result['peak_memory_bytes']:>12,} peak bytes "
+              f"{result['response_bytes']:>10,} response bytes")
+
+    baselines = load_baselines()
+    if request.config.getoption("--update-baselines"):
+        baselines[fleet_size] = results
+        store_baselines(baselines)
+        return
+
+    assert fleet_size in baselines, \
+        "No baseline, run with --update-baselines to create it"
+    failures = [f"{name} {failure}"
+                for name, result in results.items()
+                if name in baselines[fleet_size]
+                for failure in regressions(result,
+                                           baselines[fleet_size][name])]
+    assert not failures, "Regressions:\n" + "\n".join(failures)
@@ -0,0 +1,75 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measures the size and build time of the forecast payload formats.
+
+Run with: pytest tests/benchmarks --run-benchmarks
+"""
+
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from maintenance_scheduler.shared_libraries import forecast_payload
+from maintenance_scheduler.shared_libraries.ridership_forecaster import \
+    SeasonalRidershipForecaster
+from maintenance_scheduler.shared_libraries.synthetic_ridership import \
+    generate_ridership_history
+
+time_zone = ZoneInfo("America/New_York")
+
+
+def build_payload(forecasts, payload_format, start, end):
+    if payload_format == forecast_payload.ROWS:
+        return {bus_stop_id: forecast_payload.rows_payload(
+            points, start, end, time_zone)
+            for bus_stop_id, points in forecasts.items()}
+    return {bus_stop_id: forecast_payload.columnar_payload(
+        points, start, end, time_zone,
+        run_length_encoding=payload_format == forecast_payload.COLUMNAR_RLE)
+        for bus_stop_id, points in forecasts.items()}
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("number_of_bus_stops", [50, 1_000])
+def test_forecast_payload_size_and_build_time(number_of_bus_stops):
+    now = datetime.now(tz=timezone.utc)
+    end = now + timedelta(days=3)
+    forecaster = SeasonalRidershipForecaster(time_zone=time_zone)
+    event_ts, num_riders = generate_ridership_history(
+        number_of_bus_stops, end=now, days=28, seed=1)
+    forecasts = forecaster.forecast(
+        [f"stop-{index}" for index in range(number_of_bus_stops)],
+        forecaster.fit_series(event_ts, num_riders),
+        now, 3 * 24 * 4).to_points()
+
+    results = {}
+    for payload_format in forecast_payload.PAYLOAD_FORMATS:
+        start = time.perf_counter()
+        payload = build_payload(forecasts, payload_format, now, end)
+        build_secs = time.perf_counter() - start
+        results[payload_format] = (len(json.dumps(payload)), build_secs)
+
+    rows_size, rows_secs = results[forecast_payload.ROWS]
+    print(f"\n{number_of_bus_stops} bus stops:")
+    for payload_format, (size, build_secs) in results.items():
+        print(f"  {payload_format:>12}: {size:>10,} bytes "
+              f"({size / rows_size:6.1%}), build {build_secs * 1000:8.1f}ms "
+              f"({build_secs / rows_secs:6.1%})")
+    assert results[forecast_payload.COLUMNAR][0] < rows_size / 3
+    assert results[forecast_payload.COLUMNAR_RLE][0] \
+           < results[forecast_payload.COLUMNAR][0]
@@ -0,0 +1,79 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares the vectorized forecaster with the per-slot Python loop.
+
+Run with: pytest tests/benchmarks --run-benchmarks
+"""
+
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from maintenance_scheduler.shared_libraries.ridership_forecaster import \
+    SeasonalRidershipForecaster
+from maintenance_scheduler.shared_libraries.synthetic_ridership import \
+    generate_ridership_history
+
+time_zone = ZoneInfo("America/New_York")
+
+HISTORY_DAYS = 7
+HORIZON = 3 * 24 * 4
+
+
+def per_slot_loop_forecast(bus_stop_ids):
+    """The mock forecast previously produced by the tool."""
+    all_bus_stop_forecasts = {}
+    for bus_stop_id in bus_stop_ids:
+        forecast = []
+        base_number_of_passengers = random.randint(5, 20)
+        for next_increment in range(10, 3 * 24 * 60, 15):
+            forecast.append({'time': (
+                datetime.now(tz=time_zone) + timedelta(
+                    minutes=next_increment)
+            ).isoformat(), 'number_of_passengers': (
+                base_number_of_passengers + random.randint(3, 10))})
+        all_bus_stop_forecasts[bus_stop_id] = forecast
+    return all_bus_stop_forecasts
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("number_of_bus_stops", [10, 1_000, 50_000])
+def test_vectorized_forecast_vs_per_slot_loop(number_of_bus_stops):
+    bus_stop_ids = [f"stop-{index}" for index in range(number_of_bus_stops)]
+    now = datetime.now(tz=timezone.utc)
+    event_ts, num_riders = generate_ridership_history(
+        number_of_bus_stops, end=now, days=HISTORY_DAYS, seed=1)
+    forecaster = SeasonalRidershipForecaster(step_minutes=15,
+                                             time_zone=time_zone)
+
+    start = time.perf_counter()
+    profiles = forecaster.fit_series(event_ts, num_riders)
+    forecast = forecaster.forecast(bus_stop_ids, profiles, now, HORIZON)
+    vectorized_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    per_slot_loop_forecast(bus_stop_ids)
+    loop_secs = time.perf_counter() - start
+
+    print(f"\n{number_of_bus_stops} bus stops, {HISTORY_DAYS} days of history:"
+          f" vectorized fit and forecast {vectorized_secs:.3f}s,"
+          f" per-slot loop {loop_secs:.3f}s,"
+          f" speedup {loop_secs / vectorized_secs:.1f}x")
+    assert forecast.values.shape == (number_of_bus_stops, HORIZON)
+    if number_of_bus_stops >= 1_000:
+        assert vectorized_secs < loop_secs
@@ -0,0 +1,109 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measures the latency of loading bus stop images from Cloud Storage.
+
+The images are served by a local fake of the Cloud Storage API with a fixed
+latency per request. Sessions repeatedly ask for the images of a few bus
+stops, as users looking at the same incidents do.
+
+Run with: pytest tests/benchmarks --run-benchmarks
+"""
+
+import asyncio
+import os
+import statistics
+import time
+
+import pytest
+
+from shared_services.gcs_objects import \
+    AsyncGcsObjectLoader, GcsObjectCache
+from tests.fake_gcs_server import FakeGcsServer
+
+LATENCY_SECS = 0.02
+IMAGE_SIZE = 2 * 1024 * 1024
+NUMBER_OF_IMAGES = 5
+NUMBER_OF_LOOKUPS = 50
+
+
+def exists_and_download(client, gs_uri):
+    """The previous loading: an existence check followed by a download."""
+    bucket, name = gs_uri[len("gs://"):].split("/", 1)
+    blob = client.bucket(bucket).blob(name)
+    if not blob.exists():
+        return None
+    return blob.download_as_bytes()
+
+
+@pytest.fixture(scope="module")
+def gcs_server():
+    server = FakeGcsServer(latency_secs=LATENCY_SECS).start()
+    for index in range(NUMBER_OF_IMAGES):
+        server.put("bucket", f"images/stop-{index}.jpeg",
+                   os.urandom(IMAGE_SIZE))
+    yield server
+    server.stop()
+
+
+def uris():
+    return [f"gs://bucket/images/stop-{index % NUMBER_OF_IMAGES}.jpeg"
+            for index in range(NUMBER_OF_LOOKUPS)]
+
+
+async def measure(load):
+    latencies = []
+    for gs_uri in uris():
+        start = time.perf_counter()
+        image = await load(gs_uri)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert image is not None
+    return latencies
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_image_loading_latency(gcs_server):
+    client = gcs_server.client()
+
+    def loader(max_bytes, revalidate_secs):
+        return AsyncGcsObjectLoader(
+            lambda: client, cache=GcsObjectCache(max_bytes=max_bytes),
+            revalidate_secs=revalidate_secs, max_concurrent_downloads=4)
+
+    async def previous(gs_uri):
+        return await asyncio.to_thread(exists_and_download, client, gs_uri)
+
+    results = {
+        "exists + download": await measure(previous),
+        "single download": await measure(
+            loader(max_bytes=0, revalidate_secs=0).load),
+        "cached, revalidated": await measure(
+            loader(max_bytes=64 * 1024 * 1024, revalidate_secs=0).load),
+        "cached": await measure(
+            loader(max_bytes=64 * 1024 * 1024, revalidate_secs=300).load),
+    }
+
+    print(f"\n{NUMBER_OF_LOOKUPS} lookups of {NUMBER_OF_IMAGES} images of "
+          f"{IMAGE_SIZE // 1024} KB, {LATENCY_SECS * 1000:.0f}ms per request:")
+    for name, latencies in results.items():
+        print(f"  {name:>20}: median {statistics.median(latencies):7.2f}ms, "
+              f"max {max(latencies):7.2f}ms, "
+              f"total {sum(latencies):8.1f}ms")
+    previous_total = sum(results["exists + download"])
+    # One request instead of two
+    assert sum(results["single download"]) < previous_total * 0.75
+    # Unchanged images are not transferred again
+    assert sum(results["cached, revalidated"]) < previous_total * 0.6
+    assert statistics.median(results["cached"]) < LATENCY_SECS * 1000 / 10
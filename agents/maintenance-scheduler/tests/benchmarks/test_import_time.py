@@ -0,0 +1,74 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cold import budget of the agent, which bounds Agent Engine cold starts.
+
+Run with: pytest tests/benchmarks --run-benchmarks
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+IMPORT_BUDGET_SECS = 4.0
+
+IMPORT_SCRIPT = """
+import json
+import time
+
+start = time.perf_counter()
+import maintenance_scheduler.agent
+elapsed = time.perf_counter() - start
+
+from maintenance_scheduler.config import get_config
+from maintenance_scheduler.shared_libraries import clients
+from maintenance_scheduler.tools import email_content_generator
+
+print(json.dumps({
+    "import_secs": elapsed,
+    "config_loads": get_config.cache_info().misses,
+    "api_clients": clients.get_client_registry.cache_info().currsize,
+    "genai_clients":
+        email_content_generator.get_genai_client.cache_info().currsize,
+}))
+"""
+
+
+def import_agent() -> dict:
+    """Imports the agent in a new interpreter without credentials."""
+    env = {name: value for name, value in os.environ.items()
+           if name != "GOOGLE_APPLICATION_CREDENTIALS"}
+    env.setdefault("GOOGLE_CLOUD_PROJECT", "test-project")
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT], env=env, check=True,
+        capture_output=True, text=True,
+        cwd=os.path.join(os.path.dirname(__file__), "..", ".."))
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.benchmark
+def test_cold_import_budget():
+    runs = [import_agent() for _ in range(3)]
+    import_secs = min(run["import_secs"] for run in runs)
+    print(f"\ncold import of maintenance_scheduler.agent: "
+          f"{import_secs:.2f}s (budget {IMPORT_BUDGET_SECS}s)")
+
+    assert import_secs < IMPORT_BUDGET_SECS
+    for run in runs:
+        assert run["config_loads"] == 1
+        assert run["api_clients"] == 0
+        assert run["genai_clients"] == 0
@@ -0,0 +1,131 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local stand-in for the Cloud Storage JSON API used by the tests."""
+
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import storage
+
+
+class FakeGcsServer:
+    """
+      Serves object downloads and metadata with a fixed per-request latency.
+
+      Supports the `ifGenerationNotMatch` condition of downloads, which
+      returns 304 Not Modified for the current generation.
+    """
+
+    def __init__(self, latency_secs: float = 0.0):
+        self.latency_secs = latency_secs
+        self.objects: dict[tuple[str, str], tuple[bytes, str, int]] = {}
+        self.requests: list[str] = []
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0),
+                                           self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        daemon=True)
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    @property
+    def downloads(self) -> list[str]:
+        """Download requests, leaving out the metadata requests."""
+        return [path for path in self.requests
+                if path.startswith("/download/")]
+
+    def start(self) -> "FakeGcsServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def put(self, bucket: str, name: str, data: bytes,
+            content_type: str = "image/jpeg") -> None:
+        with self._lock:
+            generation = self.objects.get((bucket, name),
+                                          (b"", "", 0))[2] + 1
+            self.objects[(bucket, name)] = (data, content_type, generation)
+
+    def client(self) -> storage.Client:
+        return storage.Client(project="test-project",
+                              credentials=AnonymousCredentials(),
+                              client_options={"api_endpoint": self.endpoint})
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                with server._lock:
+                    server.requests.append(url.path)
+                time.sleep(server.latency_secs)
+                download = url.path.startswith("/download/")
+                path = url.path.removeprefix("/download")
+                if not path.startswith("/storage/v1/b/") or "/o/" not in path:
+                    self._send(404, b"")
+                    return
+                bucket, name = path[len("/storage/v1/b/"):].split("/o/", 1)
+                with server._lock:
+                    entry = server.objects.get((bucket, unquote(name)))
+                if entry is None:
+                    self._send(404, json.dumps({"error": {
+                        "code": 404, "message": "No such object"}}).encode(),
+                               "application/json")
+                    return
+                data, content_type, generation = entry
+                headers = {"ETag": hashlib.md5(data).hexdigest(),
+                           "X-Goog-Generation": str(generation)}
+                if not download:
+                    self._send(200, json.dumps({
+                        "bucket": bucket, "name": unquote(name),
+                        "generation": str(generation),
+                        "size": str(len(data)),
+                        "contentType": content_type,
+                    }).encode(), "application/json", headers)
+                    return
+                query = parse_qs(url.query)
+                if query.get("ifGenerationNotMatch") == [str(generation)]:
+                    self._send(304, b"", headers=headers)
+                    return
+                self._send(200, data, content_type, headers)
+
+            def _send(self, status, body, content_type=None, headers=None):
+                self.send_response(status)
+                if content_type:
+                    self.send_header("Content-Type", content_type)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with server._lock:
+                    server.bytes_sent += len(body)
+
+        return Handler
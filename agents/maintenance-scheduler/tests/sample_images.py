@@ -0,0 +1,41 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Generated images standing in for the bus stop photos in the tests."""
+
+import io
+
+from PIL import Image
+
+
+def encoded_image(width: int, height: int, image_format: str = "JPEG",
+                  mode: str = "RGB", orientation: int = 0) -> bytes:
+    """
+      Encodes a gradient image, so it doesn't compress to nothing.
+
+      An `orientation` other than 0 is stored in the EXIF metadata.
+    """
+    image = Image.linear_gradient("L").resize((width, height)).convert(mode)
+    buffer = io.BytesIO()
+    if orientation:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        image.save(buffer, format=image_format, exif=exif)
+    else:
+        image.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def jpeg_image(width: int, height: int) -> bytes:
+    return encoded_image(width, height)
@@ -0,0 +1,150 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pyarrow
+import pytest
+
+from maintenance_scheduler.shared_libraries.async_bigquery import \
+    AsyncBigQueryClient
+from maintenance_scheduler.shared_libraries.forecast_cache import \
+    ForecastCache
+from maintenance_scheduler.shared_libraries.incident_cache import \
+    IncidentCache
+from maintenance_scheduler.shared_libraries.query_cost import QueryCostGuard
+from maintenance_scheduler.tools import tools
+
+
+class FakeRowIterator:
+    """Local stand-in for the RowIterator returned by query_and_wait."""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.bqstorage_clients = []
+        self.job_id = "job-1"
+        self.query_id = None
+        self.total_bytes_processed = 1024
+        self.slot_millis = 20
+        self.total_rows = len(self.rows)
+        self.num_dml_affected_rows = None
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def to_arrow(self, bqstorage_client=None):
+        self.bqstorage_clients.append(bqstorage_client)
+        return pyarrow.Table.from_pylist([vars(row) for row in self.rows])
+
+
+class FakeBigQueryClient:
+    """
+      Local stand-in for bigquery.Client with a fixed per-query latency.
+
+      `rows` is either a list of rows returned by every query or a function
+      which receives the query and its parameters and returns the rows.
+      `dry_run_bytes` is the estimate of dry runs, or a function of the query
+      and its parameters.
+    """
+
+    def __init__(self, rows=None, latency_secs=0.0, dry_run_bytes=0):
+        self.rows = rows or []
+        self.latency_secs = latency_secs
+        self.dry_run_bytes = dry_run_bytes
+        self.queries = []
+        self.query_parameters = []
+        self.dry_runs = []
+
+    def query_and_wait(self, query, job_config=None, project=None):
+        parameters = _parameters(job_config)
+        self.queries.append(query)
+        self.query_parameters.append(parameters)
+        time.sleep(self.latency_secs)
+        rows = self.rows(query, parameters) if callable(self.rows) \
+            else self.rows
+        return FakeRowIterator(rows)
+
+    def query(self, query, job_config=None, project=None):
+        assert job_config.dry_run, "Only dry runs are supported"
+        parameters = _parameters(job_config)
+        self.dry_runs.append(parameters)
+        total_bytes_processed = self.dry_run_bytes(query, parameters) \
+            if callable(self.dry_run_bytes) else self.dry_run_bytes
+        return SimpleNamespace(total_bytes_processed=total_bytes_processed)
+
+
+def _parameters(job_config):
+    return {
+        parameter.name: getattr(parameter, "values", None) or getattr(
+            parameter, "value", None)
+        for parameter in getattr(job_config, "query_parameters", [])}
+
+
+def incident_row(bus_stop_id):
+    return SimpleNamespace(
+        incident_id=f"incident-{bus_stop_id}",
+        bus_stop_id=bus_stop_id,
+        status="OPEN",
+        source_image_uri=f"gs://bucket/images/{bus_stop_id}.jpeg",
+        source_image_mime_type="image/jpeg",
+        description="Broken glass",
+        address={"street": "123 Main", "city": "New York", "state": "NY",
+                 "zip": "10001"})
+
+
+def forecast_rows(query, parameters):
+    """Flat forecast of 10 riders every 15 minutes for the requested stops."""
+    start = datetime.now(tz=timezone.utc)
+    return [
+        SimpleNamespace(
+            bus_stop_id=bus_stop_id,
+            forecast_timestamp=start + timedelta(minutes=15 * (step + 1)),
+            expected_number_of_passengers=10)
+        for bus_stop_id in parameters["bus_stop_ids"]
+        for step in range(3 * 24 * 4)]
+
+
+@pytest.fixture
+def fake_bigquery(monkeypatch):
+    """Routes the tools' BigQuery calls to a FakeBigQueryClient."""
+
+    def install(rows=None, latency_secs=0.0, max_concurrent_jobs=8,
+                incident_cache_ttl_secs=0, forecast_cache_bucket_minutes=0,
+                dry_run_bytes=0, query_max_bytes_processed=None):
+        client = FakeBigQueryClient(rows=rows, latency_secs=latency_secs,
+                                    dry_run_bytes=dry_run_bytes)
+        monkeypatch.setattr(tools.config, "mock_tools", False)
+        monkeypatch.setattr(tools, "get_bigquery_read_client", lambda: None)
+        monkeypatch.setattr(
+            tools, "async_bigquery_client",
+            AsyncBigQueryClient(lambda: client,
+                                max_concurrent_jobs=max_concurrent_jobs))
+        monkeypatch.setattr(
+            tools, "incident_cache",
+            IncidentCache(ttl_secs=incident_cache_ttl_secs))
+        monkeypatch.setattr(
+            tools, "forecast_cache",
+            ForecastCache(bucket_minutes=forecast_cache_bucket_minutes))
+        # Queries are only dry-run when a byte budget is given
+        monkeypatch.setattr(tools.config, "query_cost_estimates",
+                            query_max_bytes_processed is not None)
+        monkeypatch.setattr(
+            tools, "query_cost_guard",
+            QueryCostGuard(max_bytes_processed=query_max_bytes_processed or 0,
+                           max_entries=256))
+        return client
+
+    return install
@@ -0,0 +1,101 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from maintenance_explorer.tools.answer_cache import AnswerCache, \
+    normalize_question, table_versions
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_questions_are_normalized():
+    assert normalize_question("  How many open incidents\nper City? ") == \
+        normalize_question("how many open incidents per city")
+
+
+def test_table_versions_are_the_modification_times():
+    modified = {
+        "project.dataset.report_watermark": datetime.datetime(2025, 1, 1),
+        "project.dataset.incidents": datetime.datetime(2025, 1, 2),
+    }
+    client = SimpleNamespace(
+        get_table=lambda table: SimpleNamespace(modified=modified[table]))
+
+    assert table_versions(client, "project.dataset") == (
+        datetime.datetime(2025, 1, 1), datetime.datetime(2025, 1, 2))
+
+
+@pytest.mark.asyncio
+async def test_answers_are_invalidated_by_the_data_version():
+    version = [1]
+    cache = AnswerCache(lambda: version[0], max_entries=4,
+                        version_check_secs=0)
+    key = cache.key("answer", "agent", "Open incidents?")
+    cache.put(key, await cache.data_version(), {"answer": "3"})
+
+    assert cache.get(key, await cache.data_version()) == {"answer": "3"}
+    version[0] = 2
+    assert cache.get(key, await cache.data_version()) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_version_checks_are_shared_within_the_check_interval():
+    checks = []
+    clock = FakeClock()
+    cache = AnswerCache(lambda: checks.append(1) or len(checks),
+                        max_entries=4, version_check_secs=5, clock=clock)
+
+    assert [await cache.data_version() for _ in range(3)] == [1, 1, 1]
+    clock.now = 6
+    assert await cache.data_version() == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_version_check_bypasses_the_cache():
+    def fail():
+        raise ConnectionError("BigQuery is unavailable")
+
+    cache = AnswerCache(fail, max_entries=4)
+    key = cache.key("answer", "agent", "Open incidents?")
+    version = await cache.data_version()
+    cache.put(key, version, {"answer": "3"})
+
+    assert version is None
+    assert cache.get(key, version) is None
+    assert cache.stats()["cached_answers"] == 0
+
+
+def test_cached_answers_are_copies_and_bounded():
+    cache = AnswerCache(lambda: 1, max_entries=2)
+    answer = {"rows": [1]}
+    for question in ["a", "b", "c"]:
+        cache.put(cache.key("answer", "agent", question), 1, answer)
+    answer["rows"].append(2)
+
+    assert cache.get(cache.key("answer", "agent", "a"), 1) is None
+    cached = cache.get(cache.key("answer", "agent", "c"), 1)
+    assert cached == {"rows": [1]}
+    cached["rows"].append(3)
+    assert cache.get(cache.key("answer", "agent", "c"), 1) == {"rows": [1]}
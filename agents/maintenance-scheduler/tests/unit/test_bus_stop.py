@@ -0,0 +1,59 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from pydantic import ValidationError
+
+from maintenance_scheduler.entities.bus_stop import BusStop, \
+    BusStopIncident, USAddress, incidents_from_records
+from maintenance_scheduler.tools import tools
+from maintenance_scheduler.tools.tools import get_unresolved_incidents
+
+
+def test_incidents_from_records():
+    record = {
+        "incident_id": "incident-1",
+        "status": "open",
+        "bus_stop": {"id": "stop-1",
+                     "address": {"street": "123 Main", "city": "New York",
+                                 "state": "NY", "zip": "10001"}},
+        "incident_image_url": "https://bucket/image.jpeg",
+        "incident_image_mime_type": "image/jpeg",
+        "description": "Broken glass"}
+
+    assert incidents_from_records(iter([record])) == [BusStopIncident(
+        incident_id="incident-1",
+        status="open",
+        bus_stop=BusStop(id="stop-1", address=USAddress(
+            street="123 Main", city="New York", state="NY", zip="10001")),
+        incident_image_url="https://bucket/image.jpeg",
+        incident_image_mime_type="image/jpeg",
+        description="Broken glass")]
+
+    del record["description"]
+    with pytest.raises(ValidationError):
+        incidents_from_records([record])
+
+
+@pytest.mark.asyncio
+async def test_mock_incidents_are_valid(monkeypatch):
+    monkeypatch.setattr(tools.config, "mock_tools", True)
+
+    result = await get_unresolved_incidents()
+
+    assert result["status"] == "success"
+    assert [incident.bus_stop.id for incident in
+            result["bus_stop_incidents"]] == ["stop-1", "stop-2"]
+    assert all(incident.incident_image_url.startswith("https://")
+               for incident in result["bus_stop_incidents"])
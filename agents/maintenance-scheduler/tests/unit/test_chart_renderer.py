@@ -0,0 +1,89 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import signal
+import struct
+
+import pytest
+
+from maintenance_explorer.tools.chart_renderer import ChartRenderer, \
+    PNG, PNG_PREVIEW, SVG, spec_key
+
+VEGA_CONFIG = {
+    "mark": "bar",
+    "encoding": {"x": {"field": "city", "type": "nominal"},
+                 "y": {"field": "incidents", "type": "quantitative"}},
+    "data": {"values": [{"city": "New York", "incidents": 3},
+                        {"city": "Boston", "incidents": 1}]},
+}
+
+
+def png_size(data):
+    """Width and height from the IHDR chunk of a PNG."""
+    assert data.startswith(b"\x89PNG")
+    return struct.unpack(">II", data[16:24])
+
+
+@pytest.fixture
+def renderer():
+    renderer = ChartRenderer(max_workers=1, max_entries=8)
+    yield renderer
+    renderer.shutdown()
+
+
+def test_spec_key_ignores_key_order():
+    reordered = {key: VEGA_CONFIG[key] for key in reversed(VEGA_CONFIG)}
+
+    assert spec_key(reordered) == spec_key(VEGA_CONFIG)
+    assert spec_key({**VEGA_CONFIG, "mark": "line"}) != spec_key(VEGA_CONFIG)
+
+
+@pytest.mark.asyncio
+async def test_charts_are_rendered_once_per_spec(renderer):
+    chart = await renderer.render(VEGA_CONFIG, PNG)
+    reordered = await renderer.render(
+        {key: VEGA_CONFIG[key] for key in reversed(VEGA_CONFIG)}, PNG)
+
+    assert chart.mime_type == "image/png"
+    assert not chart.cached
+    assert reordered.cached
+    assert reordered.data == chart.data
+    assert renderer.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_preview_and_svg_formats(renderer):
+    chart = await renderer.render(VEGA_CONFIG, PNG)
+    preview = await renderer.render(VEGA_CONFIG, PNG_PREVIEW)
+    svg = await renderer.render(VEGA_CONFIG, SVG)
+
+    width, height = png_size(chart.data)
+    assert png_size(preview.data) == (width // 2, height // 2)
+    assert svg.mime_type == "image/svg+xml"
+    assert svg.data.startswith(b"<svg")
+
+
+@pytest.mark.asyncio
+async def test_dead_worker_is_replaced(renderer):
+    await renderer.render(VEGA_CONFIG, PNG)
+    broken = renderer._executor
+    for process in list(broken._processes.values()):
+        os.kill(process.pid, signal.SIGKILL)
+        process.join()
+
+    chart = await renderer.render({**VEGA_CONFIG, "mark": "line"}, PNG)
+
+    assert not chart.cached
+    assert renderer._executor is not broken
@@ -0,0 +1,61 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import google.auth
+import pytest
+from google.auth.credentials import AnonymousCredentials
+
+from shared_services.clients import ClientRegistry
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(google.auth, "default",
+                        lambda *args, **kwargs: (AnonymousCredentials(), None))
+    return ClientRegistry(max_pool_connections=4)
+
+
+def test_clients_are_reused(registry):
+    bigquery_client = registry.bigquery(project="test-project")
+
+    assert registry.bigquery(project="test-project") is bigquery_client
+    assert registry.bigquery(project="other-project") is not bigquery_client
+    assert registry.storage(project="test-project") is not bigquery_client
+    assert registry.stats()["bigquery/test-project"]["handouts"] == 2
+
+
+def test_http_clients_use_tuned_pool(registry):
+    bigquery_client = registry.bigquery(project="test-project")
+
+    adapter = bigquery_client._http.get_adapter("https://")
+    assert adapter._pool_maxsize == 4
+    assert registry.stats()["bigquery/test-project"]["pools"] == {}
+
+
+def test_grpc_client_is_created_once(registry):
+    client = registry.data_chat()
+
+    assert registry.data_chat() is client
+    assert registry.stats() == {"data_chat": {"handouts": 2}}
+
+
+def test_async_grpc_client_is_created_per_event_loop(registry):
+    async def get_client():
+        client = registry.data_chat_async()
+        assert registry.data_chat_async() is client
+        return client
+
+    assert asyncio.run(get_client()) is not asyncio.run(get_client())
@@ -13,7 +13,7 @@
 # limitations under the License.
 
 import pytest
-from maintenance_scheduler.config import Config
+from maintenance_scheduler.config import Config, get_config
 import logging
 
 
@@ -26,3 +26,7 @@ def conf():
 def test_settings_loading(conf):
     logging.info(conf.model_dump())
     assert conf.root_agent_settings.model.startswith("gemini")
+
+
+def test_config_is_loaded_once():
+    assert get_config() is get_config()
@@ -0,0 +1,166 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from types import SimpleNamespace
+
+import pytest
+from google.adk.tools import agent_tool
+
+from maintenance_scheduler.entities.notification import Email, \
+    MaintenanceNotification
+from maintenance_scheduler.shared_libraries.email_cache import EmailCache, \
+    notification_key
+from maintenance_scheduler.tools import email_content_generator
+from maintenance_scheduler.tools.email_content_generator import \
+    NotificationEmail, email_content_generator_tool, \
+    generate_notification_emails
+
+
+def notification(bus_stop_id, reason="Broken glass"):
+    return MaintenanceNotification(
+        bus_stop_id=bus_stop_id,
+        schedule_time="April 2, 2025, at 3:00 PM EST",
+        reason=reason,
+        street="123 Main",
+        city="New York",
+        state="NY",
+        zip="10001",
+        image=f"gs://bucket/images/{bus_stop_id}.jpeg")
+
+
+class FakeModels:
+    def __init__(self):
+        self.calls = []
+
+    async def generate_content(self, model, contents, config):
+        notifications = json.loads(contents)
+        self.calls.append(notifications)
+        # Emails are returned out of order
+        return SimpleNamespace(
+            usage_metadata=None,
+            parsed=[NotificationEmail(
+                notification_index=item["notification_index"],
+                email_subject=f"Maintenance of {item['bus_stop_id']}",
+                email_body=item["reason"])
+                for item in reversed(notifications)])
+
+
+@pytest.fixture
+def fake_genai(monkeypatch):
+    models = FakeModels()
+    monkeypatch.setattr(
+        email_content_generator, "get_genai_client",
+        lambda: SimpleNamespace(aio=SimpleNamespace(models=models)))
+    monkeypatch.setattr(email_content_generator, "email_cache",
+                        EmailCache(max_entries=100))
+    monkeypatch.setattr(email_content_generator.configs, "email_batch_size", 2)
+    return models
+
+
+@pytest.mark.asyncio
+async def test_emails_are_generated_in_batches(fake_genai):
+    result = await generate_notification_emails(
+        [notification(f"stop-{index}") for index in range(3)])
+
+    assert result["status"] == "success"
+    assert [email.email_subject for email in result["emails"]] == [
+        "Maintenance of stop-0", "Maintenance of stop-1",
+        "Maintenance of stop-2"]
+    assert [len(call) for call in fake_genai.calls] == [2, 1]
+
+
+@pytest.mark.asyncio
+async def test_cached_emails_are_not_regenerated(fake_genai):
+    await generate_notification_emails([notification("stop-1")])
+
+    result = await generate_notification_emails([
+        notification("stop-1", reason="  broken   GLASS "),
+        notification("stop-2"),
+        notification("stop-2"),
+    ])
+
+    assert [email.email_subject for email in result["emails"]] == [
+        "Maintenance of stop-1", "Maintenance of stop-2",
+        "Maintenance of stop-2"]
+    assert [[item["bus_stop_id"] for item in call]
+            for call in fake_genai.calls] == [["stop-1"], ["stop-2"]]
+
+
+@pytest.mark.asyncio
+async def test_missing_emails_are_an_error(fake_genai, monkeypatch):
+    async def generate_content(model, contents, config):
+        return SimpleNamespace(usage_metadata=None, parsed=[])
+
+    monkeypatch.setattr(fake_genai, "generate_content", generate_content)
+
+    result = await generate_notification_emails([notification("stop-1")])
+
+    assert result == {"status": "error"}
+
+
+def test_email_cache_evicts_least_recently_used():
+    cache = EmailCache(max_entries=2)
+    for bus_stop_id in ("stop-1", "stop-2"):
+        cache.put(notification(bus_stop_id),
+                  Email(email_subject=bus_stop_id, email_body=""))
+    cache.get_many([notification("stop-1")])
+    cache.put(notification("stop-3"), Email(email_subject="", email_body=""))
+
+    cached, missing = cache.get_many(
+        [notification(bus_stop_id)
+         for bus_stop_id in ("stop-1", "stop-2", "stop-3")])
+
+    assert list(cached) == [notification_key(notification("stop-1")),
+                            notification_key(notification("stop-3"))]
+    assert [item.bus_stop_id for item in missing] == ["stop-2"]
+
+
+def test_identifiers_are_case_sensitive_in_the_cache_key():
+    formatted = notification("stop-1", reason="  broken   GLASS ")
+    renamed = notification("STOP-1")
+    other_image = notification("stop-1").model_copy(
+        update={"image": "gs://bucket/images/STOP-1.jpeg"})
+
+    assert notification_key(formatted) == notification_key(
+        notification("stop-1"))
+    assert notification_key(renamed) != notification_key(
+        notification("stop-1"))
+    assert notification_key(other_image) != notification_key(
+        notification("stop-1"))
+
+
+@pytest.mark.asyncio
+async def test_single_email_tool_shares_the_cache(fake_genai, monkeypatch):
+    runs = []
+
+    async def run_agent(self, *, args, tool_context):
+        runs.append(args["bus_stop_id"])
+        return {"email_subject": f"Maintenance of {args['bus_stop_id']}",
+                "email_body": args["reason"]}
+
+    monkeypatch.setattr(agent_tool.AgentTool, "run_async", run_agent)
+    await generate_notification_emails([notification("stop-1")])
+    tool_context = SimpleNamespace(state={})
+
+    emails = [await email_content_generator_tool.run_async(
+        args=notification(bus_stop_id).model_dump(),
+        tool_context=tool_context)
+        for bus_stop_id in ("stop-1", "stop-2", "stop-2")]
+
+    assert [email["email_subject"] for email in emails] == [
+        "Maintenance of stop-1", "Maintenance of stop-2",
+        "Maintenance of stop-2"]
+    assert runs == ["stop-2"]
+    assert tool_context.state["email"] == emails[-1]
@@ -0,0 +1,147 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from google.api_core.exceptions import AlreadyExists, NotFound, \
+    ServiceUnavailable
+
+from maintenance_explorer import agent
+from maintenance_explorer.tools import conversations
+
+AGENT_NAME = "projects/test-project/locations/global/dataAgents/agent"
+
+
+class FakeDataAgentClient:
+    def __init__(self, exists=True, error=None):
+        self.exists = exists
+        self.error = error
+        self.gets = 0
+        self.created = []
+
+    def get_data_agent(self, name):
+        self.gets += 1
+        if self.error is not None:
+            raise self.error
+        if not self.exists:
+            raise NotFound("No such data agent")
+        return SimpleNamespace(name=name)
+
+    def list_data_agents(self, request):
+        raise AssertionError("Data agents are not listed")
+
+    def create_data_agent(self, request):
+        self.created.append(request)
+        self.exists = True
+
+
+class FakeDataChatClient:
+    def __init__(self):
+        self.created = []
+        self.threads = []
+
+    def create_conversation(self, request):
+        self.threads.append(threading.current_thread())
+        if request.conversation_id in self.created:
+            raise AlreadyExists("Conversation exists")
+        self.created.append(request.conversation_id)
+        return request.conversation
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    monkeypatch.setattr(conversations, "_data_agents", set())
+    registry = SimpleNamespace(data_agent_client=FakeDataAgentClient(),
+                               data_chat_client=FakeDataChatClient())
+    registry.data_agent = lambda: registry.data_agent_client
+    registry.data_chat = lambda: registry.data_chat_client
+    monkeypatch.setattr(conversations, "get_client_registry",
+                        lambda: registry)
+    monkeypatch.setattr(agent, "chart_renderer",
+                        SimpleNamespace(start=lambda: None))
+    return registry
+
+
+def ensure(agent_name=AGENT_NAME):
+    return conversations.ensure_data_agent(
+        "projects/test-project/locations/global", "agent", agent_name,
+        "test-project", "dataset")
+
+
+def test_data_agent_is_checked_once_per_process(clients):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: ensure(), range(16)))
+
+    assert results == [True] * 16
+    assert clients.data_agent_client.gets == 1
+    assert clients.data_agent_client.created == []
+
+
+def test_missing_data_agent_is_created(clients):
+    clients.data_agent_client.exists = False
+
+    assert ensure()
+    assert ensure()
+
+    assert clients.data_agent_client.gets == 1
+    [request] = clients.data_agent_client.created
+    assert request.data_agent_id == "agent"
+    assert len(request.data_agent.data_analytics_agent.published_context
+               .datasource_references.bq.table_references) == 5
+
+
+def test_failed_check_is_retried(clients):
+    clients.data_agent_client.error = ServiceUnavailable("Unavailable")
+    assert not ensure()
+
+    clients.data_agent_client.error = None
+    assert ensure()
+    assert clients.data_agent_client.gets == 2
+
+
+@pytest.mark.asyncio
+async def test_conversation_is_created_on_the_first_chat(clients):
+    sessions = [SimpleNamespace(state={}, invocation_id=f"session-{index}")
+                for index in range(3)]
+    for session in sessions:
+        await agent.setup_before_agent_call(session)
+
+    assert clients.data_agent_client.gets == 1
+    assert clients.data_chat_client.created == []
+
+    state = sessions[0].state
+    await conversations.ensure_conversation(state)
+    await conversations.ensure_conversation(state)
+
+    assert clients.data_chat_client.created == ["session-0"]
+    assert state[conversations.CONVERSATION_CREATED]
+    assert clients.data_chat_client.threads[0] is not \
+        threading.main_thread()
+
+
+@pytest.mark.asyncio
+async def test_conversation_created_concurrently_exists(clients):
+    state = {"agent_name": AGENT_NAME,
+             "agent_parent": "projects/test-project/locations/global",
+             "conversation_name": "projects/test-project/locations/global/"
+                                  "conversations/session",
+             "conversation_id": "session"}
+    clients.data_chat_client.created.append("session")
+
+    await conversations.ensure_conversation(state)
+
+    assert state[conversations.CONVERSATION_CREATED]
@@ -0,0 +1,381 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import grpc
+import pytest
+import pytest_asyncio
+from google.cloud import geminidataanalytics
+from google.cloud.geminidataanalytics_v1.services.data_chat_service. \
+    transports import DataChatServiceGrpcAsyncIOTransport
+
+from maintenance_explorer.tools import tools
+from maintenance_explorer.tools.answer_cache import AnswerCache
+from maintenance_explorer.tools.chart_renderer import RenderedChart
+from shared_services.gcs_objects import \
+    AsyncGcsObjectLoader, GcsObjectCache
+from shared_services.image_previews import \
+    ImagePreviewService, PreviewCache
+from tests.fake_gcs_server import FakeGcsServer
+from tests.sample_images import jpeg_image
+
+VEGA_CONFIG = {
+    "mark": "bar",
+    "encoding": {"x": {"field": "city", "type": "nominal"},
+                 "y": {"field": "incidents", "type": "quantitative"}},
+    "data": {"values": [{"city": "New York", "incidents": 3},
+                        {"city": "Boston", "incidents": 1}]},
+}
+
+
+def text_reply(text):
+    return geminidataanalytics.Message(
+        system_message=geminidataanalytics.SystemMessage(
+            text=geminidataanalytics.TextMessage(parts=[text])))
+
+
+def chart_reply():
+    return geminidataanalytics.Message(
+        system_message=geminidataanalytics.SystemMessage(
+            chart=geminidataanalytics.ChartMessage(
+                result=geminidataanalytics.ChartResult(
+                    vega_config=VEGA_CONFIG))))
+
+
+class FakeDataChatServer:
+    """
+      Local gRPC server streaming a scripted Conversational Analytics reply.
+
+      `replies` is a list of delays in seconds and the message sent after
+      the delay.
+    """
+
+    def __init__(self, replies):
+        self.replies = replies
+        self.chats = 0
+        self.requests = []
+        self.cancelled = asyncio.Event()
+        self.server = grpc.aio.server()
+        self.server.add_generic_rpc_handlers([
+            grpc.method_handlers_generic_handler(
+                "google.cloud.geminidataanalytics.v1.DataChatService",
+                {"Chat": grpc.unary_stream_rpc_method_handler(
+                    self.chat,
+                    request_deserializer=geminidataanalytics.ChatRequest
+                    .deserialize,
+                    response_serializer=geminidataanalytics.Message
+                    .serialize)})])
+        self.port = self.server.add_insecure_port("127.0.0.1:0")
+
+    async def chat(self, request, context):
+        self.chats += 1
+        self.requests.append(request)
+        try:
+            for delay, reply in self.replies:
+                await asyncio.sleep(delay)
+                yield reply
+        except asyncio.CancelledError:
+            self.cancelled.set()
+            raise
+
+    def client(self):
+        return geminidataanalytics.DataChatServiceAsyncClient(
+            transport=DataChatServiceGrpcAsyncIOTransport(
+                channel=grpc.aio.insecure_channel(f"127.0.0.1:{self.port}")))
+
+
+@pytest.fixture
+def data_version(monkeypatch):
+    """Installs an answer cache with a data version the test can change."""
+    version = {"incidents": 1}
+    monkeypatch.setattr(tools, "answer_cache", AnswerCache(
+        lambda: version["incidents"], max_entries=16, version_check_secs=0))
+    return version
+
+
+@pytest_asyncio.fixture
+async def fake_data_chat(monkeypatch, data_version):
+    servers = []
+
+    async def install(replies):
+        server = FakeDataChatServer(replies)
+        await server.server.start()
+        servers.append(server)
+        client = server.client()
+        monkeypatch.setattr(
+            tools, "get_client_registry",
+            lambda: SimpleNamespace(data_chat_async=lambda: client))
+        return server
+
+    yield install
+    for server in servers:
+        await server.server.stop(grace=None)
+
+
+def tool_context(conversation_id="conversation"):
+    async def save_artifact(filename, artifact):
+        context.artifacts[filename] = artifact
+        return 0
+
+    context = SimpleNamespace(
+        state={"agent_parent": "projects/test-project/locations/global",
+               "agent_name": "projects/test-project/locations/global/"
+                             "dataAgents/agent",
+               "conversation_name": "projects/test-project/locations/global/"
+                                    f"conversations/{conversation_id}",
+               "conversation_created": True},
+        artifacts={},
+        save_artifact=save_artifact)
+    return context
+
+
+@pytest.mark.asyncio
+async def test_chart_is_saved_without_waiting_for_the_rest_of_the_stream(
+    fake_data_chat, monkeypatch
+):
+    rendered = []
+
+    async def render(vega_config, output_format):
+        rendered.append(vega_config)
+        return RenderedChart(b"png", "image/png")
+
+    monkeypatch.setattr(tools.chart_renderer, "render", render)
+    server = await fake_data_chat([
+        (0.01, text_reply("Retrieving the incidents")),
+        (0.01, chart_reply()),
+        # The summary of the chart arrives long after the chart
+        (5.0, text_reply("New York has the most incidents")),
+    ])
+    context = tool_context()
+
+    start = time.perf_counter()
+    result = await tools.query_and_save_chart("Incidents by city", context)
+    elapsed = time.perf_counter() - start
+
+    assert result["status"] == "success"
+    assert elapsed < 1.0
+    assert rendered == [VEGA_CONFIG]
+    assert context.artifacts["analytics_chart.png"].inline_data.data == b"png"
+    await asyncio.wait_for(server.cancelled.wait(), timeout=1.0)
+
+
+@pytest.mark.asyncio
+async def test_stream_without_chart_is_a_warning(fake_data_chat):
+    await fake_data_chat([(0.01, text_reply("There are no incidents"))])
+
+    result = await tools.query_and_save_chart("Incidents by city",
+                                              tool_context())
+
+    assert result["status"] == "warning"
+
+
+@pytest.mark.asyncio
+async def test_unknown_chart_format(fake_data_chat):
+    result = await tools.query_and_save_chart(
+        "Incidents by city", tool_context(), output_format="gif")
+
+    assert result["status"] == "error"
+
+
+@pytest.mark.asyncio
+async def test_lakehouse_answer_leaves_out_the_intermediate_messages(
+        fake_data_chat):
+    await fake_data_chat([
+        (0.0, text_reply("Retrieving the incidents")),
+        (0.0, chart_reply()),
+        (0.0, geminidataanalytics.Message(
+            system_message=geminidataanalytics.SystemMessage(
+                data=geminidataanalytics.DataMessage(
+                    generated_sql="SELECT city FROM incidents")))),
+        (0.0, geminidataanalytics.Message(
+            system_message=geminidataanalytics.SystemMessage(
+                text=geminidataanalytics.TextMessage(
+                    parts=["New York has the most incidents"],
+                    text_type=geminidataanalytics.TextMessage.TextType
+                    .FINAL_RESPONSE)))),
+    ])
+
+    result = await tools.ask_lakehouse("Which city has the most incidents?",
+                                       tool_context())
+
+    assert result == {
+        "status": "success",
+        # Text without a type is kept, as it may be the answer
+        "answer": "Retrieving the incidentsNew York has the most incidents",
+        "sql": "SELECT city FROM incidents",
+        "dropped": {"chart_messages": 1},
+        "cached": False,
+    }
+
+
+@pytest.mark.asyncio
+async def test_answers_are_cached_until_the_data_changes(fake_data_chat,
+                                                         data_version):
+    server = await fake_data_chat([(0.0, text_reply("3 open incidents"))])
+
+    first = await tools.ask_lakehouse("How many open incidents?",
+                                      tool_context())
+    repeated = await tools.ask_lakehouse("how many  open incidents",
+                                         tool_context())
+    data_version["incidents"] += 1
+    refreshed = await tools.ask_lakehouse("How many open incidents?",
+                                          tool_context())
+
+    assert [first["cached"], repeated["cached"], refreshed["cached"]] == \
+        [False, True, False]
+    assert repeated["answer"] == "3 open incidents"
+    assert server.chats == 2
+
+
+@pytest.mark.asyncio
+async def test_follow_up_answers_stay_in_their_conversation(fake_data_chat):
+    server = await fake_data_chat([(0.0, text_reply("3 open incidents"))])
+    first, second = tool_context("first"), tool_context("second")
+
+    for context in (first, second):
+        for question in ("How many open incidents?", "And in Boston?"):
+            await tools.ask_lakehouse(question, context)
+    repeated = await tools.ask_lakehouse("And in Boston?", first)
+
+    # The opening question is shared, the follow-ups are not
+    assert server.chats == 3
+    assert repeated["cached"]
+    # The conversation of the second session gets the cached opening answer
+    # with its follow-up
+    follow_up = server.requests[2].messages
+    assert [message.user_message.text for message in follow_up] == [
+        "How many open incidents?", "", "And in Boston?"]
+    assert follow_up[1].system_message.text.parts == ["3 open incidents"]
+    assert second.state["conversation_questions"] == 2
+    assert "conversation_context" not in second.state
+
+
+@pytest.mark.asyncio
+async def test_failed_chats_are_not_counted(fake_data_chat, monkeypatch):
+    async def render(vega_config, output_format):
+        return RenderedChart(b"png", "image/png")
+
+    monkeypatch.setattr(tools.chart_renderer, "render", render)
+    await fake_data_chat([(0.0, chart_reply())])
+    await tools.query_and_save_chart("Incidents by city", tool_context("first"))
+
+    second = tool_context("second")
+    monkeypatch.setattr(
+        tools, "get_client_registry",
+        lambda: SimpleNamespace(data_chat_async=lambda: None))
+    await tools.query_and_save_chart("Incidents by city", second)
+    failed = await tools.query_and_save_chart("And in Boston?", second)
+
+    # The cached chart is still sent with the next chat which succeeds
+    assert failed["status"] == "exception"
+    assert "conversation_questions" not in second.state
+    assert len(second.state["conversation_context"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_chart_specs_are_cached(fake_data_chat, monkeypatch):
+    async def render(vega_config, output_format):
+        return RenderedChart(b"png", "image/png")
+
+    monkeypatch.setattr(tools.chart_renderer, "render", render)
+    server = await fake_data_chat([(0.0, chart_reply())])
+
+    results = [await tools.query_and_save_chart("Incidents by city",
+                                                tool_context())
+               for _ in range(2)]
+
+    assert [result["cached"] for result in results] == [False, True]
+    assert server.chats == 1
+
+
+@pytest.fixture
+def gcs_server(monkeypatch):
+    server = FakeGcsServer().start()
+    client = server.client()
+    loader = AsyncGcsObjectLoader(lambda: client,
+                                  cache=GcsObjectCache(max_bytes=1024 * 1024),
+                                  revalidate_secs=60,
+                                  max_concurrent_downloads=2)
+    images = ImagePreviewService(loader, PreviewCache(max_bytes=1024 * 1024),
+                                 max_size=64, image_format="webp",
+                                 quality=80, max_workers=2)
+    monkeypatch.setattr(tools, "get_image_preview_service", lambda: images)
+    yield server
+    server.stop()
+
+
+@pytest.mark.asyncio
+async def test_image_is_downloaded_once_for_all_sessions(gcs_server):
+    gcs_server.put("bucket", "images/stop-1.jpeg", jpeg_image(640, 480))
+    contexts = [tool_context(), tool_context()]
+
+    results = [await tools.save_image_from_gcs(
+        "gs://bucket/images/stop-1.jpeg", context) for context in contexts]
+
+    assert [result["status"] for result in results] == ["success"] * 2
+    assert [result["image_filename"] for result in results] == \
+        ["stop-1_preview.webp"] * 2
+    artifacts = [context.artifacts["stop-1_preview.webp"].inline_data
+                 for context in contexts]
+    assert [artifact.mime_type for artifact in artifacts] == \
+        ["image/webp"] * 2
+    assert (results[0]["width"], results[0]["height"]) == (64, 48)
+    assert len(gcs_server.downloads) == 1
+
+
+@pytest.mark.asyncio
+async def test_original_image_has_its_detected_mime_type(gcs_server):
+    data = jpeg_image(640, 480)
+    # Objects uploaded without a content type are served as binary data
+    gcs_server.put("bucket", "images/stop-1.jpg", data,
+                   content_type="application/octet-stream")
+    context = tool_context()
+
+    result = await tools.save_image_from_gcs(
+        "gs://bucket/images/stop-1.jpg", context, preview=False)
+
+    assert result["status"] == "success"
+    artifact = context.artifacts["stop-1.jpg"].inline_data
+    assert (artifact.data, artifact.mime_type) == (data, "image/jpeg")
+    assert (result["width"], result["height"]) == (640, 480)
+
+
+@pytest.mark.asyncio
+async def test_missing_image_is_an_error(gcs_server):
+    result = await tools.save_image_from_gcs("gs://bucket/missing.jpeg",
+                                             tool_context())
+
+    assert result["status"] == "error"
+    assert "not found" in result["message"]
+
+
+def test_explorer_does_not_import_the_scheduler():
+    script = ("import sys, maintenance_explorer; "
+              "print(sorted(name for name in sys.modules "
+              "if name.startswith('maintenance_scheduler')))")
+    env = {**os.environ, "GOOGLE_use_mcp_toolbox": "false"}
+    env.setdefault("GOOGLE_CLOUD_PROJECT", "test-project")
+
+    result = subprocess.run(
+        [sys.executable, "-c", script], env=env, check=True,
+        capture_output=True, text=True,
+        cwd=os.path.join(os.path.dirname(__file__), "..", ".."))
+
+    assert result.stdout.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,70 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from maintenance_scheduler.shared_libraries.forecast_payload import (
+    columnar_payload, rows_payload, run_length_encode
+)
+
+time_zone = ZoneInfo("America/New_York")
+start = datetime(2025, 7, 7, 4, 0, tzinfo=timezone.utc)
+end = start + timedelta(days=3)
+
+
+def test_run_length_encoding():
+    values = np.array([0, 0, 0, 5, 5, 7, 0, 0, 0, 0])
+
+    assert run_length_encode(values) == [[0, 3], 5, 5, 7, [0, 4]]
+    assert run_length_encode(np.array([], dtype=np.int64)) == []
+
+
+def test_columnar_payload_matches_rows():
+    points = [(start + timedelta(minutes=15 * index), min(index % 7, 3))
+              for index in range(20)]
+
+    rows = rows_payload(points, start, end, time_zone)
+    columnar = columnar_payload(points, start, end, time_zone)
+    columnar_rle = columnar_payload(points, start, end, time_zone,
+                                    run_length_encoding=True)
+
+    assert columnar["start"] == rows[0]["time"] == "07/07/2025 00:00"
+    assert columnar["step_minutes"] == 15
+    assert columnar["number_of_passengers"] == \
+           [row["number_of_passengers"] for row in rows]
+    decoded = []
+    for entry in columnar_rle["number_of_passengers_rle"]:
+        decoded.extend([entry[0]] * entry[1] if isinstance(entry, list)
+                       else [entry])
+    assert decoded == columnar["number_of_passengers"]
+
+
+def test_irregular_points_fall_back_to_rows():
+    points = [(start, 1), (start + timedelta(minutes=15), 2),
+              (start + timedelta(minutes=45), 3)]
+
+    columnar = columnar_payload(points, start, end, time_zone)
+
+    assert columnar == {"rows": rows_payload(points, start, end, time_zone)}
+
+
+def test_points_outside_of_period_are_skipped():
+    points = [(start - timedelta(minutes=15), 1), (start, 2)]
+
+    assert columnar_payload(points, start, end, time_zone)[
+               "number_of_passengers"] == [2]
+    assert columnar_payload(points[:1], start, end, time_zone) is None
@@ -0,0 +1,95 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from shared_services.gcs_objects import \
+    AsyncGcsObjectLoader, GcsObject, GcsObjectCache, parse_gcs_uri
+from tests.fake_gcs_server import FakeGcsServer
+
+
+@pytest.fixture
+def gcs_server():
+    server = FakeGcsServer().start()
+    yield server
+    server.stop()
+
+
+def loader(server, max_bytes=1024, revalidate_secs=60.0):
+    client = server.client()
+    return AsyncGcsObjectLoader(lambda: client,
+                                cache=GcsObjectCache(max_bytes=max_bytes),
+                                revalidate_secs=revalidate_secs,
+                                max_concurrent_downloads=2)
+
+
+@pytest.mark.asyncio
+async def test_object_is_downloaded_with_one_request(gcs_server):
+    gcs_server.put("bucket", "images/stop 1.jpeg", b"jpeg")
+    gcs_objects = loader(gcs_server)
+
+    image = await gcs_objects.load("gs://bucket/images/stop 1.jpeg")
+    cached = await gcs_objects.load("gs://bucket/images/stop 1.jpeg")
+
+    assert image.data == b"jpeg"
+    assert image.generation == 1
+    assert image.content_type == "image/jpeg"
+    assert not image.cached
+    assert cached.cached
+    assert len(gcs_server.downloads) == 1
+
+
+@pytest.mark.asyncio
+async def test_missing_object_is_none(gcs_server):
+    assert await loader(gcs_server).load("gs://bucket/missing.jpeg") is None
+    assert len(gcs_server.downloads) == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_objects_are_revalidated_by_generation(gcs_server):
+    gcs_server.put("bucket", "stop-1.jpeg", b"old")
+    gcs_objects = loader(gcs_server, revalidate_secs=0)
+
+    await gcs_objects.load("gs://bucket/stop-1.jpeg")
+    bytes_sent = gcs_server.bytes_sent
+    unchanged = await gcs_objects.load("gs://bucket/stop-1.jpeg")
+    gcs_server.put("bucket", "stop-1.jpeg", b"new")
+    replaced = await gcs_objects.load("gs://bucket/stop-1.jpeg")
+
+    assert unchanged.cached and unchanged.data == b"old"
+    assert gcs_server.bytes_sent == bytes_sent + len(b"new")
+    assert not replaced.cached
+    assert (replaced.data, replaced.generation) == (b"new", 2)
+    assert gcs_objects.stats()["not_modified"] == 1
+
+
+def test_cache_is_bounded_by_size():
+    cache = GcsObjectCache(max_bytes=10)
+    for name in ("a", "b", "c"):
+        cache.put(GcsObject(bucket="bucket", name=name, data=b"1234"))
+    cache.put(GcsObject(bucket="bucket", name="large", data=b"1" * 11))
+
+    assert [cache.get("bucket", name)[0] is not None
+            for name in ("a", "b", "c", "large")] == [
+               False, True, True, False]
+    assert cache.stats()["size_bytes"] == 8
+
+
+def test_parse_gcs_uri():
+    assert parse_gcs_uri("gs://bucket/images/a.jpeg") == (
+        "bucket", "images/a.jpeg")
+    with pytest.raises(ValueError):
+        parse_gcs_uri("https://bucket/a.jpeg")
+    with pytest.raises(ValueError):
+        parse_gcs_uri("gs://bucket")
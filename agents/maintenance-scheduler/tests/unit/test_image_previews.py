@@ -0,0 +1,139 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+
+import pytest
+from PIL import Image
+
+from shared_services.gcs_objects import \
+    AsyncGcsObjectLoader, GcsObjectCache
+from shared_services.image_previews import \
+    EncodedImage, ImagePreviewService, PreviewCache, describe_image, \
+    make_preview
+from tests.fake_gcs_server import FakeGcsServer
+from tests.sample_images import encoded_image, jpeg_image
+
+
+@pytest.fixture
+def gcs_server():
+    server = FakeGcsServer().start()
+    yield server
+    server.stop()
+
+
+def service(server, max_bytes=1024 * 1024, revalidate_secs=60.0):
+    client = server.client()
+    loader = AsyncGcsObjectLoader(
+        lambda: client, cache=GcsObjectCache(max_bytes=1024 * 1024),
+        revalidate_secs=revalidate_secs, max_concurrent_downloads=2)
+    return ImagePreviewService(loader, PreviewCache(max_bytes=max_bytes),
+                               max_size=256, image_format="webp",
+                               quality=80, max_workers=2)
+
+
+def test_mime_type_is_detected_from_the_content():
+    assert describe_image(encoded_image(8, 4, "PNG")).mime_type == \
+        "image/png"
+    image = describe_image(jpeg_image(8, 4))
+    assert (image.mime_type, image.width, image.height) == \
+        ("image/jpeg", 8, 4)
+    assert describe_image(b"not an image",
+                          "image/jpeg").mime_type == "image/jpeg"
+
+
+def test_preview_fits_the_size_and_keeps_the_aspect_ratio():
+    preview = make_preview(jpeg_image(1600, 1200), 256, "webp", 80)
+
+    assert (preview.mime_type, preview.width, preview.height) == \
+        ("image/webp", 256, 192)
+    with Image.open(io.BytesIO(preview.data)) as image:
+        assert (image.format, image.size) == ("WEBP", (256, 192))
+
+
+def test_preview_applies_the_exif_orientation():
+    # Orientation 6 is displayed rotated by 90 degrees
+    data = encoded_image(400, 200, orientation=6)
+
+    preview = make_preview(data, 100, "jpeg", 80)
+
+    assert (preview.mime_type, preview.width, preview.height) == \
+        ("image/jpeg", 50, 100)
+
+
+def test_small_images_are_not_enlarged():
+    preview = make_preview(encoded_image(40, 30, "PNG", mode="RGBA"), 256,
+                           "jpeg", 80)
+
+    assert (preview.width, preview.height) == (40, 30)
+    assert describe_image(preview.data).mime_type == "image/jpeg"
+
+
+def test_cache_is_bounded_by_size():
+    cache = PreviewCache(max_bytes=10)
+    cache.put(("a",), EncodedImage(b"123456", "image/webp", 1, 1))
+    cache.put(("b",), EncodedImage(b"123456", "image/webp", 1, 1))
+    cache.put(("c",), EncodedImage(b"12345678901", "image/webp", 1, 1))
+
+    assert cache.get(("a",)) is None
+    assert cache.get(("b",)) is not None
+    assert cache.get(("c",)) is None
+    assert cache.stats()["size_bytes"] == 6
+
+
+@pytest.mark.asyncio
+async def test_previews_are_cached_by_size_and_format(gcs_server):
+    gcs_server.put("bucket", "stop-1.jpeg", jpeg_image(1600, 1200))
+    images = service(gcs_server)
+
+    preview = await images.preview("gs://bucket/stop-1.jpeg")
+    cached = await images.preview("gs://bucket/stop-1.jpeg")
+    small = await images.preview("gs://bucket/stop-1.jpeg", max_size=64,
+                                 image_format="jpeg")
+
+    assert not preview.cached
+    assert cached.cached and cached.data == preview.data
+    assert (small.mime_type, small.width) == ("image/jpeg", 64)
+    assert not small.cached
+    assert len(gcs_server.downloads) == 1
+    assert images.stats()["cached_previews"] == 2
+
+
+@pytest.mark.asyncio
+async def test_replaced_image_gets_a_new_preview(gcs_server):
+    gcs_server.put("bucket", "stop-1.jpeg", jpeg_image(1600, 1200))
+    images = service(gcs_server, revalidate_secs=0.0)
+    preview = await images.preview("gs://bucket/stop-1.jpeg")
+
+    gcs_server.put("bucket", "stop-1.jpeg", jpeg_image(1200, 1600))
+    replaced = await images.preview("gs://bucket/stop-1.jpeg")
+
+    assert (preview.width, preview.height) == (256, 192)
+    assert (replaced.width, replaced.height) == (192, 256)
+    assert not replaced.cached
+
+
+@pytest.mark.asyncio
+async def test_missing_image_has_no_preview(gcs_server):
+    images = service(gcs_server)
+
+    assert await images.preview("gs://bucket/missing.jpeg") is None
+    assert await images.original("gs://bucket/missing.jpeg") is None
+
+
+@pytest.mark.asyncio
+async def test_unknown_format_is_rejected(gcs_server):
+    with pytest.raises(ValueError):
+        await service(gcs_server).preview("gs://bucket/stop-1.jpeg",
+                                          image_format="gif")
@@ -0,0 +1,138 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+from google.cloud import geminidataanalytics
+from google.protobuf import struct_pb2
+
+from maintenance_explorer.tools.lakehouse_answers import LakehouseAnswer, \
+    typed_value
+
+TextType = geminidataanalytics.TextMessage.TextType
+
+
+def text_message(text, text_type=TextType.FINAL_RESPONSE):
+    return geminidataanalytics.Message(
+        system_message=geminidataanalytics.SystemMessage(
+            text=geminidataanalytics.TextMessage(parts=[text],
+                                                 text_type=text_type)))
+
+
+def data_message(rows=(), sql=None):
+    data = geminidataanalytics.DataMessage()
+    if sql:
+        data.generated_sql = sql
+    else:
+        data.result.name = "incidents"
+        data.result.schema.fields = [
+            geminidataanalytics.Field(name="city", type_="STRING"),
+            geminidataanalytics.Field(name="incidents", type_="INTEGER"),
+            geminidataanalytics.Field(name="resolved", type_="BOOLEAN")]
+        for city, incidents, resolved in rows:
+            row = struct_pb2.Struct()
+            row.update({"city": city, "incidents": incidents,
+                        "resolved": resolved})
+            data.result.data.append(row)
+    return geminidataanalytics.Message(
+        system_message=geminidataanalytics.SystemMessage(data=data))
+
+
+def schema_message():
+    return geminidataanalytics.Message(
+        system_message=geminidataanalytics.SystemMessage(
+            schema=geminidataanalytics.SchemaMessage(
+                query=geminidataanalytics.SchemaQuery(question="tables"))))
+
+
+def rows(count):
+    return [(f"City {index}", str(index), "true") for index in range(count)]
+
+
+def test_values_are_typed_by_column():
+    assert typed_value("3", "INTEGER") == 3
+    assert typed_value(3.0, "INT64") == 3
+    assert typed_value("2.5", "FLOAT64") == 2.5
+    assert typed_value("false", "BOOLEAN") is False
+    assert typed_value("n/a", "INTEGER") == "n/a"
+    assert typed_value(None, "INTEGER") is None
+
+
+def test_answer_keeps_the_final_text_sql_and_last_table():
+    answer = LakehouseAnswer(max_rows=10, max_bytes=10_000)
+    for message in [
+            schema_message(),
+            text_message("Thinking", TextType.THOUGHT),
+            text_message("Querying", TextType.PROGRESS),
+            data_message(sql="SELECT city FROM incidents"),
+            data_message(rows=rows(5)),
+            data_message(rows=rows(2)),
+            text_message("There are 2 cities.")]:
+        answer.add(message)
+
+    response = answer.to_response()
+
+    assert response["status"] == "success"
+    assert response["answer"] == "There are 2 cities."
+    assert response["sql"] == "SELECT city FROM incidents"
+    assert response["table"]["columns"][1] == {"name": "incidents",
+                                               "type": "INTEGER"}
+    assert response["table"]["rows"] == [
+        {"city": "City 0", "incidents": 0, "resolved": True},
+        {"city": "City 1", "incidents": 1, "resolved": True}]
+    assert response["dropped"] == {"schema_messages": 1,
+                                   "thought_messages": 1,
+                                   "progress_messages": 1,
+                                   "tables": 1}
+
+
+def test_table_is_capped_by_rows():
+    answer = LakehouseAnswer(max_rows=3, max_bytes=10_000)
+    answer.add(data_message(rows=rows(100)))
+
+    table = answer.to_response()["table"]
+
+    assert len(table["rows"]) == 3
+    assert table["total_rows"] == 100
+    assert table["truncated"]
+    assert answer.to_response()["dropped"]["rows"] == 97
+
+
+def test_answer_stays_within_the_byte_budget():
+    answer = LakehouseAnswer(max_rows=1000, max_bytes=2000)
+    answer.add(data_message(sql="SELECT * FROM incidents"))
+    answer.add(data_message(rows=rows(1000)))
+    answer.add(text_message("x" * 1500))
+
+    response = answer.to_response()
+
+    kept = [response["answer"], response["sql"],
+            *response["table"]["rows"]]
+    assert sum(len(json.dumps(value)) for value in kept) <= 2000
+    assert response["answer"] == "x" * 1500
+    assert 0 < len(response["table"]["rows"]) < 20
+    assert response["dropped"]["rows"] == \
+        1000 - len(response["table"]["rows"])
+
+
+def test_errors_without_an_answer_are_an_error():
+    answer = LakehouseAnswer(max_rows=10, max_bytes=10_000)
+    answer.add(geminidataanalytics.Message(
+        system_message=geminidataanalytics.SystemMessage(
+            error=geminidataanalytics.ErrorMessage(text="Table not found"))))
+
+    response = answer.to_response()
+
+    assert response["status"] == "error"
+    assert response["message"] == "Table not found"
@@ -0,0 +1,148 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("duckdb")
+pytest.importorskip("sqlglot")
+
+from maintenance_scheduler.shared_libraries.async_bigquery import \
+    AsyncBigQueryClient
+from maintenance_scheduler.shared_libraries.local_bigquery import \
+    LocalBigQueryClient, load_synthetic_dataset
+from maintenance_scheduler.tools import tools
+from maintenance_scheduler.tools.tools import find_maintenance_windows, \
+    get_unresolved_incidents, schedule_maintenance, \
+    schedule_maintenance_batch
+
+
+def bus_stop(bus_stop_id, city="New York"):
+    return {"bus_stop_id": bus_stop_id,
+            "address": {"street": "123 Main", "city": city, "state": "NY",
+                        "zip": "10001"},
+            "school_zone": False, "seating": True, "num_benches": 1,
+            "maps": False, "shelter_ads": False, "lighting": True,
+            "location": "POINT(-73.98 40.75)"}
+
+
+def report(bus_stop_id):
+    return {"report_id": f"report-{bus_stop_id}",
+            "uri": f"gs://bucket/images/{bus_stop_id}.jpeg",
+            "content_type": "image/jpeg",
+            "image_created": datetime.now(tz=timezone.utc),
+            "bus_stop_id": bus_stop_id, "model_used": "gemini",
+            "cleanliness_level": 2, "safety_level": 3,
+            "description": "Broken glass", "number_of_people": 0,
+            "is_bus_stop": True}
+
+
+def incident(bus_stop_id, status="OPEN"):
+    return {"incident_id": f"incident-{bus_stop_id}",
+            "bus_stop_id": bus_stop_id, "status": status,
+            "open_report_id": f"report-{bus_stop_id}"}
+
+
+@pytest.fixture
+def local_bigquery(monkeypatch):
+    client = LocalBigQueryClient()
+    bus_stop_ids = ["stop-1", "stop-2", "stop-3"]
+    client.load_table("bus_stops", [bus_stop("stop-1"), bus_stop("stop-2"),
+                                     bus_stop("stop-3", city="Albany")])
+    client.load_table("image_reports", [report(bus_stop_id)
+                                        for bus_stop_id in bus_stop_ids])
+    client.load_table("incidents", [incident("stop-1"), incident("stop-2"),
+                                    incident("stop-3", status="RESOLVED")])
+    now = datetime.now(tz=timezone.utc)
+    client.load_table("bus_ridership", [
+        {"bus_stop_id": bus_stop_id,
+         "event_ts": now - timedelta(minutes=15 * step),
+         "num_riders": 10}
+        for bus_stop_id in bus_stop_ids for step in range(7 * 24 * 4)])
+    monkeypatch.setattr(tools.config, "mock_tools", False)
+    monkeypatch.setattr(tools.config, "bigquery_backend", "duckdb")
+    monkeypatch.setattr(tools, "async_bigquery_client",
+                        AsyncBigQueryClient(lambda: client,
+                                            max_concurrent_jobs=4))
+    return client
+
+
+@pytest.mark.asyncio
+async def test_incidents_are_read_from_local_tables(local_bigquery):
+    result = await get_unresolved_incidents(page_size=1)
+
+    assert [incident.bus_stop.id for incident in
+            result["bus_stop_incidents"]] == ["stop-1"]
+    assert result["next_page_token"] == "incident-stop-1"
+    assert result["bus_stop_incidents"][0].incident_image_url == \
+        "https://storage.mtls.cloud.google.com/bucket/images/stop-1.jpeg"
+
+    result = await get_unresolved_incidents(city="albany")
+    assert result["bus_stop_incidents"] == []
+
+
+@pytest.mark.asyncio
+async def test_schedules_are_merged_into_local_tables(local_bigquery):
+    result = await schedule_maintenance_batch([
+        {"bus_stop_id": bus_stop_id,
+         "maintenance_start": "April 2, 2025, at 3:00 PM EST",
+         "reason": "reason", "notification_subject": "subject",
+         "notification_content": "content"}
+        for bus_stop_id in ["stop-1", "stop-3"]])
+    assert result["results"] == {"stop-1": "scheduled",
+                                 "stop-3": "no_open_incident"}
+
+    await schedule_maintenance("stop-2", "April 2, 2025, at 3:00 PM EST",
+                               "reason", "subject", "content")
+
+    rows = local_bigquery.query_and_wait(
+        "SELECT bus_stop_id, maintenance_details.reason AS reason "
+        "FROM `project.bus_stop_image_processing.incidents` "
+        "WHERE status = 'SCHEDULED' ORDER BY bus_stop_id")
+    assert [(row.bus_stop_id, row.reason) for row in rows] == [
+        ("stop-1", "reason"), ("stop-2", "reason")]
+
+
+@pytest.mark.asyncio
+async def test_ai_forecast_is_answered_locally(local_bigquery, monkeypatch):
+    monkeypatch.setattr(tools.config, "forecast_backend", "bigquery")
+    monkeypatch.setattr(tools.config, "local_forecast_fallback", False)
+
+    result = await find_maintenance_windows(["stop-1", "stop-2"],
+                                            duration_hours=1,
+                                            working_hours_only=False,
+                                            allow_weekends=True)
+
+    assert result["status"] == "success"
+    assert [window["expected_number_of_passengers"]
+            for window in result["windows"]["stop-1"]] == [40, 40, 40]
+
+
+def test_synthetic_dataset():
+    client = LocalBigQueryClient()
+    bus_stop_ids = load_synthetic_dataset(
+        client, number_of_bus_stops=20, number_of_incidents=5,
+        end=datetime.now(tz=timezone.utc), days=7, seed=1)
+
+    rows = client.query_and_wait(
+        "SELECT COUNT(*) AS observations, COUNT(DISTINCT bus_stop_id) AS stops "
+        "FROM `project.bus_stop_image_processing.bus_ridership`")
+    row = next(iter(rows))
+    assert row.stops == len(bus_stop_ids) == 20
+    assert row.observations == 20 * 7 * 24 * 4
+    assert next(iter(client.query_and_wait(
+        "SELECT COUNT(*) AS incidents "
+        "FROM `project.bus_stop_image_processing.incidents` "
+        "WHERE status = 'OPEN'"))).incidents == 5
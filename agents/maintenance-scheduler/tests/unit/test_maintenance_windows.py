@@ -0,0 +1,75 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from maintenance_scheduler.shared_libraries.maintenance_windows import \
+    find_maintenance_windows
+
+time_zone = ZoneInfo("America/New_York")
+# Friday, July 4th 2025, midnight in New York
+start = datetime(2025, 7, 4, 4, 0, tzinfo=timezone.utc)
+step = timedelta(minutes=15)
+
+
+def test_lowest_window_is_selected():
+    values = np.full((2, 96), 10)
+    values[0, 40:48] = 1
+    values[1, 60:64] = 0
+
+    windows = find_maintenance_windows(
+        values, start, step, time_zone, duration=timedelta(hours=2),
+        not_before=start, number_of_windows=1)
+
+    assert windows == [[(40, 8)], [(56, 40)]]
+
+
+def test_windows_do_not_overlap():
+    values = np.arange(96)[np.newaxis, :]
+
+    windows = find_maintenance_windows(
+        values, start, step, time_zone, duration=timedelta(hours=1),
+        not_before=start, on_the_hour=False, number_of_windows=3)
+
+    assert [index for index, _ in windows[0]] == [0, 4, 8]
+
+
+def test_constraints():
+    # Friday to Monday
+    values = np.zeros((1, 4 * 96))
+
+    windows = find_maintenance_windows(
+        values, start, step, time_zone, duration=timedelta(hours=3),
+        not_before=start + timedelta(hours=9, minutes=30),
+        working_hours=(8, 16), allow_weekends=False, number_of_windows=10)
+
+    starts = [start + step * index for index, _ in windows[0]]
+    local_starts = [value.astimezone(time_zone) for value in starts]
+    # Friday 10:00 is the first start after the lead time, Friday 13:00 is the
+    # last start which ends by 16:00, then Monday.
+    assert [value.strftime("%a %H:%M") for value in local_starts] == \
+           ["Fri 10:00", "Fri 13:00", "Mon 08:00", "Mon 11:00"]
+
+
+def test_no_window_fits():
+    values = np.zeros((1, 4))
+
+    windows = find_maintenance_windows(
+        values, start, step, time_zone, duration=timedelta(hours=2),
+        not_before=start)
+
+    assert windows == [[]]
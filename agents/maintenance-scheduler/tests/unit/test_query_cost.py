@@ -0,0 +1,63 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from google.cloud import bigquery
+
+from maintenance_scheduler.shared_libraries.query_cost import QueryCost, \
+    QueryCostGuard, query_shape
+
+
+def parameters(bus_stop_ids, city="New York"):
+    return [bigquery.ArrayQueryParameter("bus_stop_ids", "STRING",
+                                         bus_stop_ids),
+            bigquery.ScalarQueryParameter("city", "STRING", city)]
+
+
+class FakeAsyncClient:
+    def __init__(self, total_bytes_processed):
+        self.total_bytes_processed = total_bytes_processed
+        self.dry_runs = 0
+
+    async def dry_run(self, query, query_parameters=(), project=None):
+        self.dry_runs += 1
+        return self.total_bytes_processed
+
+
+def test_query_shape_ignores_parameter_values():
+    query = "SELECT * FROM t WHERE id IN UNNEST(@bus_stop_ids)"
+
+    assert query_shape(query, parameters(["a", "b", "c"])) == query_shape(
+        f"  {query}\n", parameters(["d", "e", "f", "g"], city="Boston"))
+    assert query_shape(query, parameters(["a", "b", "c"])) != query_shape(
+        query, parameters(["a", "b", "c", "d", "e"]))
+
+
+@pytest.mark.asyncio
+async def test_estimates_are_cached_by_shape():
+    guard = QueryCostGuard(max_bytes_processed=0, max_entries=1)
+    client = FakeAsyncClient(total_bytes_processed=1024)
+    cost = QueryCost()
+
+    await guard.check(client, "SELECT 1", cost=cost)
+    await guard.check(client, "SELECT  1", cost=cost)
+    await guard.check(client, "SELECT 2", cost=cost)
+    await guard.check(client, "SELECT 1", cost=cost)
+
+    assert client.dry_runs == 3
+    assert [estimate.cached for estimate in cost.estimates] == [
+        False, True, False, False]
+    assert cost.to_metadata() == {"estimated_bytes_processed": 4096,
+                                  "queries": 4, "estimates_cached": False}
+    assert guard.stats()["cached_estimates"] == 1
@@ -0,0 +1,147 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from maintenance_scheduler.config import ModelRateLimit
+from maintenance_scheduler.shared_libraries import callbacks
+from maintenance_scheduler.shared_libraries.rate_limiter import \
+    ModelRateLimiter, RateLimiterRegistry, SessionRateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_delays_reservations_beyond_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(per_minute=60, clock=clock)
+
+    assert bucket.reserve(60) == 0
+    assert bucket.reserve(1) == pytest.approx(1)
+    assert bucket.reserve(2) == pytest.approx(3)
+
+    clock.now = 3
+    assert bucket.reserve(1) == pytest.approx(1)
+
+
+@pytest.mark.asyncio
+async def test_waiting_does_not_block_event_loop():
+    # 600 requests per minute allow a burst of 600, then one every 0.1s
+    limiter = ModelRateLimiter(ModelRateLimit(requests_per_minute=600))
+    for _ in range(600):
+        assert await limiter.acquire() == 0
+
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker = asyncio.create_task(tick())
+    start = time.perf_counter()
+    await asyncio.gather(limiter.acquire(), limiter.acquire())
+    elapsed = time.perf_counter() - start
+    ticker.cancel()
+
+    assert elapsed == pytest.approx(0.2, abs=0.1)
+    assert ticks >= 5
+    stats = limiter.stats()
+    assert stats["requests"] == 602
+    assert stats["delayed_requests"] == 2
+    assert stats["waiting"] == 0
+    assert stats["max_wait_secs"] == pytest.approx(0.2, abs=0.01)
+
+
+@pytest.mark.asyncio
+async def test_sessions_have_separate_request_limits(monkeypatch):
+    clock = FakeClock()
+    limiter = SessionRateLimiter(requests_per_minute=60, state_key="bucket",
+                                 clock=clock)
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    busy_session, other_session = {}, {}
+    for _ in range(61):
+        await limiter.acquire(busy_session)
+    await limiter.acquire(other_session)
+
+    assert delays == [pytest.approx(1.0)]
+    assert busy_session["bucket"]["level"] == pytest.approx(-1)
+    assert other_session["bucket"]["level"] == pytest.approx(59)
+
+
+def test_token_usage_is_corrected_after_response():
+    clock = FakeClock()
+    limiter = ModelRateLimiter(ModelRateLimit(tokens_per_minute=600),
+                               clock=clock)
+
+    asyncio.run(limiter.acquire(tokens=100))
+    limiter.record_usage(estimated_tokens=100, actual_tokens=800)
+
+    # The bucket is 200 tokens in debt, which takes 20 seconds to refill
+    assert limiter._tokens.reserve(0) == pytest.approx(20)
+
+
+def test_models_have_separate_limits():
+    registry = RateLimiterRegistry(
+        limits={"gemini-2.0-flash-001": ModelRateLimit(
+            requests_per_minute=100)},
+        default_limit=ModelRateLimit(requests_per_minute=10))
+
+    assert registry.get("gemini-2.0-flash-001").limit.requests_per_minute \
+        == 100
+    assert registry.get("gemini-2.5-pro").limit.requests_per_minute == 10
+    assert registry.get("gemini-2.5-pro") is registry.get("gemini-2.5-pro")
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_callback_reserves_estimated_tokens(monkeypatch):
+    registry = RateLimiterRegistry(
+        limits={}, default_limit=ModelRateLimit(requests_per_minute=10,
+                                                tokens_per_minute=1000))
+    monkeypatch.setattr(callbacks, "rate_limiters", registry)
+    callback_context = SimpleNamespace(state={})
+    llm_request = LlmRequest(
+        model="gemini-2.5-pro",
+        contents=[types.Content(role="user", parts=[
+            types.Part(text="x" * 400), types.Part(text="")])])
+
+    await callbacks.rate_limit_callback(callback_context, llm_request)
+    callbacks.record_token_usage_callback(
+        callback_context,
+        LlmResponse(usage_metadata=types.GenerateContentResponseUsageMetadata(
+            total_token_count=150)))
+
+    assert llm_request.contents[0].parts[1].text == " "
+    assert callback_context.state[callbacks.ESTIMATED_TOKENS_STATE_KEY] == 100
+    limiter = registry.get("gemini-2.5-pro")
+    assert limiter.stats()["requests"] == 1
+    assert limiter._tokens.reserve(0) == 0
+    assert limiter._tokens._level == pytest.approx(850, abs=1)
@@ -0,0 +1,98 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from maintenance_scheduler.shared_libraries.ridership_forecaster import \
+    SeasonalRidershipForecaster
+from maintenance_scheduler.shared_libraries.synthetic_ridership import \
+    generate_ridership_history
+
+
+@pytest.fixture
+def forecaster():
+    return SeasonalRidershipForecaster(step_minutes=15)
+
+
+def test_seasons_use_local_time(forecaster):
+    # Noon UTC is 8 AM in New York in the summer and 7 AM in the winter.
+    summer_monday = np.array(["2025-07-07T12:00"], dtype="datetime64[m]")
+    winter_monday = np.array(["2025-01-06T12:00"], dtype="datetime64[m]")
+
+    assert forecaster.seasons(summer_monday)[0] == 8 * 4
+    assert forecaster.seasons(winter_monday)[0] == 7 * 4
+
+
+def test_forecast_repeats_weekly_pattern(forecaster):
+    end = datetime(2025, 7, 7, tzinfo=timezone.utc)
+    event_ts = np.arange(np.datetime64("2025-06-09T00:00"),
+                         np.datetime64("2025-07-07T00:00"),
+                         np.timedelta64(15, "m"))
+    seasons = forecaster.seasons(event_ts)
+    num_riders = np.stack([seasons % 50, seasons % 7])
+
+    profiles = forecaster.fit_series(event_ts, num_riders)
+    forecast = forecaster.forecast(["stop-1", "stop-2"], profiles,
+                                   end + timedelta(minutes=1), horizon=96)
+
+    assert forecast.start == end + timedelta(minutes=15)
+    expected_seasons = forecaster.seasons(
+        np.array([timestamp.replace(tzinfo=None)
+                  for timestamp in forecast.timestamps()],
+                 dtype="datetime64[m]"))
+    np.testing.assert_array_equal(forecast.values[0], expected_seasons % 50)
+    np.testing.assert_array_equal(forecast.values[1], expected_seasons % 7)
+
+
+def test_missing_seasons_fall_back_to_time_of_day(forecaster):
+    # Only Mondays are observed
+    event_ts = np.arange(np.datetime64("2025-07-07T04:00"),
+                         np.datetime64("2025-07-08T04:00"),
+                         np.timedelta64(15, "m"))
+    num_riders = np.full((1, len(event_ts)), 12)
+
+    profiles = forecaster.fit_series(event_ts, num_riders)
+
+    assert np.all(profiles == 12)
+
+
+def test_forecast_rows_skips_stops_without_history(forecaster):
+    class Row:
+        def __init__(self, bus_stop_id, event_ts, num_riders):
+            self.bus_stop_id = bus_stop_id
+            self.event_ts = event_ts
+            self.num_riders = num_riders
+
+    start = datetime(2025, 7, 7, tzinfo=timezone.utc)
+    rows = [Row("stop-1", start + timedelta(minutes=15 * step), 5)
+            for step in range(7 * 96)]
+
+    forecast = forecaster.forecast_rows(["stop-1", "stop-2"], rows,
+                                        start + timedelta(days=7), horizon=10)
+
+    assert forecast.bus_stop_ids == ["stop-1"]
+    assert forecast.values.tolist() == [[5] * 10]
+
+
+def test_synthetic_history_has_no_riders_at_night(forecaster):
+    event_ts, num_riders = generate_ridership_history(
+        10, end=datetime(2025, 7, 7, tzinfo=timezone.utc), days=7, seed=1)
+
+    hours = (forecaster.seasons(event_ts) % forecaster.slots_per_day) // 4
+    assert num_riders.shape == (10, 7 * 96)
+    assert np.all(num_riders[:, hours <= 6] == 0)
+    assert np.all(num_riders[:, hours > 6] > 0)
@@ -0,0 +1,163 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import pytest
+
+from maintenance_scheduler.entities.maintenance import MaintenanceSchedule
+from maintenance_scheduler.shared_libraries.scheduling_queue import \
+    SchedulingQueue
+
+
+def schedule(bus_stop_id, reason="reason"):
+    return MaintenanceSchedule(
+        bus_stop_id=bus_stop_id,
+        maintenance_start="April 2, 2025, at 3:00 PM EST",
+        reason=reason,
+        notification_subject="subject",
+        notification_content="content")
+
+
+class RecordingWriter:
+    def __init__(self, failures=0):
+        self.batches = []
+        self.failures = failures
+
+    async def __call__(self, schedules):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("DML quota exceeded")
+        self.batches.append([(schedule.bus_stop_id, schedule.reason)
+                             for schedule in schedules])
+        return {schedule.bus_stop_id: "scheduled" for schedule in schedules}
+
+
+@pytest.mark.asyncio
+async def test_flushes_when_batch_is_full():
+    writer = RecordingWriter()
+    queue = SchedulingQueue(writer, max_batch_size=2, max_delay_secs=60)
+
+    assert await queue.enqueue(schedule("stop-1"), "invocation-1") == 1
+    assert writer.batches == []
+    await queue.enqueue(schedule("stop-2"), "invocation-1")
+    await asyncio.sleep(0)
+
+    assert writer.batches == [[("stop-1", "reason"), ("stop-2", "reason")]]
+    assert queue.pop_results("invocation-1") == {"stop-1": "scheduled",
+                                                 "stop-2": "scheduled"}
+
+
+@pytest.mark.asyncio
+async def test_flushes_after_delay():
+    writer = RecordingWriter()
+    queue = SchedulingQueue(writer, max_batch_size=10, max_delay_secs=0.05)
+
+    await queue.enqueue(schedule("stop-1"))
+    await asyncio.sleep(0.1)
+
+    assert writer.batches == [[("stop-1", "reason")]]
+    assert queue.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_newer_schedule_replaces_pending_one():
+    writer = RecordingWriter()
+    queue = SchedulingQueue(writer, max_batch_size=10, max_delay_secs=60)
+
+    await queue.enqueue(schedule("stop-1", reason="old"))
+    await queue.enqueue(schedule("stop-1", reason="new"))
+    await queue.flush()
+
+    assert writer.batches == [[("stop-1", "new")]]
+
+
+@pytest.mark.asyncio
+async def test_failed_writes_are_retried():
+    writer = RecordingWriter(failures=1)
+    queue = SchedulingQueue(writer, max_batch_size=10, max_delay_secs=60)
+
+    await queue.enqueue(schedule("stop-1"), "invocation-1")
+    assert await queue.flush() == {"stop-1": "error"}
+    assert queue.pending == 1
+
+    assert await queue.flush() == {"stop-1": "scheduled"}
+    assert queue.pop_results("invocation-1") == {"stop-1": "scheduled"}
+
+
+@pytest.mark.asyncio
+async def test_pending_schedules_are_replayed_from_journal(tmp_path):
+    journal_path = str(tmp_path / "journal.jsonl")
+    writer = RecordingWriter()
+    queue = SchedulingQueue(writer, max_batch_size=10, max_delay_secs=60,
+                            journal_path=journal_path)
+    await queue.enqueue(schedule("stop-1"))
+    await queue.flush()
+    await queue.enqueue(schedule("stop-2", reason="old"))
+    await queue.enqueue(schedule("stop-2"))
+    await queue.enqueue(schedule("stop-3"))
+    # Crash in the middle of an append
+    with open(journal_path, "a", encoding="utf-8") as journal:
+        journal.write('{"op": "enqueue", "sequ')
+
+    restarted = SchedulingQueue(writer, max_batch_size=10, max_delay_secs=60,
+                                journal_path=journal_path)
+    assert restarted.pending == 2
+    await restarted.flush()
+
+    assert writer.batches[-1] == [("stop-2", "reason"), ("stop-3", "reason")]
+    assert SchedulingQueue(writer, max_batch_size=10, max_delay_secs=60,
+                           journal_path=journal_path).pending == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_write_is_retried_by_the_timer():
+    writer = RecordingWriter(failures=1)
+    queue = SchedulingQueue(writer, max_batch_size=10, max_delay_secs=0.05)
+
+    await queue.enqueue(schedule("stop-1"))
+    await asyncio.sleep(0.2)
+
+    assert writer.batches == [[("stop-1", "reason")]]
+    assert queue.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_replayed_schedules_are_written_by_the_timer(tmp_path):
+    journal_path = str(tmp_path / "journal.jsonl")
+    writer = RecordingWriter()
+    queue = SchedulingQueue(writer, max_batch_size=10, max_delay_secs=60,
+                            journal_path=journal_path)
+    await queue.enqueue(schedule("stop-1"))
+
+    restarted = SchedulingQueue(writer, max_batch_size=10,
+                                max_delay_secs=0.05,
+                                journal_path=journal_path)
+    await asyncio.sleep(0.1)
+
+    assert writer.batches == [[("stop-1", "reason")]]
+    assert restarted.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_uncollected_results_are_bounded():
+    queue = SchedulingQueue(RecordingWriter(), max_batch_size=10,
+                            max_delay_secs=60, max_results=2)
+
+    for index in range(3):
+        await queue.enqueue(schedule(f"stop-{index}"), f"invocation-{index}")
+        await queue.flush()
+
+    assert queue.pop_results("invocation-0") == {}
+    assert queue.pop_results("invocation-2") == {"stop-2": "scheduled"}
@@ -0,0 +1,128 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from maintenance_scheduler.shared_libraries import callbacks
+from maintenance_scheduler.shared_libraries.telemetry import LogSink, NoSink, \
+    OpenTelemetrySink, QueryStats, ToolCallStats, ToolTelemetry
+from maintenance_scheduler.tools.tools import get_current_time, \
+    get_unresolved_incidents
+
+from .conftest import incident_row
+
+
+async def call_tool(function, function_call_id, *args):
+    tool = SimpleNamespace(name=function.__name__)
+    tool_context = SimpleNamespace(function_call_id=function_call_id,
+                                   invocation_id="invocation-1")
+    callbacks.before_tool(tool, {}, tool_context)
+    response = function(*args)
+    if asyncio.iscoroutine(response):
+        response = await response
+    callbacks.after_tool(tool, {}, tool_context, response)
+    return response
+
+
+@pytest.fixture
+def log_sink(monkeypatch):
+    sink = LogSink()
+    monkeypatch.setattr(callbacks, "tool_telemetry", ToolTelemetry(sink))
+    return sink
+
+
+@pytest.mark.asyncio
+async def test_queries_are_attributed_to_parallel_tool_calls(fake_bigquery,
+                                                             log_sink):
+    fake_bigquery(rows=[incident_row("stop-1"), incident_row("stop-2")],
+                  latency_secs=0.05)
+
+    await asyncio.gather(
+        call_tool(get_unresolved_incidents, "call-1"),
+        call_tool(get_unresolved_incidents, "call-2"),
+        call_tool(get_current_time, "call-3"))
+
+    stats = log_sink.stats()
+    incidents_stats = stats["get_unresolved_incidents"]
+    assert incidents_stats["calls"] == 2
+    assert incidents_stats["queries"] == 2
+    assert incidents_stats["total_bytes_processed"] == 2048
+    assert incidents_stats["slot_millis"] == 40
+    assert incidents_stats["max_wall_time_ms"] >= 50
+    assert incidents_stats["total_query_time_ms"] >= 100
+    assert incidents_stats["max_response_bytes"] > 0
+    assert stats["get_current_time"]["queries"] == 0
+
+
+def test_unknown_tool_call_is_ignored(log_sink):
+    callbacks.after_tool(SimpleNamespace(name="tool"), {},
+                         SimpleNamespace(function_call_id="unknown",
+                                         invocation_id="invocation-1"), {})
+
+    assert log_sink.stats() == {}
+
+
+def test_unfinished_tool_calls_are_dropped():
+    telemetry = ToolTelemetry(NoSink(), max_in_flight=2)
+
+    telemetry.start("tool")
+    telemetry.start("tool")
+    for call in range(3):
+        telemetry.start("tool", function_call_id=f"call-{call}")
+
+    # Calls without an id and the oldest call which never finished
+    assert list(telemetry._in_flight) == ["call-1", "call-2"]
+    assert telemetry.finish("call-0", {}) is None
+    assert telemetry.finish("call-2", {}).tool_name == "tool"
+
+
+def test_opentelemetry_spans():
+    sdk_trace = pytest.importorskip("opentelemetry.sdk.trace")
+    in_memory_span_exporter = pytest.importorskip(
+        "opentelemetry.sdk.trace.export.in_memory_span_exporter")
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+
+    exporter = in_memory_span_exporter.InMemorySpanExporter()
+    provider = sdk_trace.TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    telemetry = ToolTelemetry(OpenTelemetrySink(tracer_provider=provider))
+
+    tool_call = telemetry.start("get_expected_number_of_passengers", "call-1")
+    tool_call.queries.append(QueryStats(wall_time_ms=12.5, job_id="job-1",
+                                        total_bytes_processed=0,
+                                        cache_hit=True))
+    telemetry.finish("call-1", {"status": "success"})
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    tool_span = spans["tool_call get_expected_number_of_passengers"]
+    assert tool_span.attributes["tool.response_bytes"] == 20
+    assert tool_span.attributes["bigquery.queries"] == 1
+    query_span = spans["bigquery.query"]
+    assert query_span.parent.span_id == tool_span.context.span_id
+    assert query_span.attributes["bigquery.job_id"] == "job-1"
+    assert query_span.attributes["bigquery.cache_hit"] is True
+
+
+def test_tool_call_totals():
+    tool_call = ToolCallStats(tool_name="tool", queries=[
+        QueryStats(wall_time_ms=10, total_bytes_processed=100,
+                   slot_millis=5),
+        QueryStats(wall_time_ms=20)])
+
+    assert tool_call.query_time_ms == 30
+    assert tool_call.total_bytes_processed == 100
+    assert tool_call.slot_millis == 5
@@ -12,21 +12,293 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import re
+import sys
+import time
 
+import pytest
+
+from maintenance_scheduler.shared_libraries.callbacks import \
+    flush_scheduling_queue, SCHEDULE_RESULTS_STATE_KEY
+from maintenance_scheduler.shared_libraries.incident_cache import \
+    IncidentCache
+from maintenance_scheduler.shared_libraries.scheduling_queue import \
+    SchedulingQueue
+from maintenance_scheduler.tools import tools
 from maintenance_scheduler.tools.tools import (
-    get_unresolved_incidents, get_current_time
+    get_unresolved_incidents, get_current_time,
+    get_expected_number_of_passengers, schedule_maintenance,
+    find_maintenance_windows, schedule_maintenance_batch
 )
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
 import logging
 
+from .conftest import forecast_rows, incident_row
+
 # Configure logging for the test file
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def test_get_unresolved_incidents():
-    result = get_unresolved_incidents()
+@pytest.mark.asyncio
+async def test_get_unresolved_incidents(fake_bigquery):
+    fake_bigquery(rows=[incident_row("stop-1"), incident_row("stop-2")])
+    result = await get_unresolved_incidents()
     assert result["status"] == "success"
+    assert [incident.bus_stop.id for incident in
+            result["bus_stop_incidents"]] == ["stop-1", "stop-2"]
+
+
+@pytest.mark.asyncio
+async def test_get_unresolved_incidents_in_pages(fake_bigquery):
+    backlog = [incident_row(f"stop-{index}") for index in range(5)]
+
+    def rows(query, parameters):
+        return [row for row in backlog
+                if row.incident_id > parameters["page_token"]
+                ][:parameters["limit"]]
+
+    client = fake_bigquery(rows=rows)
+    pages = []
+    page_token = ""
+    while True:
+        result = await get_unresolved_incidents(page_size=2,
+                                                page_token=page_token)
+        pages.append([incident.bus_stop.id
+                      for incident in result["bus_stop_incidents"]])
+        page_token = result.get("next_page_token")
+        if not page_token:
+            break
+
+    assert pages == [["stop-0", "stop-1"], ["stop-2", "stop-3"], ["stop-4"]]
+    assert [parameters["limit"] for parameters in client.query_parameters] \
+        == [3, 3, 3]
+
+
+@pytest.mark.asyncio
+async def test_get_unresolved_incidents_filters_and_bounds_page(
+        fake_bigquery, monkeypatch):
+    client = fake_bigquery(rows=[incident_row("stop-1")])
+    monkeypatch.setattr(tools.config, "incidents_max_page_size", 10)
+
+    result = await get_unresolved_incidents(page_size=500, city="New York",
+                                            zip_code="10001")
+
+    assert result["bus_stop_incidents"][0].incident_id == "incident-stop-1"
+    assert result["bus_stop_incidents"][0].bus_stop.address.city == "New York"
+    assert client.query_parameters[0] == {
+        "page_token": "", "city": "New York", "zip_code": "10001",
+        "limit": 11}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_tool_calls_do_not_block_each_other(fake_bigquery):
+    latency_secs = 0.5
+    number_of_calls = 6
+    fake_bigquery(rows=[], latency_secs=latency_secs)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        get_unresolved_incidents(),
+        get_expected_number_of_passengers(["stop-1"]),
+        schedule_maintenance("stop-1", "April 2, 2025, at 3:00 PM EST",
+                             "reason", "subject", "content"),
+        *[get_unresolved_incidents() for _ in range(number_of_calls - 3)])
+    elapsed = time.perf_counter() - start
+
+    assert all(result["status"] == "success" for result in results)
+    # Sequential execution would take number_of_calls * latency_secs
+    assert elapsed < 2 * latency_secs
+
+
+@pytest.mark.asyncio
+async def test_concurrent_jobs_are_bounded(fake_bigquery):
+    latency_secs = 0.3
+    fake_bigquery(rows=[], latency_secs=latency_secs, max_concurrent_jobs=2)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[get_unresolved_incidents() for _ in range(4)])
+    elapsed = time.perf_counter() - start
+
+    assert elapsed >= 2 * latency_secs
+
+
+@pytest.mark.asyncio
+async def test_incident_cache_serves_repeated_lookups(fake_bigquery):
+    client = fake_bigquery(rows=[incident_row("stop-1"), incident_row("stop-2")],
+                           incident_cache_ttl_secs=60)
+
+    await get_unresolved_incidents()
+    result = await get_unresolved_incidents()
+
+    assert len(result["bus_stop_incidents"]) == 2
+    assert len(client.queries) == 1
+    assert tools.incident_cache.stats()["hits"] == 1
+    assert tools.incident_cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_schedule_maintenance_removes_cached_incident(fake_bigquery):
+    client = fake_bigquery(rows=[incident_row("stop-1"), incident_row("stop-2")],
+                           incident_cache_ttl_secs=60)
+
+    await get_unresolved_incidents()
+    await schedule_maintenance("stop-1", "April 2, 2025, at 3:00 PM EST",
+                               "reason", "subject", "content")
+    result = await get_unresolved_incidents()
+
+    assert [incident.bus_stop.id for incident in
+            result["bus_stop_incidents"]] == ["stop-2"]
+    # One incident query and one update
+    assert len(client.queries) == 2
+
+
+def test_incident_cache_forgets_scheduled_stops():
+    now = [0.0]
+    cache = IncidentCache(ttl_secs=60, clock=lambda: now[0])
+    disabled = IncidentCache(ttl_secs=0)
+
+    for minute in range(10):
+        now[0] = minute * 60.0
+        cache.mark_scheduled(f"stop-{minute}")
+        disabled.mark_scheduled(f"stop-{minute}")
+
+    # Only the stops of the last TTL period are remembered
+    assert list(cache._recently_scheduled) == ["stop-9"]
+    assert not disabled._recently_scheduled
+
+
+def maintenance_schedule(bus_stop_id, reason="reason"):
+    return {"bus_stop_id": bus_stop_id,
+            "maintenance_start": "April 2, 2025, at 3:00 PM EST",
+            "reason": reason,
+            "notification_subject": "subject",
+            "notification_content": "content"}
+
+
+@pytest.mark.asyncio
+async def test_schedule_maintenance_batch_uses_single_merge(fake_bigquery):
+    def rows(query, parameters):
+        if "MERGE" in query:
+            return [SimpleNamespace(bus_stop_id="stop-1"),
+                    SimpleNamespace(bus_stop_id="stop-3")]
+        return [incident_row("stop-1"), incident_row("stop-2"),
+                incident_row("stop-3")]
+
+    client = fake_bigquery(rows=rows, incident_cache_ttl_secs=60)
+    await get_unresolved_incidents()
+
+    result = await schedule_maintenance_batch([
+        maintenance_schedule("stop-1"),
+        maintenance_schedule("stop-2"),
+        maintenance_schedule("stop-3", reason="old"),
+        maintenance_schedule("stop-3"),
+    ])
+
+    assert result == {"status": "success",
+                      "results": {"stop-1": "scheduled",
+                                  "stop-2": "no_open_incident",
+                                  "stop-3": "scheduled"}}
+    assert len(client.queries) == 2
+    schedules = client.query_parameters[-1]["schedules"]
+    assert [schedule.struct_values["bus_stop_id"]
+            for schedule in schedules] == ["stop-1", "stop-2", "stop-3"]
+    assert schedules[-1].struct_values["reason"] == "reason"
+
+    result = await get_unresolved_incidents()
+    assert [incident.bus_stop.id for incident in
+            result["bus_stop_incidents"]] == ["stop-2"]
+
+
+@pytest.mark.asyncio
+async def test_schedule_maintenance_batch_rejects_invalid_entries(
+        fake_bigquery):
+    client = fake_bigquery()
+
+    result = await schedule_maintenance_batch([{"bus_stop_id": "stop-1"}])
+
+    assert result == {"status": "error"}
+    assert client.queries == []
+
+
+@pytest.mark.asyncio
+async def test_write_behind_schedules_are_flushed_at_end_of_invocation(
+        fake_bigquery, monkeypatch):
+    client = fake_bigquery(
+        rows=lambda query, parameters: [SimpleNamespace(bus_stop_id="stop-1")])
+    monkeypatch.setattr(tools.config, "schedule_write_behind", True)
+    monkeypatch.setattr(tools, "scheduling_queue", SchedulingQueue(
+        tools._write_maintenance_schedules, max_batch_size=10,
+        max_delay_secs=60))
+    tool_context = SimpleNamespace(invocation_id="invocation-1")
+
+    results = [
+        await schedule_maintenance(bus_stop_id, "April 2, 2025, at 3:00 PM EST",
+                                   "reason", "subject", "content",
+                                   tool_context=tool_context)
+        for bus_stop_id in ("stop-1", "stop-2")]
+
+    assert [result["status"] for result in results] == ["accepted"] * 2
+    assert client.queries == []
+
+    callback_context = SimpleNamespace(invocation_id="invocation-1", state={})
+    await flush_scheduling_queue(callback_context)
+
+    assert len(client.queries) == 1
+    assert callback_context.state[SCHEDULE_RESULTS_STATE_KEY] == {
+        "stop-1": "scheduled", "stop-2": "no_open_incident"}
+
+
+@pytest.mark.asyncio
+async def test_write_behind_incident_is_listed_until_written(
+        fake_bigquery, monkeypatch):
+    writes = []
+
+    async def write_batch(schedules):
+        writes.append(schedules)
+        if len(writes) == 1:
+            raise RuntimeError("DML quota exceeded")
+        return await tools._write_maintenance_schedules(schedules)
+
+    def rows(query, parameters):
+        if "MERGE" in query:
+            return [SimpleNamespace(bus_stop_id="stop-1")]
+        return [incident_row("stop-1"), incident_row("stop-2")]
+
+    fake_bigquery(rows=rows, incident_cache_ttl_secs=60)
+    monkeypatch.setattr(tools.config, "schedule_write_behind", True)
+    monkeypatch.setattr(tools, "scheduling_queue", SchedulingQueue(
+        write_batch, max_batch_size=10, max_delay_secs=60))
+
+    await get_unresolved_incidents()
+    await schedule_maintenance("stop-1", "April 2, 2025, at 3:00 PM EST",
+                               "reason", "subject", "content")
+    await tools.scheduling_queue.flush()
+    listed = await get_unresolved_incidents()
+    await tools.scheduling_queue.flush()
+    written = await get_unresolved_incidents()
+
+    assert [incident.bus_stop.id for incident in
+            listed["bus_stop_incidents"]] == ["stop-1", "stop-2"]
+    assert [incident.bus_stop.id for incident in
+            written["bus_stop_incidents"]] == ["stop-2"]
+
+
+@pytest.mark.asyncio
+async def test_forecast_cache_only_queries_missing_stops(fake_bigquery):
+    client = fake_bigquery(rows=forecast_rows, forecast_cache_bucket_minutes=60)
+
+    await get_expected_number_of_passengers(["stop-1", "stop-2"])
+    result = await get_expected_number_of_passengers(
+        ["stop-1", "stop-2", "stop-3"])
+
+    assert client.query_parameters[-1]["bus_stop_ids"] == ["stop-3"]
+    assert list(result["forecast"]) == ["stop-1", "stop-2", "stop-3"]
+    assert len(result["forecast"]["stop-1"]) == len(result["forecast"]["stop-3"])
+
+    await get_expected_number_of_passengers(["stop-3", "stop-1"])
+    assert len(client.queries) == 2
 
 
 def test_get_current_time():
@@ -34,3 +306,201 @@ def test_get_current_time():
     # Expected result: "Wed 09 Jul 2025, 05:25PM"
     pattern = r"^(Mon|Tue|Wed|Thu|Fri|Sat|Sun) \d{2} (Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec) \d{4}, \d{2}:\d{2}(AM|PM)$"
     assert re.match(pattern, result)
+
+
+@pytest.mark.asyncio
+async def test_forecast_falls_back_to_local_forecaster(fake_bigquery):
+    start = datetime.now(tz=timezone.utc) - timedelta(days=14)
+
+    def rows(query, parameters):
+        if "AI.FORECAST" in query:
+            raise TimeoutError("AI.FORECAST timed out")
+        return [SimpleNamespace(bus_stop_id=bus_stop_id,
+                                event_ts=start + timedelta(minutes=15 * step),
+                                num_riders=7)
+                for bus_stop_id in parameters["bus_stop_ids"]
+                for step in range(14 * 24 * 4)]
+
+    client = fake_bigquery(rows=rows)
+
+    result = await get_expected_number_of_passengers(["stop-1", "stop-2"])
+
+    assert result["status"] == "success"
+    assert len(client.queries) == 2
+    assert "bus_ridership" in client.queries[-1]
+    assert {entry["number_of_passengers"]
+            for forecast in result["forecast"].values()
+            for entry in forecast} == {7}
+    assert len(result["forecast"]["stop-1"]) == 3 * 24 * 4
+
+
+@pytest.mark.asyncio
+async def test_mock_forecast_uses_local_forecaster(monkeypatch):
+    monkeypatch.setattr(tools.config, "mock_tools", True)
+
+    result = await get_expected_number_of_passengers(["stop-1", "stop-2"])
+
+    assert list(result["forecast"]) == ["stop-1", "stop-2"]
+    assert len(result["forecast"]["stop-1"]) == 3 * 24 * 4
+
+
+@pytest.mark.asyncio
+async def test_columnar_forecast_payload(fake_bigquery):
+    fake_bigquery(rows=forecast_rows)
+
+    rows = await get_expected_number_of_passengers(["stop-1"])
+    columnar = await get_expected_number_of_passengers(
+        ["stop-1"], payload_format="columnar")
+    columnar_rle = await get_expected_number_of_passengers(
+        ["stop-1"], payload_format="columnar_rle")
+
+    expected = [entry["number_of_passengers"]
+                for entry in rows["forecast"]["stop-1"]]
+    assert columnar["forecast"]["stop-1"]["step_minutes"] == 15
+    assert columnar["forecast"]["stop-1"]["number_of_passengers"] == expected
+    assert columnar_rle["forecast"]["stop-1"]["number_of_passengers_rle"] == \
+           [[10, len(expected)]]
+
+
+@pytest.mark.asyncio
+async def test_unknown_forecast_payload_format(fake_bigquery):
+    fake_bigquery(rows=forecast_rows)
+
+    result = await get_expected_number_of_passengers(
+        ["stop-1"], payload_format="xml")
+
+    assert result["status"] == "error"
+
+
+@pytest.mark.asyncio
+async def test_find_maintenance_windows(fake_bigquery):
+    now = datetime.now(tz=timezone.utc).replace(second=0, microsecond=0)
+    now -= timedelta(minutes=now.minute % 15)
+
+    def rows(query, parameters):
+        return [SimpleNamespace(
+            bus_stop_id=bus_stop_id,
+            forecast_timestamp=now + timedelta(minutes=15 * (step + 1)),
+            expected_number_of_passengers=10 + step % 4)
+            for bus_stop_id in parameters["bus_stop_ids"]
+            for step in range(3 * 24 * 4)]
+
+    fake_bigquery(rows=rows)
+
+    result = await find_maintenance_windows(
+        ["stop-1", "stop-2"], duration_hours=2, number_of_windows=2)
+
+    assert result["status"] == "success"
+    for windows in result["windows"].values():
+        assert len(windows) == 2
+        for window in windows:
+            start = datetime.strptime(window["start"], "%m/%d/%Y %H:%M")
+            end = datetime.strptime(window["end"], "%m/%d/%Y %H:%M")
+            assert start.minute == 0
+            assert 8 <= start.hour and end.hour <= 16
+            assert start.weekday() < 5
+            assert end - start == timedelta(hours=2)
+        assert windows[0]["expected_number_of_passengers"] <= \
+               windows[1]["expected_number_of_passengers"]
+
+
+@pytest.mark.asyncio
+async def test_find_maintenance_windows_in_given_working_hours(fake_bigquery):
+    now = datetime.now(tz=timezone.utc).replace(second=0, microsecond=0)
+    now -= timedelta(minutes=now.minute % 15)
+    fake_bigquery(rows=lambda query, parameters: [SimpleNamespace(
+        bus_stop_id="stop-1",
+        forecast_timestamp=now + timedelta(minutes=15 * (step + 1)),
+        expected_number_of_passengers=10)
+        for step in range(3 * 24 * 4)])
+
+    result = await find_maintenance_windows(
+        ["stop-1"], duration_hours=2, working_hours_start=18,
+        working_hours_end=22, allow_weekends=True)
+    invalid = await find_maintenance_windows(
+        ["stop-1"], duration_hours=2, working_hours_start=22,
+        working_hours_end=18)
+
+    assert result["status"] == "success"
+    assert result["windows"]["stop-1"]
+    for window in result["windows"]["stop-1"]:
+        start = datetime.strptime(window["start"], "%m/%d/%Y %H:%M")
+        end = datetime.strptime(window["end"], "%m/%d/%Y %H:%M")
+        assert 18 <= start.hour and end.hour <= 22
+    assert invalid["status"] == "error"
+
+
+@pytest.mark.asyncio
+async def test_forecast_over_budget_is_rejected_on_the_first_dry_run(
+        fake_bigquery, monkeypatch):
+    monkeypatch.setattr(tools.config, "local_forecast_fallback", False)
+    client = fake_bigquery(
+        rows=forecast_rows,
+        dry_run_bytes=lambda query, parameters:
+        100 * len(parameters["bus_stop_ids"]),
+        query_max_bytes_processed=250)
+
+    result = await get_expected_number_of_passengers(
+        [f"stop-{index}" for index in range(5)])
+
+    assert result["status"] == "error"
+    assert len(client.dry_runs) == 1
+    assert client.queries == []
+    assert result["query_cost"]["rejected_estimated_bytes_processed"] == [
+        500]
+
+
+@pytest.mark.asyncio
+async def test_incidents_over_budget_are_rejected(fake_bigquery):
+    client = fake_bigquery(rows=[incident_row("stop-1")],
+                           dry_run_bytes=10_000,
+                           query_max_bytes_processed=1_000)
+
+    result = await get_unresolved_incidents()
+
+    assert result["status"] == "error"
+    assert "10000 bytes" in result["message"]
+    assert result["query_cost"]["rejected_estimated_bytes_processed"] == [
+        10_000]
+    assert client.queries == []
+
+
+@pytest.mark.asyncio
+async def test_forecast_over_budget_falls_back_to_local_forecaster(
+    fake_bigquery
+):
+    start = datetime.now(tz=timezone.utc) - timedelta(days=14)
+
+    def rows(query, parameters):
+        return [SimpleNamespace(bus_stop_id=bus_stop_id,
+                                event_ts=start + timedelta(minutes=15 * step),
+                                num_riders=7)
+                for bus_stop_id in parameters["bus_stop_ids"]
+                for step in range(14 * 24 * 4)]
+
+    client = fake_bigquery(
+        rows=rows,
+        dry_run_bytes=lambda query, parameters:
+        10_000 if "AI.FORECAST" in query else 100,
+        query_max_bytes_processed=1_000)
+
+    result = await get_expected_number_of_passengers(["stop-1"])
+
+    assert result["status"] == "success"
+    assert len(client.queries) == 1
+    assert "AI.FORECAST" not in client.queries[0]
+    assert result["query_cost"] == {
+        "estimated_bytes_processed": 100, "queries": 1,
+        "estimates_cached": False,
+        "rejected_estimated_bytes_processed": [10_000]}
+
+
+def test_local_backend_without_the_extra_is_a_clear_error(monkeypatch):
+    monkeypatch.setattr(tools.config, "bigquery_backend", "duckdb")
+    monkeypatch.delitem(
+        sys.modules, "maintenance_scheduler.shared_libraries.local_bigquery",
+        raising=False)
+    monkeypatch.setitem(sys.modules, "duckdb", None)
+
+    with pytest.raises(ImportError, match=r"\[local\]"):
+        tools.get_bigquery_client()
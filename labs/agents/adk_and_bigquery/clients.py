@@ -0,0 +1,76 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Long-lived BigQuery client shared by the tools of the agent.
+
+The client is created on first use with a connection pool sized for
+concurrent tool calls. Connections are kept alive and reused, so repeated
+tool calls skip the TLS handshake.
+"""
+
+import logging
+import threading
+from typing import Optional
+
+import google.auth
+from google.auth.transport.requests import AuthorizedSession
+from google.cloud import bigquery
+from google.cloud.bigquery.enums import JobCreationMode
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+MAX_POOL_CONNECTIONS = 16
+
+_lock = threading.Lock()
+_session: Optional[AuthorizedSession] = None
+_bigquery_client: Optional[bigquery.Client] = None
+
+
+def get_bigquery_client() -> bigquery.Client:
+    """Returns the shared BigQuery client, creating it on the first call."""
+    global _session, _bigquery_client
+    with _lock:
+        if _bigquery_client is None:
+            credentials, _ = google.auth.default(
+                scopes=["https://www.googleapis.com/auth/cloud-platform"])
+            _session = AuthorizedSession(credentials)
+            _session.mount("https://", HTTPAdapter(
+                pool_connections=MAX_POOL_CONNECTIONS,
+                pool_maxsize=MAX_POOL_CONNECTIONS))
+            _bigquery_client = bigquery.Client(
+                credentials=credentials,
+                _http=_session,
+                # This can be useful to reduce response latencies
+                default_job_creation_mode=JobCreationMode.JOB_CREATION_OPTIONAL
+            )
+        return _bigquery_client
+
+
+def get_pool_stats() -> dict:
+    """Connections created, requests sent and idle connections by host."""
+    if _session is None:
+        return {}
+    pools = _session.get_adapter("https://").poolmanager.pools
+    stats = {}
+    for pool_key in list(pools.keys()):
+        pool = pools.get(pool_key)
+        if pool is None:
+            continue
+        stats[pool.host] = {
+            "connections_created": pool.num_connections,
+            "requests": pool.num_requests,
+            "idle_connections": pool.pool.qsize() if pool.pool else 0,
+        }
+    return stats
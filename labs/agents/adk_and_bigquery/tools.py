@@ -19,16 +19,11 @@ import logging
 import os
 from typing import List
 
-from google.cloud import bigquery
-from google.cloud.bigquery.enums import JobCreationMode
 from google.cloud.bigquery.job import QueryJobConfig
 from pydantic import BaseModel, Field
 from google.adk.tools.mcp_tool import McpToolset, StreamableHTTPConnectionParams
 
-bigquery_client = bigquery.Client(
-    # This can be useful to reduce response latencies
-    default_job_creation_mode=JobCreationMode.JOB_CREATION_OPTIONAL
-)
+from .clients import get_bigquery_client
 
 logger = logging.getLogger(__name__)
 
@@ -50,7 +45,7 @@ async def get_latest_bus_stop_images(number_of_images: int) -> List[BusStop]:
     bus_stops = []
 
     try:
-        rows = bigquery_client.query_and_wait(
+        rows = get_bigquery_client().query_and_wait(
             project=os.getenv("BIGQUERY_RUN_PROJECT_ID"),
             job_config=QueryJobConfig(
                 job_timeout_ms=60 * 1000